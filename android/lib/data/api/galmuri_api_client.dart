@@ -1,3 +1,8 @@
+import 'dart:convert';
+import 'dart:math';
+import 'dart:typed_data';
+
+import 'package:crypto/crypto.dart';
 import 'package:dio/dio.dart';
 import '../../domain/entities/galmuri_item.dart';
 import '../models/capture_request.dart';
@@ -38,30 +43,139 @@ class GalmuriApiClient {
     return GalmuriItem.fromJson(response.data as Map<String, dynamic>);
   }
 
-  /// Get all items for a user
-  Future<List<GalmuriItem>> getItems(String userId) async {
-    final response = await _dio.get('/api/items/$userId');
-    final List<dynamic> data = response.data as List<dynamic>;
-    return data
-        .map((json) => GalmuriItem.fromJson(json as Map<String, dynamic>))
-        .toList();
+  /// Whether the server already stores an image with this SHA-256
+  Future<bool> negotiate(String userId, String contentHash) async {
+    final response = await _dio.post(
+      '/api/capture/negotiate',
+      data: {
+        'user_id': userId,
+        'sha256': contentHash,
+      },
+    );
+    return (response.data as Map<String, dynamic>)['known'] as bool;
   }
 
-  /// Search items
-  Future<List<GalmuriItem>> search(String userId, String query) async {
+  /// Capture an image the server already stores, without uploading it
+  Future<GalmuriItem> captureByReference(CaptureRequest request, String contentHash) async {
     final response = await _dio.post(
-      '/api/search',
+      '/api/capture/by-reference',
       data: {
-        'user_id': userId,
-        'query': query,
+        ...request.toMetadataJson(),
+        'sha256': contentHash,
+      },
+    );
+    return GalmuriItem.fromJson(response.data as Map<String, dynamic>);
+  }
+
+  /// Capture via a resumable upload
+  ///
+  /// The server is first asked whether it already has the image; if so
+  /// the item is created by reference and nothing is uploaded.
+  /// Otherwise the image is sent in chunks; after a dropped connection
+  /// the upload continues from the server's committed offset instead of
+  /// starting over. Requires [CaptureRequest.itemId] so that retries
+  /// (including a repeated finalize) return the same item.
+  Future<GalmuriItem> uploadCapture(
+    CaptureRequest request, {
+    int chunkSize = 256 * 1024,
+    int maxRetries = 5,
+  }) async {
+    final itemId = request.itemId;
+    if (itemId == null) {
+      throw ArgumentError('uploadCapture requires CaptureRequest.itemId');
+    }
+    final imageData = request.imageData.contains(',')
+        ? request.imageData.split(',').last
+        : request.imageData;
+    final Uint8List bytes = base64Decode(imageData);
+    final digest = sha256.convert(bytes).toString();
+
+    if (await negotiate(request.userId, digest)) {
+      return captureByReference(request, digest);
+    }
+
+    // Creating the session again is safe and reports the current offset
+    final session = await _dio.post(
+      '/api/uploads',
+      data: {
+        ...request.toMetadataJson(),
+        'total_size': bytes.length,
+        'sha256': digest,
       },
     );
+    final status = session.data as Map<String, dynamic>;
+    if (status['item'] != null) {
+      return GalmuriItem.fromJson(status['item'] as Map<String, dynamic>);
+    }
+
+    var offset = status['offset'] as int;
+    var retries = 0;
+    while (offset < bytes.length) {
+      final end = min(offset + chunkSize, bytes.length);
+      try {
+        final response = await _dio.put(
+          '/api/uploads/$itemId',
+          queryParameters: {'offset': offset},
+          data: Stream.fromIterable([bytes.sublist(offset, end)]),
+          options: Options(
+            contentType: 'application/octet-stream',
+            headers: {Headers.contentLengthHeader: end - offset},
+          ),
+        );
+        offset = (response.data as Map<String, dynamic>)['offset'] as int;
+        retries = 0;
+      } on DioException catch (e) {
+        if (++retries > maxRetries) rethrow;
+        final committed = e.response?.headers.value('upload-offset');
+        if (committed != null) {
+          // Server has a different offset (e.g. an earlier chunk landed)
+          offset = int.parse(committed);
+        } else {
+          final probe = await _dio.get('/api/uploads/$itemId');
+          offset = (probe.data as Map<String, dynamic>)['offset'] as int;
+        }
+      }
+    }
+
+    final response = await _dio.post('/api/uploads/$itemId/finalize');
+    return GalmuriItem.fromJson(response.data as Map<String, dynamic>);
+  }
+
+  /// Get all items for a user
+  Future<List<GalmuriItem>> getItems(String userId) async {
+    final response = await _dio.get('/api/items/$userId');
     final List<dynamic> data = response.data as List<dynamic>;
     return data
         .map((json) => GalmuriItem.fromJson(json as Map<String, dynamic>))
         .toList();
   }
 
+  /// Search items, following pages while the server reports more
+  Future<List<GalmuriItem>> search(
+    String userId,
+    String query, {
+    int pageSize = 50,
+  }) async {
+    final items = <GalmuriItem>[];
+    while (true) {
+      final response = await _dio.post(
+        '/api/search',
+        data: {
+          'user_id': userId,
+          'query': query,
+          'limit': pageSize,
+          'offset': items.length,
+        },
+      );
+      final List<dynamic> data = response.data as List<dynamic>;
+      items.addAll(data
+          .map((json) => GalmuriItem.fromJson(json as Map<String, dynamic>)));
+      if (data.isEmpty || response.headers.value('x-search-has-more') != 'true') {
+        return items;
+      }
+    }
+  }
+
   /// Get item by ID
   Future<GalmuriItem> getItem(String itemId) async {
     final response = await _dio.get('/api/item/$itemId');
@@ -1,6 +1,7 @@
 /// Request model for capturing an item
 class CaptureRequest {
   final String userId;
+  final String? itemId; // Client-generated UUID; makes retries idempotent
   final String imageData; // Base64 encoded
   final String? sourceUrl;
   final String pageTitle;
@@ -9,6 +10,7 @@ class CaptureRequest {
 
   CaptureRequest({
     required this.userId,
+    this.itemId,
     required this.imageData,
     this.sourceUrl,
     required this.pageTitle,
@@ -19,6 +21,7 @@ class CaptureRequest {
   Map<String, dynamic> toJson() {
     return {
       'user_id': userId,
+      if (itemId != null) 'item_id': itemId,
       'image_data': imageData,
       'source_url': sourceUrl,
       'page_title': pageTitle,
@@ -26,6 +29,11 @@ class CaptureRequest {
       'platform': platform,
     };
   }
+
+  /// Capture fields without the image, for resumable uploads
+  Map<String, dynamic> toMetadataJson() {
+    return toJson()..remove('image_data');
+  }
 }
 
 
@@ -59,9 +59,10 @@ class GalmuriItemsNotifier extends StateNotifier<AsyncValue<List<GalmuriItem>>>
         throw Exception('User ID가 설정되지 않았습니다.');
       }
 
-      // Create item
+      // Create item (the server keeps this ID, so retries don't duplicate it)
+      final itemId = request.itemId ?? Uuid().v4();
       final item = GalmuriItem(
-        id: Uuid().v4(),
+        id: itemId,
         userId: userId,
         imageData: request.imageData,
         sourceUrl: request.sourceUrl,
@@ -79,7 +80,15 @@ class GalmuriItemsNotifier extends StateNotifier<AsyncValue<List<GalmuriItem>>>
       final apiClient = _ref.read(apiClientProvider);
       if (apiClient != null) {
         try {
-          final syncedItem = await apiClient.capture(request);
+          final syncedItem = await apiClient.uploadCapture(CaptureRequest(
+            userId: request.userId,
+            itemId: itemId,
+            imageData: request.imageData,
+            sourceUrl: request.sourceUrl,
+            pageTitle: request.pageTitle,
+            memoContent: request.memoContent,
+            platform: request.platform,
+          ));
           // Update local item with server response
           await _repository.save(syncedItem);
         } catch (e) {
@@ -145,6 +154,7 @@ class GalmuriItemsNotifier extends StateNotifier<AsyncValue<List<GalmuriItem>>>
         try {
           final request = CaptureRequest(
             userId: item.userId,
+            itemId: item.id,
             imageData: item.imageData,
             sourceUrl: item.sourceUrl,
             pageTitle: item.pageTitle,
@@ -152,7 +162,7 @@ class GalmuriItemsNotifier extends StateNotifier<AsyncValue<List<GalmuriItem>>>
             platform: item.platform.value,
           );
           
-          final syncedItem = await apiClient.capture(request);
+          final syncedItem = await apiClient.uploadCapture(request);
           await _repository.save(syncedItem);
         } catch (e) {
           print('Failed to sync item ${item.id}: $e');
@@ -0,0 +1,183 @@
+"""
+Search autocomplete
+Per-user sorted term arrays built from titles, memos and OCR text. Terms
+are kept in decomposed (NFD) form, so a prefix typed mid-syllable on a
+Korean keyboard ("배다" while typing "배달") still matches.
+"""
+import asyncio
+import heapq
+import re
+import sys
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Set, Tuple
+from uuid import UUID
+
+from domain.entities import GalmuriItem
+from domain.repositories import IGalmuriRepository
+from domain.search import normalize_text
+
+MIN_TERM_CHARS = 2
+MAX_TERM_CHARS = 40
+# Top terms are cached for prefixes up to this many jamo/letters, whose ranges are large
+CACHED_PREFIX_CHARS = 3
+CACHED_SUGGESTIONS = 50
+_WORD = re.compile(r"\w+")
+
+
+def _key(text: str) -> str:
+    return unicodedata.normalize("NFD", text)
+
+
+def item_terms(item: GalmuriItem) -> Set[str]:
+    """
+    Distinct terms of an item's title, memo and OCR text, as sort keys
+
+    Lengths are counted in decomposed characters, so a single Hangul
+    syllable (two or three jamo) is a term and a single letter is not.
+    """
+    text = _key(normalize_text(f"{item.page_title}\n{item.memo_content}\n{item.ocr_text}"))
+    return {
+        sys.intern(word) for word in set(_WORD.findall(text))
+        if MIN_TERM_CHARS <= len(word) <= MAX_TERM_CHARS and not word.isdigit()
+    }
+
+
+class _UserTerms:
+    """One user's terms with the number of items containing each"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.sorted_keys: List[str] = []
+        self.item_terms: Dict[UUID, Tuple[str, ...]] = {}
+        self._top: Dict[str, List[Tuple[int, str]]] = {}
+
+    @classmethod
+    def build(cls, items: List[GalmuriItem]) -> "_UserTerms":
+        """Terms of many items, sorted once"""
+        user_terms = cls()
+        counts: Counter = Counter()
+        for item in items:
+            terms = item_terms(item)
+            user_terms.item_terms[item.id] = tuple(terms)
+            counts.update(terms)
+        user_terms.counts = dict(counts)
+        user_terms.sorted_keys = sorted(counts)
+        return user_terms
+
+    def put(self, item_id: UUID, terms: Set[str]) -> None:
+        old = set(self.item_terms.get(item_id, ()))
+        if old == terms:
+            return
+        self._change(old - terms, -1)
+        self._change(terms - old, 1)
+        self.item_terms[item_id] = tuple(terms)
+
+    def discard(self, item_id: UUID) -> bool:
+        terms = self.item_terms.pop(item_id, None)
+        if terms is None:
+            return False
+        self._change(terms, -1)
+        return True
+
+    def _change(self, keys: Iterable[str], delta: int) -> None:
+        for key in keys:
+            count = self.counts.get(key, 0) + delta
+            if count > 0:
+                if key not in self.counts:
+                    insort(self.sorted_keys, key)
+                self.counts[key] = count
+            elif key in self.counts:
+                del self.counts[key]
+                del self.sorted_keys[bisect_left(self.sorted_keys, key)]
+            for length in range(1, min(len(key), CACHED_PREFIX_CHARS) + 1):
+                self._top.pop(key[:length], None)
+
+    def complete(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        """(count, key) of the most frequent terms starting with prefix"""
+        if len(prefix) <= CACHED_PREFIX_CHARS:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._top[prefix] = self._scan(prefix, CACHED_SUGGESTIONS)
+            if limit <= CACHED_SUGGESTIONS:
+                return top[:limit]
+        return self._scan(prefix, limit)
+
+    def _scan(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        start = bisect_left(self.sorted_keys, prefix)
+        end = bisect_left(self.sorted_keys, prefix + "\U0010ffff", start)
+        keys = self.sorted_keys[start:end]
+        return heapq.nsmallest(limit, ((-self.counts[key], key) for key in keys))
+
+
+class AutocompleteIndex:
+    """
+    Per-user term arrays, built from the repository on first use, kept
+    current from item saves and deletes, least recently used evicted
+    """
+
+    def __init__(self, max_users: int = 64):
+        """
+        Initialize index
+
+        Args:
+            max_users: Users kept in memory before the least recently used is evicted
+        """
+        self.max_users = max_users
+        self._users: "OrderedDict[UUID, _UserTerms]" = OrderedDict()
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    async def _load(self, user_id: UUID, repository: IGalmuriRepository) -> _UserTerms:
+        """A user's terms, loading them on first use"""
+        terms = self._users.get(user_id)
+        if terms is not None:
+            self._users.move_to_end(user_id)
+            return terms
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            terms = self._users.get(user_id)
+            if terms is None:
+                items = await repository.find_search_texts(user_id)
+                terms = await asyncio.to_thread(_UserTerms.build, items)
+                self._users[user_id] = terms
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return terms
+
+    async def complete(
+        self,
+        user_id: UUID,
+        text: str,
+        repository: IGalmuriRepository,
+        limit: int = 10
+    ) -> List[Tuple[str, int]]:
+        """
+        Complete the last word of text
+
+        Returns:
+            (suggestion, number of items containing the term) pairs, most
+            common first; a suggestion is text with its last word completed
+        """
+        words = normalize_text(text).split(" ")
+        prefix = _key(words[-1])
+        if not prefix or text[-1:].isspace():
+            # Nothing typed yet, or the last word is finished
+            return []
+        terms = await self._load(user_id, repository)
+        head = " ".join(words[:-1])
+        return [
+            (f"{head} {unicodedata.normalize('NFC', key)}".lstrip(), -negative_count)
+            for negative_count, key in terms.complete(prefix, limit)
+        ]
+
+    def add(self, item: GalmuriItem) -> None:
+        """Index an item's current terms (users not loaded yet pick them up on first use)"""
+        terms = self._users.get(item.user_id)
+        if terms is not None:
+            terms.put(item.id, item_terms(item))
+
+    def remove(self, item_id: UUID) -> None:
+        """Drop a deleted item from whichever user's terms hold it"""
+        for terms in self._users.values():
+            if terms.discard(item_id):
+                return
@@ -0,0 +1,144 @@
+"""
+Image tier compactor
+Moves images older than a cutoff out of database rows and hot blob
+files into the cold blob tier; item IDs and the API are unchanged,
+images are resolved through their blob key in either tier
+"""
+import asyncio
+import base64
+import hashlib
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from domain.entities import BLOB_REFERENCE_PREFIX, GalmuriItem
+from domain.repositories import IBlobStore, IGalmuriRepository
+from application.document_service import sniff_document_kind
+from application.image_store import ImageStore, sniff_mime_type, split_data_url
+
+
+class ImageCompactor:
+    """
+    Compacts old images into the cold tier
+
+    Decoding, hashing and the cold tier's compression and writes run in
+    worker threads, so a pass running in the server does not block requests.
+    """
+
+    def __init__(
+        self,
+        repository: IGalmuriRepository,
+        hot: IBlobStore,
+        cold: IBlobStore,
+        min_age_days: float = 30,
+        batch_size: int = 100
+    ):
+        """
+        Initialize compactor
+
+        Args:
+            repository: Items whose inline images are moved out of the rows
+            hot: Blob tier images are written to at capture time
+            cold: Pack tier old images are moved to
+            min_age_days: Only images older than this are moved
+            batch_size: Items loaded from the repository at once
+        """
+        self.repository = repository
+        self.hot = hot
+        self.cold = cold
+        self.min_age_days = min_age_days
+        self.batch_size = batch_size
+
+    async def run(self, limit: int = 10000) -> dict:
+        """
+        Run one compaction pass
+
+        Args:
+            limit: Maximum number of images moved from each source
+
+        Returns:
+            Report of items and blobs moved, bytes and elapsed time
+        """
+        started = time.perf_counter()
+        report = {"items": 0, "item_bytes": 0, "blobs": 0, "blob_bytes": 0, "skipped": 0}
+
+        # 1. Inline images in database rows, paged by (created_at, id) so
+        # rows that stay inline (documents, undecodable data) are read once
+        cutoff = datetime.now() - timedelta(days=self.min_age_days)
+        after = None
+        while report["items"] < limit:
+            items = await self.repository.find_inline_images(cutoff, limit=self.batch_size, after=after)
+            if not items:
+                break
+            after = (items[-1].created_at, items[-1].id)
+            for item in items:
+                if report["items"] >= limit:
+                    break
+                moved = await self._move_inline(item)
+                if moved:
+                    report["items"] += 1
+                    report["item_bytes"] += moved
+                else:
+                    report["skipped"] += 1
+                # Let requests run between items when compacting in the server
+                await asyncio.sleep(0)
+
+        # 2. Image files in the hot blob tier
+        modified_before = time.time() - self.min_age_days * 86400
+        for key in list(self.hot.iter_keys("images/", modified_before=modified_before)):
+            if report["blobs"] >= limit:
+                break
+            data = await self.hot.get(key)
+            if data is None:
+                continue
+            # Packs are append-only: content already there is not written again
+            if not await self.cold.exists(key):
+                await self.cold.put(key, data)
+            await self.hot.delete(key)
+            report["blobs"] += 1
+            report["blob_bytes"] += len(data)
+            await asyncio.sleep(0)
+
+        report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return report
+
+    async def _move_inline(self, item: GalmuriItem) -> int:
+        """Move one item's inline image to the cold tier; returns bytes moved"""
+        # Documents stay inline: OCR and thumbnails detect them from image_data
+        if not item.image_data or sniff_document_kind(item.image_data):
+            return 0
+        try:
+            data, digest = await asyncio.to_thread(self._decode_inline, item.image_data)
+        except Exception:
+            return 0
+
+        key = ImageStore.key(digest, sniff_mime_type(data[:16]))
+
+        # Check for a concurrent update (memo, OCR) before writing, so an
+        # aborted move leaves no dead bytes in the append-only packs
+        if await self._reload_unchanged(item) is None:
+            return 0
+        # Shared content (same image captured twice) is packed once
+        if not await self.cold.exists(key):
+            await self.cold.put(key, data)
+
+        # Re-read so an update made during the write is not overwritten
+        current = await self._reload_unchanged(item)
+        if current is None:
+            return 0
+        current.image_data = BLOB_REFERENCE_PREFIX + key
+        await self.repository.save(current)
+        return len(data)
+
+    async def _reload_unchanged(self, item: GalmuriItem) -> Optional[GalmuriItem]:
+        """The stored item, if it still has the image it was loaded with"""
+        current = await self.repository.find_by_id(item.id)
+        if current is None or current.image_data != item.image_data:
+            return None
+        return current
+
+    @staticmethod
+    def _decode_inline(image_data: str) -> Tuple[bytes, str]:
+        """Bytes of an inline (base64) image and their SHA-256"""
+        data = base64.b64decode(split_data_url(image_data)[1])
+        return data, hashlib.sha256(data).hexdigest()
@@ -0,0 +1,101 @@
+"""
+Delta-encoded recaptures
+A recapture is sent as the blocks that changed since a base image; the
+server pastes them onto the base and checks the result against the
+client's pixel hash before the capture is ingested like any other
+"""
+import hashlib
+from dataclasses import dataclass
+from io import BytesIO
+from typing import List, Optional, Union
+
+from PIL import Image
+
+from application.ingest import ImageDecodeError, decode_image
+
+# Tile edge clients compare and send (blocks may be any size, this is a hint)
+BLOCK_SIZE = 64
+
+
+class DeltaError(ValueError):
+    """Raised when a delta cannot be applied or does not reproduce the image"""
+
+
+@dataclass
+class DeltaBlock:
+    """Changed pixels placed at (x, y) in the new image"""
+    x: int
+    y: int
+    image_data: Union[str, bytes]  # Base64 or encoded bytes of the block
+
+
+def pixel_digest(image: Image.Image) -> str:
+    """SHA-256 of the image's RGBA pixels, row by row (what a canvas getImageData() holds)"""
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    return hashlib.sha256(image.tobytes()).hexdigest()
+
+
+def apply_delta(
+    base_data: Union[str, bytes],
+    width: int,
+    height: int,
+    blocks: List[DeltaBlock],
+    pixel_sha256: str,
+    max_pixels: Optional[int] = None
+) -> bytes:
+    """
+    Rebuild a full image from a base image and changed blocks (blocking)
+
+    The new image may be larger or smaller than the base; areas outside
+    the base must be covered by blocks.
+
+    Args:
+        base_data: Encoded base image (bytes or base64)
+        width: Width of the new image
+        height: Height of the new image
+        blocks: Changed blocks
+        pixel_sha256: Expected pixel_digest() of the new image
+        max_pixels: Largest image that may be rebuilt
+
+    Returns:
+        The new image encoded as PNG
+
+    Raises:
+        DeltaError: If a block is invalid or the result does not match
+    """
+    if width <= 0 or height <= 0 or (max_pixels and width * height > max_pixels):
+        raise DeltaError(f"Invalid image size {width}x{height}")
+
+    try:
+        base = decode_image(base_data, max_pixels=max_pixels)
+    except ImageDecodeError as e:
+        raise DeltaError(f"Base item image cannot be decoded: {str(e)}") from e
+    try:
+        canvas = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        canvas.paste(base.image.convert('RGBA'), (0, 0))
+    finally:
+        base.close()
+
+    for block in blocks:
+        try:
+            decoded = decode_image(block.image_data, max_pixels=max_pixels)
+        except ImageDecodeError as e:
+            raise DeltaError(f"Block at ({block.x}, {block.y}) cannot be decoded") from e
+        try:
+            block_width, block_height = decoded.image.size
+            if block.x < 0 or block.y < 0 or block.x + block_width > width or block.y + block_height > height:
+                raise DeltaError(f"Block at ({block.x}, {block.y}) lies outside the image")
+            canvas.paste(decoded.image.convert('RGBA'), (block.x, block.y))
+        finally:
+            decoded.close()
+
+    if pixel_digest(canvas) != pixel_sha256.lower():
+        raise DeltaError("Rebuilt image does not match the pixel hash")
+
+    # Screenshots are opaque; drop the alpha channel to keep the PNG small
+    if canvas.getextrema()[3] == (255, 255):
+        canvas = canvas.convert('RGB')
+    buffer = BytesIO()
+    canvas.save(buffer, format="PNG")
+    return buffer.getvalue()
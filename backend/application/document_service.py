@@ -0,0 +1,194 @@
+"""
+Multi-page document OCR (PDF and multi-frame TIFF)
+Pages are rasterized one at a time per worker and OCR'd in parallel,
+so memory is bounded by the number of workers, not the page count
+"""
+import asyncio
+import base64
+import threading
+from concurrent.futures import Executor
+from io import BytesIO
+from typing import Awaitable, Callable, List, Optional
+
+from application.ocr_service import IOCRService
+
+PDF = "pdf"
+TIFF = "tiff"
+
+MIME_TYPES = {PDF: "application/pdf", TIFF: "image/tiff"}
+
+# pdfium is not thread-safe: rendering is serialized, OCR is not
+_PDFIUM_LOCK = threading.Lock()
+
+
+class DocumentError(ValueError):
+    """Raised for unreadable or unsupported documents"""
+
+
+def sniff_document_kind(data: str) -> Optional[str]:
+    """
+    Detect a multi-page document from base64 data (or a data URL)
+
+    Only the first few bytes are decoded.
+
+    Returns:
+        PDF, TIFF or None for plain raster images
+    """
+    if data.startswith('data:'):
+        data = data.split(',', 1)[-1]
+    try:
+        head = base64.b64decode(data[:16])
+    except Exception:
+        return None
+
+    if head.startswith(b'%PDF'):
+        return PDF
+    if head[:4] in (b'II*\x00', b'MM\x00*'):
+        return TIFF
+    return None
+
+
+def decode_document(data: str) -> bytes:
+    """Decode base64 document data (with or without data URL prefix)"""
+    if data.startswith('data:'):
+        data = data.split(',', 1)[-1]
+    try:
+        return base64.b64decode(data)
+    except Exception as e:
+        raise DocumentError("Document data is not valid base64") from e
+
+
+def count_pages(document: bytes, kind: str) -> int:
+    """Number of pages without rendering any of them"""
+    if kind == PDF:
+        pdfium = _import_pdfium()
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(document)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+    from PIL import Image
+    with Image.open(BytesIO(document)) as image:
+        return getattr(image, 'n_frames', 1)
+
+
+def render_page(document: bytes, kind: str, index: int, dpi: int = 200):
+    """
+    Rasterize a single page (blocking)
+
+    The document is reopened per page so no worker holds more than
+    the page it is working on.
+
+    Returns:
+        PIL Image of the page
+    """
+    if kind == PDF:
+        pdfium = _import_pdfium()
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(document)
+            try:
+                page = pdf[index]
+                image = page.render(scale=dpi / 72).to_pil()
+                page.close()
+                return image
+            finally:
+                pdf.close()
+
+    from PIL import Image
+    with Image.open(BytesIO(document)) as image:
+        image.seek(index)
+        # copy() loads only the current frame
+        return image.copy()
+
+
+def _import_pdfium():
+    try:
+        import pypdfium2
+        return pypdfium2
+    except ImportError as e:
+        raise DocumentError(
+            "PDF capture requires pypdfium2. Please install it: pip install pypdfium2"
+        ) from e
+
+
+class DocumentOCRService:
+    """
+    Page-parallel OCR for multi-page documents
+    """
+
+    def __init__(
+        self,
+        ocr_service: IOCRService,
+        executor: Optional[Executor] = None,
+        max_parallel_pages: int = 2,
+        max_pages: int = 200,
+        dpi: int = 200
+    ):
+        """
+        Initialize document OCR service
+
+        Args:
+            ocr_service: OCR engine used for each page
+            executor: Executor used for rasterizing (default: loop executor)
+            max_parallel_pages: Pages rendered/OCR'd at once (bounds memory)
+            max_pages: Documents with more pages are rejected
+            dpi: Rasterization resolution for PDF pages
+        """
+        self.ocr_service = ocr_service
+        self.executor = executor
+        self.max_parallel_pages = max(1, max_parallel_pages)
+        self.max_pages = max_pages
+        self.dpi = dpi
+
+    async def extract_pages(
+        self,
+        document: bytes,
+        kind: str,
+        on_page: Optional[Callable[[int, str], Awaitable[None]]] = None
+    ) -> List[str]:
+        """
+        OCR every page of a document
+
+        Args:
+            document: Raw document bytes
+            kind: PDF or TIFF
+            on_page: Optional callback invoked as each page finishes
+                (pages may finish out of order)
+
+        Returns:
+            Extracted text per page, in page order
+
+        Raises:
+            DocumentError: If the document cannot be read or is too long
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            page_count = await loop.run_in_executor(self.executor, count_pages, document, kind)
+        except DocumentError:
+            raise
+        except Exception as e:
+            raise DocumentError(f"Unreadable {kind} document: {str(e)}") from e
+
+        if page_count > self.max_pages:
+            raise DocumentError(f"Document has {page_count} pages (limit {self.max_pages})")
+
+        pages: List[str] = [""] * page_count
+        slots = asyncio.Semaphore(self.max_parallel_pages)
+
+        async def process(index: int) -> None:
+            async with slots:
+                image = await loop.run_in_executor(
+                    self.executor, render_page, document, kind, index, self.dpi
+                )
+                try:
+                    text = await self.ocr_service.extract_text_from_image(image)
+                finally:
+                    image.close()
+            pages[index] = text
+            if on_page is not None:
+                await on_page(index, text)
+
+        await asyncio.gather(*(process(index) for index in range(page_count)))
+        return pages
@@ -0,0 +1,188 @@
+"""
+Image store
+A capture's image is kept either inline in image_data (base64 data URL)
+or in the blob store, with image_data holding a "blob:<key>" reference
+"""
+import base64
+import hashlib
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from domain.entities import BLOB_REFERENCE_PREFIX, GalmuriItem
+from domain.repositories import IBlobStore
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/tiff": ".tiff",
+    "application/pdf": ".pdf",
+}
+
+_MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"%PDF", "application/pdf"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+]
+
+
+def sniff_mime_type(head: bytes) -> str:
+    """Content type from the first bytes of an encoded image"""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for magic, mime_type in _MAGIC:
+        if head.startswith(magic):
+            return mime_type
+    return "application/octet-stream"
+
+
+def split_data_url(image_data: str) -> Tuple[Optional[str], str]:
+    """
+    Split a data URL into its declared content type and base64 payload
+
+    Returns:
+        (content type or None, base64 payload)
+    """
+    if image_data.startswith('data:'):
+        header, _, payload = image_data.partition(',')
+        mime_type = header[5:].split(';', 1)[0]
+        return (mime_type or None), payload
+    return None, image_data
+
+
+@dataclass
+class StoredImage:
+    """An item's image ready to be served"""
+    mime_type: str
+    size: int
+    etag: str                    # Strong validator (quoted SHA-256)
+    path: Optional[str] = None   # Set when the bytes are a local file
+    data: Optional[bytes] = None  # Set otherwise
+
+
+class ImageStore:
+    """
+    Reads and writes item images, inline or in the blob store
+    """
+
+    def __init__(self, blob_store: IBlobStore, externalize: bool = False):
+        """
+        Initialize image store
+
+        Args:
+            blob_store: Where externalized images are kept
+            externalize: Move new captures out of image_data into the blob store
+        """
+        self.blob_store = blob_store
+        self.externalize = externalize
+
+    @staticmethod
+    def is_reference(image_data: str) -> bool:
+        """True when image_data points into the blob store"""
+        return image_data.startswith(BLOB_REFERENCE_PREFIX)
+
+    @staticmethod
+    def key(digest: str, mime_type: str) -> str:
+        """Content-addressed blob key of an image"""
+        return f"images/{digest[:2]}/{digest}{EXTENSIONS.get(mime_type, '')}"
+
+    async def delete_blob(self, image_data: str) -> bool:
+        """
+        Delete the blob an image reference points to
+
+        Returns:
+            True if a blob was deleted (False for inline images)
+        """
+        if not self.is_reference(image_data):
+            return False
+        return await self.blob_store.delete(image_data[len(BLOB_REFERENCE_PREFIX):])
+
+    async def save(self, item: GalmuriItem, data: bytes, mime_type: str) -> bool:
+        """
+        Set an item's image, in the blob store when externalizing and
+        as an inline data URL otherwise
+
+        Identical images share one blob, so a blob is only deleted
+        (delete_blob()) once no item references it.
+
+        Args:
+            item: Item whose image_data is replaced
+            data: Encoded image bytes to store
+            mime_type: Content type of data
+
+        Returns:
+            True if the image was externalized
+        """
+        if not self.externalize:
+            item.image_data = f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+            return False
+        key = self.key(hashlib.sha256(data).hexdigest(), mime_type)
+        if self.blob_store.local_path(key) is None:
+            await self.blob_store.put(key, data)
+        item.image_data = BLOB_REFERENCE_PREFIX + key
+        return True
+
+    async def load(self, item: GalmuriItem) -> bytes:
+        """
+        Encoded image bytes of an item
+
+        Raises:
+            FileNotFoundError: If the referenced blob is missing
+        """
+        if self.is_reference(item.image_data):
+            key = item.image_data[len(BLOB_REFERENCE_PREFIX):]
+            data = await self.blob_store.get(key)
+            if data is None:
+                raise FileNotFoundError(f"Image blob missing: {key}")
+            return data
+        return base64.b64decode(split_data_url(item.image_data)[1])
+
+    async def load_image_data(self, item: GalmuriItem) -> str:
+        """Image as a base64 data URL, for consumers of inline image_data"""
+        if not self.is_reference(item.image_data):
+            return item.image_data
+        data = await self.load(item)
+        return f"data:{sniff_mime_type(data[:16])};base64,{base64.b64encode(data).decode('ascii')}"
+
+    async def open(self, item: GalmuriItem) -> StoredImage:
+        """
+        Prepare an item's image for serving
+
+        Blob-backed images on local disk are returned by path so they
+        can be sent as files; everything else is returned as bytes.
+
+        Raises:
+            FileNotFoundError: If the referenced blob is missing
+        """
+        if self.is_reference(item.image_data):
+            key = item.image_data[len(BLOB_REFERENCE_PREFIX):]
+            # Keys are content-addressed: the file name is the digest
+            digest = key.rsplit('/', 1)[-1].split('.', 1)[0]
+            etag = f'"{digest}"'
+            path = self.blob_store.local_path(key)
+            if path is not None:
+                with open(path, 'rb') as f:
+                    head = f.read(16)
+                    size = f.seek(0, 2)
+                return StoredImage(mime_type=sniff_mime_type(head), size=size, etag=etag, path=path)
+            data = await self.load(item)
+            return StoredImage(mime_type=sniff_mime_type(data[:16]), size=len(data), etag=etag, data=data)
+
+        declared_type, payload = split_data_url(item.image_data)
+        data = base64.b64decode(payload)
+        # Not content_hash: a transcoded image differs from the upload
+        digest = hashlib.sha256(data).hexdigest()
+        mime_type = sniff_mime_type(data[:16])
+        if mime_type == "application/octet-stream" and declared_type:
+            mime_type = declared_type
+        return StoredImage(
+            mime_type=mime_type,
+            size=len(data),
+            etag=f'"{digest}"',
+            data=data
+        )
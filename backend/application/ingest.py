@@ -0,0 +1,427 @@
+"""
+Capture ingest pipeline
+Decodes a capture once and hands the same pixel buffer to every consumer:
+content hashing, perceptual hashing, thumbnails, text detection and OCR
+preprocessing. Each stage is timed.
+
+Memory per capture is bounded: base64 is decoded in chunks into a spooled
+temporary file, dimensions are checked from the image header before any
+pixels are decoded, and images over the pixel budget are downsampled
+while decoding.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import math
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import IO, Callable, Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageFilter, ImageStat
+
+
+# Base64 characters decoded per step (a multiple of 4)
+BASE64_CHUNK_CHARS = 256 * 1024
+# Decoded bytes kept in memory before the spool moves to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class ImageDecodeError(ValueError):
+    """Raised when capture data is not a decodable image"""
+
+
+class ImageTooLargeError(ImageDecodeError):
+    """Raised when an image has more pixels than may be decoded"""
+
+
+@dataclass
+class DecodedImage:
+    """A capture decoded exactly once"""
+    image: Image.Image     # Fully loaded pixels (downsampled if over budget)
+    format: str            # PIL format name, e.g. "PNG"
+    source: Optional[IO[bytes]] = None  # Original encoded bytes (PNG, JPEG, ...)
+    digest: str = ""       # SHA-256 of the encoded bytes
+    size: int = 0          # Length of the encoded bytes
+    dimensions: Tuple[int, int] = (0, 0)  # Width and height before downsampling
+    downsampled: bool = False
+
+    @property
+    def mime_type(self) -> str:
+        return Image.MIME.get(self.format, "application/octet-stream")
+
+    @property
+    def data(self) -> bytes:
+        """Read the encoded bytes back from the spool"""
+        if self.source is None:
+            return b""
+        self.source.seek(0)
+        return self.source.read()
+
+    def release_pixels(self) -> None:
+        """Free the pixel buffer but keep the spool readable"""
+        # ImageFile.close() would also close the file the image was read from
+        Image.Image.close(self.image)
+
+    def close(self) -> None:
+        """Release the pixel buffer and the spool"""
+        self.image.close()
+        if self.source is not None:
+            self.source.close()
+
+
+@dataclass
+class IngestResult:
+    """Everything the pipeline derived from one capture"""
+    content_hash: str = ""                  # SHA-256 of the encoded bytes
+    perceptual_hash: str = ""               # 64-bit dHash, hex
+    thumbnails: Dict[int, bytes] = field(default_factory=dict)  # size -> WebP bytes
+    text_score: float = 0.0                 # Edge density used for text detection
+    has_text: bool = True
+    ocr_image: Optional[Image.Image] = None  # Preprocessed image for OCR
+    width: int = 0
+    height: int = 0
+    mime_type: str = ""                     # Content type of stored_data
+    stored_data: bytes = b""                # Encoded bytes to keep for the item
+    original_size: int = 0                  # Size of the uploaded bytes
+    transcoded: bool = False                # stored_data differs from the upload
+    downsampled: bool = False               # Stages saw a reduced copy of the pixels
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> ms
+
+
+Stage = Callable[[DecodedImage, IngestResult], None]
+
+
+def spool_base64(image_data: str, max_memory: int = SPOOL_MAX_MEMORY) -> Tuple[IO[bytes], str, int]:
+    """
+    Decode base64 (with or without data URL prefix) in chunks into a
+    spooled temporary file, hashing as it goes
+
+    Only one chunk of decoded bytes is held at a time; large images end
+    up on disk instead of next to the base64 string in memory.
+
+    Returns:
+        (spool positioned at 0, SHA-256 hex digest, decoded size)
+
+    Raises:
+        ImageDecodeError: If the data is not valid base64
+    """
+    start = image_data.index(',') + 1 if image_data.startswith('data:') and ',' in image_data else 0
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    digest = hashlib.sha256()
+    size = 0
+    carry = ""
+    try:
+        for offset in range(start, len(image_data), BASE64_CHUNK_CHARS):
+            # Drop line breaks so every decoded piece stays 4-character aligned
+            piece = carry + "".join(image_data[offset:offset + BASE64_CHUNK_CHARS].split())
+            usable = len(piece) - len(piece) % 4
+            carry = piece[usable:]
+            chunk = base64.b64decode(piece[:usable])
+            digest.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+        if carry:
+            raise binascii.Error("Incorrect padding")
+    except (binascii.Error, ValueError) as e:
+        spool.close()
+        raise ImageDecodeError(f"Invalid image data: {str(e)}") from e
+    spool.seek(0)
+    return spool, digest.hexdigest(), size
+
+
+def decode_image(
+    image_data: Union[str, bytes],
+    pixel_budget: Optional[int] = None,
+    max_pixels: Optional[int] = None
+) -> DecodedImage:
+    """
+    Decode base64 image data (with or without data URL prefix) or raw bytes
+
+    Args:
+        image_data: Base64 string or encoded bytes
+        pixel_budget: Downsample images with more pixels than this while
+            decoding (no limit if None)
+        max_pixels: Reject images whose header declares more pixels than
+            this, before decoding them (no limit if None)
+
+    Raises:
+        ImageTooLargeError: If the image exceeds max_pixels
+        ImageDecodeError: If the data is not a readable image
+    """
+    if isinstance(image_data, bytes):
+        source: IO[bytes] = BytesIO(image_data)
+        digest, size = hashlib.sha256(image_data).hexdigest(), len(image_data)
+    else:
+        source, digest, size = spool_base64(image_data)
+
+    try:
+        # Image.open only parses the header; pixels are decoded by load()
+        image = Image.open(source)
+        width, height = image.size
+        downsampled = False
+        if pixel_budget and width * height > pixel_budget:
+            # JPEG can decode straight to a 1/2, 1/4 or 1/8 scale
+            scale = math.sqrt(pixel_budget / (width * height))
+            image.draft(image.mode, (math.ceil(width * scale), math.ceil(height * scale)))
+            downsampled = image.size != (width, height)
+        if max_pixels and image.size[0] * image.size[1] > max_pixels:
+            raise ImageTooLargeError(
+                f"Image is {width}x{height}; at most {max_pixels} pixels can be decoded"
+            )
+        image.load()
+        if pixel_budget and image.size[0] * image.size[1] > pixel_budget:
+            factor = math.ceil(math.sqrt(image.size[0] * image.size[1] / pixel_budget))
+            source_image = image
+            if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+                has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+                source_image = image.convert('RGBA' if has_alpha else 'RGB')
+            reduced = source_image.reduce(factor)
+            reduced.format = image.format
+            reduced.info = image.info
+            # Free the full-size pixels now; ImageFile.close() would close the spool
+            Image.Image.close(image)
+            image = reduced
+            downsampled = True
+    except ImageDecodeError:
+        source.close()
+        raise
+    except Exception as e:
+        source.close()
+        raise ImageDecodeError(f"Invalid image data: {str(e)}") from e
+    return DecodedImage(
+        image=image,
+        format=image.format or "",
+        source=source,
+        digest=digest,
+        size=size,
+        dimensions=(width, height),
+        downsampled=downsampled
+    )
+
+
+def content_hash_stage(decoded: DecodedImage, result: IngestResult) -> None:
+    """SHA-256 of the encoded bytes"""
+    result.content_hash = decoded.digest or hashlib.sha256(decoded.data).hexdigest()
+
+
+def perceptual_hash_stage(decoded: DecodedImage, result: IngestResult) -> None:
+    """64-bit difference hash (dHash) of the pixels"""
+    result.perceptual_hash = dhash(decoded.image)
+
+
+def dhash(image: Image.Image, hash_size: int = 8) -> str:
+    """
+    Difference hash: compares horizontally adjacent pixels of a
+    (hash_size+1) x hash_size grayscale thumbnail
+
+    Returns:
+        Hex string of hash_size * hash_size bits
+    """
+    small = image.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def make_thumbnail_stage(sizes: Tuple[int, ...], quality: int = 80) -> Stage:
+    """Create a stage rendering WebP thumbnails bounded by each size"""
+    def thumbnail_stage(decoded: DecodedImage, result: IngestResult) -> None:
+        source = decoded.image
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+        # Largest first, each one downscaled from the previous
+        for size in sorted(sizes, reverse=True):
+            thumb = source.copy()
+            thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            thumb.save(buffer, format="WEBP", quality=quality, method=4)
+            result.thumbnails[size] = buffer.getvalue()
+            source = thumb
+    return thumbnail_stage
+
+
+def make_text_presence_stage(threshold: float = 0.02) -> Stage:
+    """
+    Create a stage estimating whether an image contains text
+
+    Text produces dense, sharp edges; flat screenshots and photos
+    without text mostly do not.
+    """
+    def text_presence_stage(decoded: DecodedImage, result: IngestResult) -> None:
+        gray = decoded.image.convert('L')
+        gray.thumbnail((512, 512))
+        edges = gray.filter(ImageFilter.FIND_EDGES).point(lambda value: 255 if value > 64 else 0)
+        result.text_score = ImageStat.Stat(edges).mean[0] / 255
+        result.has_text = result.text_score >= threshold
+    return text_presence_stage
+
+
+def make_transcode_stage(lossless: bool = True, quality: int = 90) -> Stage:
+    """
+    Create a stage re-encoding captures as WebP for storage
+
+    Metadata (EXIF, XMP, PNG text chunks) is dropped; the ICC profile is
+    kept so colors don't shift. The upload is kept when the WebP is not
+    smaller.
+
+    Args:
+        lossless: Lossless WebP; otherwise lossy at `quality`
+        quality: Lossy quality, or compression effort when lossless
+    """
+    def transcode_stage(decoded: DecodedImage, result: IngestResult) -> None:
+        if decoded.format == "WEBP" or getattr(decoded.image, "n_frames", 1) > 1:
+            return
+        if decoded.downsampled:
+            # Storage keeps full resolution; only the stages see the reduced copy
+            return
+        if lossless and decoded.format == "JPEG":
+            # Lossless re-encoding of JPEG artifacts never pays off
+            return
+
+        image = decoded.image
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        options = {"lossless": lossless, "quality": quality, "method": 4}
+        icc_profile = decoded.image.info.get("icc_profile")
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+
+        buffer = BytesIO()
+        image.save(buffer, format="WEBP", **options)
+        if buffer.tell() < result.original_size:
+            result.stored_data = buffer.getvalue()
+            result.mime_type = "image/webp"
+            result.transcoded = True
+    return transcode_stage
+
+
+def ocr_preprocess_stage(decoded: DecodedImage, result: IngestResult) -> None:
+    """Grayscale copy for OCR (Tesseract binarizes internally)"""
+    image = decoded.image
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white so text stays readable
+        rgba = image.convert('RGBA')
+        background = Image.new('RGBA', rgba.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, rgba)
+    result.ocr_image = image.convert('L')
+
+
+class IngestPipeline:
+    """
+    Runs named stages over a single decoded capture
+    """
+
+    def __init__(
+        self,
+        stages: Optional[List[Tuple[str, Stage]]] = None,
+        executor: Optional[Executor] = None,
+        pixel_budget: Optional[int] = None,
+        max_pixels: Optional[int] = None
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            stages: Ordered (name, stage) pairs; defaults to default_stages()
+            executor: Executor for the CPU-bound work (default: loop executor)
+            pixel_budget: Stages see images downsampled to at most this many pixels
+            max_pixels: Larger images are rejected before decoding
+        """
+        self.stages = stages if stages is not None else default_stages()
+        self.executor = executor
+        self.pixel_budget = pixel_budget
+        self.max_pixels = max_pixels
+        self._totals: Dict[str, float] = defaultdict(float)
+        self._runs = 0
+        self._bytes_in = 0
+        self._bytes_stored = 0
+        self._lock = threading.Lock()
+
+    def run_sync(self, image_data: Union[str, bytes]) -> IngestResult:
+        """Decode once and run every stage (blocking)"""
+        result = IngestResult()
+
+        started = time.perf_counter()
+        decoded = decode_image(image_data, self.pixel_budget, self.max_pixels)
+        result.timings["decode"] = (time.perf_counter() - started) * 1000
+        result.width, result.height = decoded.dimensions
+        result.mime_type = decoded.mime_type
+        result.original_size = decoded.size
+        result.downsampled = decoded.downsampled
+
+        try:
+            for name, stage in self.stages:
+                started = time.perf_counter()
+                stage(decoded, result)
+                result.timings[name] = (time.perf_counter() - started) * 1000
+            # Read the upload back only after the pixel buffer is released
+            if not result.transcoded:
+                decoded.release_pixels()
+                result.stored_data = decoded.data
+        finally:
+            decoded.close()
+
+        with self._lock:
+            self._runs += 1
+            self._bytes_in += result.original_size
+            self._bytes_stored += len(result.stored_data)
+            for name, elapsed in result.timings.items():
+                self._totals[name] += elapsed
+        return result
+
+    async def run(self, image_data: Union[str, bytes]) -> IngestResult:
+        """Run the pipeline off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run_sync, image_data)
+
+    def stats(self) -> dict:
+        """Mean milliseconds per stage and bytes in/stored over all runs"""
+        with self._lock:
+            runs, totals = self._runs, dict(self._totals)
+            bytes_in, bytes_stored = self._bytes_in, self._bytes_stored
+        return {
+            "runs": runs,
+            "mean_ms": {name: round(total / runs, 3) for name, total in totals.items()} if runs else {},
+            "bytes_in": bytes_in,
+            "bytes_stored": bytes_stored,
+        }
+
+
+def default_stages(
+    thumbnail_sizes: Tuple[int, ...] = (),
+    text_threshold: float = 0.02,
+    transcode: Optional[str] = None,
+    transcode_quality: int = 90
+) -> List[Tuple[str, Stage]]:
+    """
+    Standard stage list
+
+    Args:
+        thumbnail_sizes: Thumbnail sizes to render (none if empty)
+        text_threshold: Edge density above which an image has text
+        transcode: "lossless" or "lossy" to re-encode as WebP (off if None)
+        transcode_quality: WebP quality for transcoding
+    """
+    stages: List[Tuple[str, Stage]] = [
+        ("content_hash", content_hash_stage),
+        ("perceptual_hash", perceptual_hash_stage),
+    ]
+    if transcode:
+        stages.append(("transcode", make_transcode_stage(transcode == "lossless", transcode_quality)))
+    if thumbnail_sizes:
+        stages.append(("thumbnails", make_thumbnail_stage(thumbnail_sizes)))
+    stages.append(("text_presence", make_text_presence_stage(text_threshold)))
+    stages.append(("ocr_preprocess", ocr_preprocess_stage))
+    return stages
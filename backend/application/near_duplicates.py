@@ -0,0 +1,227 @@
+"""
+Near-duplicate capture detection
+Items are indexed by their 64-bit perceptual hash (dHash) in per-user
+multi-index hash tables, so captures within a Hamming radius are found
+without comparing against every item
+"""
+import asyncio
+from functools import lru_cache
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from domain.repositories import IGalmuriRepository
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits"""
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHashTable:
+    """
+    Multi-index hashing over 64-bit hashes
+
+    Each hash is split into four 16-bit chunks, each with its own table.
+    If two hashes differ in at most r bits, some chunk differs in at most
+    r // 4 bits (pigeonhole), so a query probes every chunk variant
+    within that radius and verifies the few candidates it finds.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self):
+        self._tables: List[Dict[int, Set[int]]] = [{} for _ in range(self.CHUNKS)]
+        self._ids_by_hash: Dict[int, Set[UUID]] = {}
+        self._hash_of: Dict[UUID, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hash_of)
+
+    def _chunks(self, value: int) -> List[int]:
+        mask = (1 << self.CHUNK_BITS) - 1
+        return [(value >> (index * self.CHUNK_BITS)) & mask for index in range(self.CHUNKS)]
+
+    def add(self, item_id: UUID, value: int) -> None:
+        """Index an item (re-adding moves it to the new hash)"""
+        if self._hash_of.get(item_id) == value:
+            return
+        self.remove(item_id)
+        self._hash_of[item_id] = value
+        ids = self._ids_by_hash.setdefault(value, set())
+        if not ids:
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                table.setdefault(chunk, set()).add(value)
+        ids.add(item_id)
+
+    def remove(self, item_id: UUID) -> bool:
+        """Remove an item; returns False if it was not indexed"""
+        value = self._hash_of.pop(item_id, None)
+        if value is None:
+            return False
+        ids = self._ids_by_hash[value]
+        ids.discard(item_id)
+        if not ids:
+            del self._ids_by_hash[value]
+            for table, chunk in zip(self._tables, self._chunks(value)):
+                bucket = table[chunk]
+                bucket.discard(value)
+                if not bucket:
+                    del table[chunk]
+        return True
+
+    def query(self, value: int, radius: int) -> List[Tuple[int, UUID]]:
+        """
+        Find items within a Hamming radius
+
+        Returns:
+            (distance, item ID) pairs, closest first
+        """
+        candidates: Set[int] = set()
+        masks = flip_masks(self.CHUNK_BITS, radius // self.CHUNKS)
+        for table, chunk in zip(self._tables, self._chunks(value)):
+            for mask in masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates |= bucket
+
+        matches: List[Tuple[int, UUID]] = []
+        for candidate in candidates:
+            distance = hamming(candidate, value)
+            if distance <= radius:
+                matches.extend((distance, item_id) for item_id in self._ids_by_hash[candidate])
+        matches.sort(key=lambda match: (match[0], str(match[1])))
+        return matches
+
+    def items(self) -> List[Tuple[UUID, int]]:
+        """All (item ID, hash) pairs"""
+        return list(self._hash_of.items())
+
+
+@lru_cache(maxsize=None)
+def flip_masks(bits: int, radius: int) -> Tuple[int, ...]:
+    """Every mask of `bits` bits with at most `radius` bits set"""
+    masks = [0]
+    for count in range(1, min(radius, bits) + 1):
+        for positions in combinations(range(bits), count):
+            masks.append(sum(1 << position for position in positions))
+    return tuple(masks)
+
+
+class NearDuplicateIndex:
+    """
+    Per-user hash tables, loaded from the repository on first use and kept
+    current by the capture and delete endpoints
+    """
+
+    def __init__(self, radius: int = 6):
+        """
+        Initialize index
+
+        Args:
+            radius: Default Hamming radius (of 64 bits) for near-duplicates
+        """
+        self.radius = radius
+        self._trees: Dict[UUID, MultiIndexHashTable] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    @staticmethod
+    def parse(perceptual_hash: str) -> Optional[int]:
+        """Hash string to integer (None if empty or malformed)"""
+        try:
+            return int(perceptual_hash, 16) if perceptual_hash else None
+        except ValueError:
+            return None
+
+    async def tree(self, user_id: UUID, repository: IGalmuriRepository) -> MultiIndexHashTable:
+        """A user's table, loading it on first use"""
+        tree = self._trees.get(user_id)
+        if tree is not None:
+            return tree
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            tree = self._trees.get(user_id)
+            if tree is None:
+                tree = MultiIndexHashTable()
+                for item_id, perceptual_hash in await repository.find_perceptual_hashes(user_id):
+                    value = self.parse(perceptual_hash)
+                    if value is not None:
+                        tree.add(item_id, value)
+                self._trees[user_id] = tree
+        return tree
+
+    async def find(
+        self,
+        user_id: UUID,
+        perceptual_hash: str,
+        repository: IGalmuriRepository,
+        radius: Optional[int] = None,
+        exclude: Optional[UUID] = None
+    ) -> List[Tuple[int, UUID]]:
+        """
+        Find a user's items near a perceptual hash
+
+        Returns:
+            (distance, item ID) pairs, closest first
+        """
+        value = self.parse(perceptual_hash)
+        if value is None:
+            return []
+        tree = await self.tree(user_id, repository)
+        radius = self.radius if radius is None else radius
+        return [match for match in tree.query(value, radius) if match[1] != exclude]
+
+    async def groups(
+        self,
+        user_id: UUID,
+        repository: IGalmuriRepository,
+        radius: Optional[int] = None
+    ) -> List[List[UUID]]:
+        """
+        Group a user's items into near-duplicate clusters
+
+        Items are grouped transitively (A~B and B~C puts A, B, C together).
+
+        Returns:
+            Groups of two or more item IDs, largest first
+        """
+        tree = await self.tree(user_id, repository)
+        radius = self.radius if radius is None else radius
+        parent: Dict[UUID, UUID] = {}
+
+        def find_root(item_id: UUID) -> UUID:
+            while parent.get(item_id, item_id) != item_id:
+                item_id = parent[item_id]
+            return item_id
+
+        queried: Set[int] = set()
+        for item_id, value in tree.items():
+            if value in queried:
+                continue
+            queried.add(value)
+            for _, other in tree.query(value, radius):
+                root, other_root = find_root(item_id), find_root(other)
+                if root != other_root:
+                    parent[other_root] = root
+
+        groups: Dict[UUID, List[UUID]] = {}
+        for item_id, _ in tree.items():
+            groups.setdefault(find_root(item_id), []).append(item_id)
+        return sorted(
+            (sorted(group, key=str) for group in groups.values() if len(group) > 1),
+            key=lambda group: (-len(group), str(group[0]))
+        )
+
+    def add(self, user_id: UUID, item_id: UUID, perceptual_hash: str) -> None:
+        """Index a new item (users not loaded yet pick it up on first use)"""
+        tree = self._trees.get(user_id)
+        value = self.parse(perceptual_hash)
+        if tree is not None and value is not None:
+            tree.add(item_id, value)
+
+    def remove(self, item_id: UUID) -> None:
+        """Drop a deleted item from whichever user's table holds it"""
+        for tree in self._trees.values():
+            if tree.remove(item_id):
+                return
@@ -0,0 +1,272 @@
+"""
+OCR job scheduler
+Sits in front of the OCR executor and decides which job runs next:
+strict priority between classes, deficit round-robin between users
+"""
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+from uuid import UUID
+
+
+class OCRPriority(Enum):
+    """OCR priority class (declaration order is scheduling order)"""
+    INTERACTIVE = "INTERACTIVE"  # Fresh captures a user is looking at
+    SYNC = "SYNC"                # Uploads from device sync
+    BACKFILL = "BACKFILL"        # Reprocessing and recovery
+
+
+class SchedulerClosedError(RuntimeError):
+    """Raised when work is submitted to a scheduler that is shutting down"""
+
+
+@dataclass
+class OCRJob:
+    """A unit of OCR work owned by one user"""
+    user_id: UUID
+    item_id: UUID
+    run: Callable[[], Awaitable[None]]
+    priority: OCRPriority = OCRPriority.INTERACTIVE
+    cost: float = 1.0
+    verification: bool = False  # Spot check of an accepted client result
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class _DeficitRoundRobinQueue:
+    """
+    Per-class queue serving users with deficit round-robin
+    Each user with pending work gets `quantum` credit per turn and
+    spends `job.cost` per job, so a bulk importer cannot starve others
+    """
+
+    def __init__(self, quantum: float):
+        self.quantum = quantum
+        self._queues: Dict[UUID, Deque[OCRJob]] = {}
+        self._deficits: Dict[UUID, float] = {}
+        self._active: Deque[UUID] = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, job: OCRJob) -> None:
+        queue = self._queues.get(job.user_id)
+        if queue is None:
+            queue = self._queues[job.user_id] = deque()
+            self._deficits[job.user_id] = 0.0
+            self._active.append(job.user_id)
+        queue.append(job)
+        self._size += 1
+
+    def pop(self) -> Optional[OCRJob]:
+        while self._active:
+            user_id = self._active[0]
+            queue = self._queues[user_id]
+            job = queue[0]
+
+            if self._deficits[user_id] >= job.cost:
+                queue.popleft()
+                self._deficits[user_id] -= job.cost
+                self._size -= 1
+                if not queue:
+                    # Idle users don't bank credit
+                    self._active.popleft()
+                    del self._queues[user_id]
+                    del self._deficits[user_id]
+                return job
+
+            # Turn is over: next user gets its quantum
+            self._active.rotate(-1)
+            self._deficits[self._active[0]] += self.quantum
+        return None
+
+    def drain(self) -> List[OCRJob]:
+        """Remove and return every queued job"""
+        jobs = [job for queue in self._queues.values() for job in queue]
+        self._queues.clear()
+        self._deficits.clear()
+        self._active.clear()
+        self._size = 0
+        return jobs
+
+
+class FairOCRScheduler:
+    """
+    Fair, prioritized OCR scheduler
+
+    A fixed pool of worker tasks pulls jobs in priority order
+    (INTERACTIVE > SYNC > BACKFILL); within a class users are served
+    by deficit round-robin. Queue wait times are kept per class.
+    """
+
+    def __init__(self, workers: int = 2, quantum: float = 1.0, stats_window: int = 1024):
+        """
+        Initialize scheduler
+
+        Args:
+            workers: Number of OCR jobs allowed to run at once
+            quantum: Credit granted to a user per round-robin turn
+            stats_window: Number of recent queue waits kept per class
+        """
+        self.workers = max(1, workers)
+        self.quantum = quantum
+        self._classes = {priority: _DeficitRoundRobinQueue(quantum) for priority in OCRPriority}
+        self._waits = {priority: deque(maxlen=stats_window) for priority in OCRPriority}
+        self._completed = {priority: 0 for priority in OCRPriority}
+        self._failed = {priority: 0 for priority in OCRPriority}
+        self._worker_tasks: List[asyncio.Task] = []
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._in_flight: Dict[str, OCRJob] = {}
+        # Item ID -> number of its jobs waiting in any class
+        self._queued_items: Counter = Counter()
+        self._closed = False
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._worker_tasks)
+
+    @property
+    def is_closed(self) -> bool:
+        return self._closed
+
+    async def start(self) -> None:
+        """Start worker tasks on the running event loop"""
+        if self.is_running:
+            return
+        self._closed = False
+        self._pending = asyncio.Semaphore(self.queued())
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"ocr-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Cancel worker tasks (queued jobs are kept)"""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, job: OCRJob) -> None:
+        """
+        Queue a job
+
+        Must be called from the event loop; starts workers on first use
+
+        Raises:
+            SchedulerClosedError: If the scheduler is draining for shutdown
+        """
+        if self._closed:
+            raise SchedulerClosedError("OCR scheduler is shutting down")
+        self._classes[job.priority].push(job)
+        self._queued_items[job.item_id] += 1
+        if not self.is_running:
+            asyncio.get_running_loop().create_task(self.start())
+        else:
+            self._pending.release()
+
+    def queued(self) -> int:
+        """Number of jobs waiting to run"""
+        return sum(len(queue) for queue in self._classes.values())
+
+    def is_queued(self, item_id: UUID) -> bool:
+        """Whether a job for an item is waiting to run or running"""
+        return item_id in self._queued_items or any(job.item_id == item_id for job in self._in_flight.values())
+
+    def in_flight(self) -> int:
+        """Number of jobs currently running"""
+        return len(self._in_flight)
+
+    def idle_workers(self) -> int:
+        """Number of workers free to start a job submitted now without queueing"""
+        return max(0, self.workers - len(self._in_flight) - self.queued())
+
+    async def drain(self, timeout: float) -> dict:
+        """
+        Stop accepting work and let queued and running jobs finish
+
+        Args:
+            timeout: Seconds to wait before cancelling what is left
+
+        Returns:
+            Report with the number of jobs drained and the jobs deferred
+            (never started or cancelled mid-flight)
+        """
+        self._closed = True
+        completed_before = sum(self._completed.values()) + sum(self._failed.values())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(0.0, timeout)
+
+        while self.is_running and (self.queued() or self._in_flight) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+
+        await self.stop()
+        cancelled = list(self._in_flight.values())
+        queued = [job for queue in self._classes.values() for job in queue.drain()]
+        self._in_flight.clear()
+        self._queued_items.clear()
+
+        return {
+            "drained": sum(self._completed.values()) + sum(self._failed.values()) - completed_before,
+            "deferred": cancelled + queued,
+        }
+
+    def _next_job(self) -> Optional[OCRJob]:
+        for priority in OCRPriority:
+            job = self._classes[priority].pop()
+            if job is not None:
+                self._queued_items[job.item_id] -= 1
+                if not self._queued_items[job.item_id]:
+                    del self._queued_items[job.item_id]
+                return job
+        return None
+
+    async def _worker(self) -> None:
+        while True:
+            await self._pending.acquire()
+            job = self._next_job()
+            if job is None:
+                continue
+
+            self._waits[job.priority].append(time.monotonic() - job.enqueued_at)
+            worker_name = asyncio.current_task().get_name()
+            self._in_flight[worker_name] = job
+            try:
+                await job.run()
+                self._completed[job.priority] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed[job.priority] += 1
+                print(f"OCR job failed for item {job.item_id}: {str(e)}")
+            # Left in place when cancelled so drain() can report it
+            del self._in_flight[worker_name]
+
+    def stats(self) -> dict:
+        """Queue depth, throughput and queue-wait percentiles per class"""
+        return {
+            priority.value: {
+                "queued": len(self._classes[priority]),
+                "completed": self._completed[priority],
+                "failed": self._failed[priority],
+                "queue_wait_ms": _percentiles(self._waits[priority]),
+            }
+            for priority in OCRPriority
+        }
+
+
+def _percentiles(samples: Deque[float]) -> dict:
+    """Nearest-rank p50/p90/p99 of wait samples in milliseconds"""
+    if not samples:
+        return {"p50": None, "p90": None, "p99": None, "samples": 0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        index = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {"p50": rank(0.50), "p90": rank(0.90), "p99": rank(0.99), "samples": len(ordered)}
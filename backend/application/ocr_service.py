@@ -3,14 +3,18 @@ OCR Service for extracting text from images
 Follows Single Responsibility Principle
 """
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
 from typing import Optional
-import base64
-from io import BytesIO
+import asyncio
 
 
 class IOCRService(ABC):
     """Interface for OCR service"""
     
+    # Recorded on items so server and on-device results can be told apart
+    engine: str = ""
+    engine_version: str = ""
+    
     @abstractmethod
     async def extract_text(self, image_data: str) -> str:
         """
@@ -23,6 +27,19 @@ class IOCRService(ABC):
             Extracted text string
         """
         pass
+    
+    @abstractmethod
+    async def extract_text_from_image(self, image) -> str:
+        """
+        Extract text from an already decoded image
+        
+        Args:
+            image: PIL Image (e.g. a rasterized document page)
+            
+        Returns:
+            Extracted text string
+        """
+        pass
 
 
 class TesseractOCRService(IOCRService):
@@ -30,14 +47,25 @@ class TesseractOCRService(IOCRService):
     OCR service implementation using Tesseract
     """
     
-    def __init__(self, language: str = 'kor+eng'):
+    engine = "tesseract"
+    
+    def __init__(
+        self,
+        language: str = 'kor+eng',
+        executor: Optional[Executor] = None,
+        pixel_budget: Optional[int] = None
+    ):
         """
         Initialize Tesseract OCR service
         
         Args:
             language: Language code for OCR (default: 'kor+eng' for Korean and English)
+            executor: Executor that runs Tesseract (default: the event loop's executor)
+            pixel_budget: Downsample larger images while decoding them
         """
         self.language = language
+        self.executor = executor
+        self.pixel_budget = pixel_budget
         self._validate_tesseract()
     
     def _validate_tesseract(self) -> None:
@@ -45,7 +73,7 @@ class TesseractOCRService(IOCRService):
         try:
             import pytesseract
             # Test if tesseract is available
-            pytesseract.get_tesseract_version()
+            self.engine_version = str(pytesseract.get_tesseract_version())
         except Exception as e:
             raise RuntimeError(
                 "Tesseract is not installed or not found. "
@@ -62,33 +90,61 @@ class TesseractOCRService(IOCRService):
         Returns:
             Extracted text, empty string if extraction fails
         """
-        try:
-            import pytesseract
-            from PIL import Image
-            
-            # Decode base64 image
-            if image_data.startswith('data:image'):
-                # Remove data URL prefix if present
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            image = Image.open(BytesIO(image_bytes))
+        # Tesseract is CPU bound - keep it off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._extract_text_sync, image_data)
+    
+    async def extract_text_from_image(self, image) -> str:
+        """
+        Extract text from a PIL image using Tesseract
+        
+        Args:
+            image: PIL Image
             
-            # Perform OCR
-            text = pytesseract.image_to_string(
-                image,
-                lang=self.language,
-                config='--psm 6'  # Assume uniform block of text
-            )
+        Returns:
+            Extracted text, empty string if extraction fails
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._extract_image_text_sync, image)
+    
+    def _extract_text_sync(self, image_data: str) -> str:
+        """Decode and OCR an image (blocking)"""
+        try:
+            from application.ingest import decode_image
             
-            # Clean up extracted text
-            return self._clean_text(text)
+            decoded = decode_image(image_data, self.pixel_budget)
+            try:
+                return self._ocr_image(decoded.image)
+            finally:
+                decoded.close()
             
         except Exception as e:
             # Log error but don't raise - OCR failure shouldn't break the app
             print(f"OCR extraction failed: {str(e)}")
             return ""
     
+    def _extract_image_text_sync(self, image) -> str:
+        """OCR a decoded image (blocking)"""
+        try:
+            return self._ocr_image(image)
+        except Exception as e:
+            print(f"OCR extraction failed: {str(e)}")
+            return ""
+    
+    def _ocr_image(self, image) -> str:
+        """Run Tesseract on a PIL image and clean the result"""
+        import pytesseract
+        
+        # Perform OCR
+        text = pytesseract.image_to_string(
+            image,
+            lang=self.language,
+            config='--psm 6'  # Assume uniform block of text
+        )
+        
+        # Clean up extracted text
+        return self._clean_text(text)
+    
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
         if not text:
@@ -111,10 +167,16 @@ class MockOCRService(IOCRService):
     Returns predefined text without actual OCR processing
     """
     
+    engine = "mock"
+    
     def __init__(self, mock_text: str = "Mock OCR extracted text"):
         self.mock_text = mock_text
     
     async def extract_text(self, image_data: str) -> str:
         """Return mock text"""
         return self.mock_text
+    
+    async def extract_text_from_image(self, image) -> str:
+        """Return mock text"""
+        return self.mock_text
 
@@ -0,0 +1,90 @@
+"""
+Spot-checks OCR text produced on the client
+A configurable fraction of client results is re-run through the server
+OCR engine and compared, so a broken on-device engine shows up in stats
+"""
+import random
+import re
+from difflib import SequenceMatcher
+
+from domain.entities import GalmuriItem
+from application.ocr_service import IOCRService
+
+
+class ClientOCRVerifier:
+    """
+    Sampling verifier for client-side OCR results
+    """
+    
+    def __init__(self, sample_rate: float = 0.0, min_similarity: float = 0.6):
+        """
+        Initialize verifier
+        
+        Args:
+            sample_rate: Fraction of client results to verify (0.0 - 1.0)
+            min_similarity: Below this ratio the server result replaces the client text
+        """
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self.min_similarity = min_similarity
+        self.accepted = 0
+        self.verified = 0
+        self.replaced = 0
+        self._similarity_total = 0.0
+    
+    def record_accepted(self) -> None:
+        """Count a client result stored without server OCR"""
+        self.accepted += 1
+    
+    def should_verify(self) -> bool:
+        """Decide whether the next client result is sampled"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+    
+    def similarity(self, client_text: str, server_text: str) -> float:
+        """Similarity ratio of two OCR results, ignoring whitespace layout"""
+        client = self._normalize(client_text)
+        server = self._normalize(server_text)
+        if not client and not server:
+            return 1.0
+        return SequenceMatcher(None, client, server, autojunk=False).ratio()
+    
+    async def verify(self, item: GalmuriItem, image_data: str, ocr_service: IOCRService) -> bool:
+        """
+        Re-run OCR on the server and compare with the client result
+        
+        Args:
+            item: Item holding the client OCR result (updated in place on mismatch)
+            image_data: Base64 image to OCR
+            ocr_service: Server OCR engine
+            
+        Returns:
+            True if the server result replaced the client text
+        """
+        server_text = await ocr_service.extract_text(image_data)
+        ratio = self.similarity(item.ocr_text, server_text)
+        
+        self.verified += 1
+        self._similarity_total += ratio
+        
+        if ratio < self.min_similarity:
+            self.replaced += 1
+            print(
+                f"Client OCR for item {item.id} ({item.ocr_engine} {item.ocr_engine_version}) "
+                f"disagrees with server OCR (similarity {ratio:.2f}); using server result"
+            )
+            item.mark_ocr_completed(server_text, ocr_service.engine, ocr_service.engine_version)
+            return True
+        return False
+    
+    def stats(self) -> dict:
+        """Verification counters"""
+        return {
+            "accepted": self.accepted,
+            "sample_rate": self.sample_rate,
+            "verified": self.verified,
+            "replaced": self.replaced,
+            "mean_similarity": round(self._similarity_total / self.verified, 3) if self.verified else None,
+        }
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return re.sub(r'\s+', ' ', text or '').strip().lower()
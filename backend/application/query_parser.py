@@ -0,0 +1,138 @@
+"""
+Search query language
+
+    배달 "주문 내역" -광고 title:영수증 site:coupang.com
+    platform:mobile status:done after:2024-01-01 date:2024-03
+
+Words and "quoted phrases" must appear in the title, memo or OCR text;
+field:value narrows a match to one field; a leading - negates a clause.
+Date values are YYYY, YYYY-MM or YYYY-MM-DD; date: also takes A..B.
+"""
+import re
+from datetime import datetime
+from typing import Optional, Tuple
+
+from domain.entities import OCRStatus, Platform
+from domain.search import SearchQuery, TextFilter
+
+MAX_CLAUSES = 16
+MAX_VALUE_CHARS = 256
+
+_CLAUSE = re.compile(r'(-?)(?:([A-Za-z]+):)?(?:"([^"]*)"?|(\S+))')
+_PLATFORMS = {
+    "mobile": Platform.MOBILE_APP, "app": Platform.MOBILE_APP, "mobile_app": Platform.MOBILE_APP,
+    "web": Platform.WEB_EXTENSION, "extension": Platform.WEB_EXTENSION, "web_extension": Platform.WEB_EXTENSION,
+}
+_DATE = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+
+
+class QueryError(ValueError):
+    """Raised for queries that cannot be parsed or would scan everything"""
+
+
+def _date_range(value: str) -> Tuple[datetime, datetime]:
+    """[start, end) of a year, month or day"""
+    match = _DATE.match(value)
+    if not match:
+        raise QueryError(f"Invalid date '{value}' (use YYYY, YYYY-MM or YYYY-MM-DD)")
+    year, month, day = (int(part) if part else None for part in match.groups())
+    try:
+        if day is not None:
+            start = datetime(year, month, day)
+            return start, datetime.fromordinal(start.toordinal() + 1)
+        if month is not None:
+            start = datetime(year, month, 1)
+            return start, datetime(year + month // 12, month % 12 + 1, 1)
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    except ValueError:
+        raise QueryError(f"Invalid date '{value}'")
+
+
+def _narrow(query: SearchQuery, start: Optional[datetime], end: Optional[datetime]) -> None:
+    if start and (query.created_from is None or start > query.created_from):
+        query.created_from = start
+    if end and (query.created_until is None or end < query.created_until):
+        query.created_until = end
+
+
+def parse_query(text: str) -> SearchQuery:
+    """
+    Parse a query string
+
+    Raises:
+        QueryError: If a clause is invalid, there are more than MAX_CLAUSES,
+            or nothing but negations would bound the result
+    """
+    query = SearchQuery()
+    excluded_platforms, excluded_statuses = set(), set()
+    clauses = 0
+    positive = False
+
+    for match in _CLAUSE.finditer(text):
+        negated = match.group(1) == "-"
+        name = (match.group(2) or "").lower()
+        quoted = match.group(3) is not None
+        value = (match.group(3) if quoted else match.group(4)).strip()
+        if name and name not in ("title", "memo", "url", "site", "platform", "status", "after", "before", "date"):
+            # Not a field (e.g. "https://..."): the whole clause is a word
+            value = f"{match.group(2)}:{value}"
+            name = ""
+        if not value:
+            if name:
+                raise QueryError(f"Empty value for '{name}:'")
+            continue
+        if len(value) > MAX_VALUE_CHARS:
+            raise QueryError(f"Search terms are limited to {MAX_VALUE_CHARS} characters")
+
+        clauses += 1
+        if clauses > MAX_CLAUSES:
+            raise QueryError(f"Queries are limited to {MAX_CLAUSES} clauses")
+
+        if name in ("", "title", "memo", "url", "site"):
+            query.text_filters.append(TextFilter(field=name or "any", value=value, negated=negated))
+            positive = positive or not negated
+        elif name == "platform":
+            platform = _PLATFORMS.get(value.lower())
+            if platform is None:
+                raise QueryError(f"Unknown platform '{value}' (use web or mobile)")
+            (excluded_platforms.add if negated else query.platforms.append)(platform)
+        elif name == "status":
+            try:
+                status = OCRStatus(value.upper())
+            except ValueError:
+                raise QueryError(f"Unknown status '{value}' (use pending, done or failed)")
+            (excluded_statuses.add if negated else query.statuses.append)(status)
+        else:
+            if negated:
+                raise QueryError(f"'{name}:' cannot be negated")
+            if name == "after":
+                _narrow(query, _date_range(value)[0], None)
+            elif name == "before":
+                _narrow(query, None, _date_range(value)[0])
+            elif ".." in value:
+                first, last = value.split("..", 1)
+                _narrow(query, _date_range(first)[0], _date_range(last)[1])
+            else:
+                _narrow(query, *_date_range(value))
+            positive = True
+
+    if excluded_platforms:
+        query.platforms = [
+            platform for platform in (query.platforms or list(Platform)) if platform not in excluded_platforms
+        ]
+        if not query.platforms:
+            raise QueryError("Query excludes every platform")
+    if excluded_statuses:
+        query.statuses = [
+            status for status in (query.statuses or list(OCRStatus)) if status not in excluded_statuses
+        ]
+        if not query.statuses:
+            raise QueryError("Query excludes every status")
+    if query.created_from and query.created_until and query.created_from >= query.created_until:
+        raise QueryError("Date range is empty")
+    if query.platforms or query.statuses:
+        positive = True
+    if not positive:
+        # Negations alone would match (and scan) nearly everything
+        raise QueryError("Query needs at least one term or filter that is not negated")
+    return query
@@ -0,0 +1,376 @@
+"""
+Related captures
+Each item's title, memo and OCR text becomes a hashed TF-IDF vector (the
+hashing trick folds words and Korean sub-word bigrams into a fixed number
+of signed dimensions), stored int8-quantized in a per-user matrix. Related
+items are the top-k by cosine similarity, scored in batches; large users
+get an inverted-file (IVF) partitioning so a query scans only the
+partitions nearest to it. Users are evicted least recently used to stay
+within a memory budget.
+"""
+import asyncio
+import heapq
+import math
+import random
+import re
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+from domain.entities import GalmuriItem
+from domain.repositories import IGalmuriRepository
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python scoring; fine for a few thousand items per user
+    np = None
+
+DIMENSIONS = 256
+# Users with at least this many items get IVF partitions (with NumPy)
+IVF_MIN_ITEMS = 20_000
+IVF_PROBES = 8
+BATCH_ROWS = 16_384
+_WORD = re.compile(r"\w+")
+
+# Estimated memory of a row besides its vector (ID, row map, scale and
+# fingerprint), of a vector kept as a Python list, and of a learned
+# feature's document frequency (measured with tracemalloc)
+_ROW_BYTES = 240
+_LIST_VECTOR_BYTES = 3000
+_FEATURE_BYTES = 110
+
+
+def features(text: str) -> Counter:
+    """
+    Feature counts of text: whole words, plus character bigrams of
+    non-ASCII words so Korean words match across particles and compounds
+    ("배달의민족" shares the feature "배달" with the word "배달")
+    """
+    words = _WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+    tokens = list(words)
+    for word in words:
+        if len(word) > 2 and not word.isascii():
+            tokens += map(str.__add__, word, word[1:])
+    return Counter(tokens)
+
+
+def _feature_hash(feature: str) -> int:
+    return zlib.crc32(feature.encode())
+
+
+def _fingerprint(text: str) -> int:
+    return zlib.crc32(text.encode())
+
+
+def quantize(vector) -> Tuple[Sequence[int], float]:
+    """int8 components and the scale that restores them"""
+    if np is not None:
+        peak = float(np.abs(vector).max()) if len(vector) else 0.0
+        if peak == 0.0:
+            return np.zeros(len(vector), dtype=np.int8), 0.0
+        return np.rint(vector * (127 / peak)).astype(np.int8), peak / 127
+    peak = max((abs(value) for value in vector), default=0.0)
+    if peak == 0.0:
+        return [0] * len(vector), 0.0
+    return [round(value * 127 / peak) for value in vector], peak / 127
+
+
+class _Vectorizer:
+    """
+    Sublinear TF times smoothed IDF, folded into DIMENSIONS signed buckets
+    by each feature's CRC-32
+    """
+
+    def __init__(self):
+        self.document_frequency: Counter = Counter()
+        self.documents = 0
+
+    def learn(self, counts: Counter) -> None:
+        self.document_frequency.update(counts.keys())
+        self.documents += 1
+
+    def vector(self, counts: Counter):
+        """Unit-length vector (a NumPy array when NumPy is available)"""
+        if np is not None:
+            size = len(counts)
+            hashes = np.fromiter(map(_feature_hash, counts), np.int64, size)
+            frequency = np.fromiter(map(self.document_frequency.__getitem__, counts), np.float32, size)
+            weights = (1 + np.log(np.fromiter(counts.values(), np.float32, size))) * (
+                np.log((1 + self.documents) / (1 + frequency)) + 1
+            )
+            weights[(hashes & 0x100000) == 0] *= -1
+            vector = np.bincount(hashes % DIMENSIONS, weights, minlength=DIMENSIONS).astype(np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else vector
+
+        vector = [0.0] * DIMENSIONS
+        for feature, count in counts.items():
+            idf = math.log((1 + self.documents) / (1 + self.document_frequency[feature])) + 1
+            weight = (1 + math.log(count)) * idf
+            feature_hash = _feature_hash(feature)
+            vector[feature_hash % DIMENSIONS] += weight if feature_hash & 0x100000 else -weight
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+
+class _UserVectors:
+    """One user's quantized vectors; deleted rows keep their slot with scale 0 until rebuilt"""
+
+    def __init__(self):
+        self.vectorizer = _Vectorizer()
+        self.ids: List[Optional[UUID]] = []
+        self.row_of: Dict[UUID, int] = {}
+        self.scales: List[float] = []
+        self.fingerprints: List[int] = []  # CRC-32 of the text each row was built from
+        self.rows: List[List[int]] = []  # Without NumPy
+        self.matrix = None  # With NumPy: int8, rows x DIMENSIONS, grown by doubling
+        self.scale_array = None
+        self.centroids = None  # IVF: float32 partitions x DIMENSIONS
+        self.partitions: List = []
+        self.unpartitioned_from = 0  # Rows added after partitioning are always scanned
+        # Rows added, re-texted or deleted since the build; an item counts
+        # once however often it is saved (capture, then OCR completion)
+        self.changed: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    @property
+    def changes(self) -> int:
+        return len(self.changed)
+
+    def bytes(self) -> int:
+        """Estimated memory of the vectors, row bookkeeping and IDF weights"""
+        size = len(self.ids) * _ROW_BYTES + len(self.vectorizer.document_frequency) * _FEATURE_BYTES
+        if self.matrix is not None:
+            size += self.matrix.nbytes + self.scale_array.nbytes
+        else:
+            size += len(self.rows) * _LIST_VECTOR_BYTES
+        if self.centroids is not None:
+            size += self.centroids.nbytes + sum(partition.nbytes for partition in self.partitions)
+        return size
+
+    def put(self, item_id: UUID, vector, fingerprint: int) -> None:
+        components, scale = quantize(vector)
+        row = self.row_of.get(item_id)
+        if row is None:
+            row = len(self.ids)
+            self.ids.append(item_id)
+            self.scales.append(scale)
+            self.fingerprints.append(fingerprint)
+            self.row_of[item_id] = row
+        else:
+            self.scales[row] = scale
+            self.fingerprints[row] = fingerprint
+        if np is not None:
+            if self.matrix is None or row >= len(self.matrix):
+                grown = np.zeros((max(64, 2 * (row + 1)), DIMENSIONS), dtype=np.int8)
+                grown_scales = np.zeros(len(grown), dtype=np.float32)
+                if self.matrix is not None:
+                    grown[:len(self.matrix)] = self.matrix
+                    grown_scales[:len(self.scale_array)] = self.scale_array
+                self.matrix, self.scale_array = grown, grown_scales
+            self.matrix[row] = components
+            self.scale_array[row] = scale
+        elif row == len(self.rows):
+            self.rows.append(components)
+        else:
+            self.rows[row] = components
+        self.changed.add(row)
+
+    def discard(self, item_id: UUID) -> bool:
+        row = self.row_of.pop(item_id, None)
+        if row is None:
+            return False
+        self.ids[row] = None
+        self.scales[row] = 0.0
+        if np is not None:
+            self.scale_array[row] = 0.0
+        self.changed.add(row)
+        return True
+
+    def query_vector(self, item_id: UUID):
+        row = self.row_of[item_id]
+        if np is not None:
+            return self.matrix[row].astype(np.float32) * self.scale_array[row]
+        return [value * self.scales[row] for value in self.rows[row]]
+
+    def partition(self, rng: random.Random) -> None:
+        """k-means over a sample of rows; each row joins its nearest centroid"""
+        count = len(self.ids)
+        lists = int(math.sqrt(count))
+        vectors = self.matrix[:count].astype(np.float32) * self.scale_array[:count, None]
+        sample = vectors[rng.sample(range(count), min(count, 32 * lists))]
+        centroids = sample[rng.sample(range(len(sample)), lists)]
+        for _ in range(6):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for index in range(lists):
+                members = sample[assignment == index]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[index] = centroid / (np.linalg.norm(centroid) or 1.0)
+        assignment = np.concatenate([
+            np.argmax(vectors[start:start + BATCH_ROWS] @ centroids.T, axis=1)
+            for start in range(0, count, BATCH_ROWS)
+        ])
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(lists + 1))
+        self.centroids = centroids
+        self.partitions = [order[bounds[index]:bounds[index + 1]] for index in range(lists)]
+        self.unpartitioned_from = count
+
+    def top(self, query, k: int, exclude: Optional[int]) -> List[Tuple[float, int]]:
+        """Best (score, row) pairs, highest first"""
+        if np is None:
+            scored = (
+                (sum(a * b for a, b in zip(query, components)) * self.scales[row], row)
+                for row, components in enumerate(self.rows)
+                if self.scales[row] and row != exclude
+            )
+            return heapq.nlargest(k, scored)
+
+        count = len(self.ids)
+        if self.centroids is not None:
+            nearest = np.argsort(self.centroids @ query)[-IVF_PROBES:]
+            candidates = np.concatenate(
+                [self.partitions[index] for index in nearest]
+                + [np.arange(self.unpartitioned_from, count)]
+            )
+            batches = [candidates]
+        else:
+            batches = [np.arange(start, min(start + BATCH_ROWS, count)) for start in range(0, count, BATCH_ROWS)]
+
+        best_scores, best_rows = [], []
+        for rows in batches:
+            scores = (self.matrix[rows].astype(np.float32) @ query) * self.scale_array[rows]
+            if exclude is not None:
+                scores[rows == exclude] = 0.0
+            if len(scores) > k:
+                keep = np.argpartition(scores, -k)[-k:]
+                scores, rows = scores[keep], rows[keep]
+            best_scores.append(scores)
+            best_rows.append(rows)
+        scores, rows = np.concatenate(best_scores), np.concatenate(best_rows)
+        order = np.argsort(-scores, kind="stable")[:k]
+        return [(float(scores[index]), int(rows[index])) for index in order if scores[index] > 0]
+
+
+class RelatedItemsIndex:
+    """
+    Per-user vector matrices, built from the repository on first use and
+    kept current from item saves and deletes; a user's matrix (and its IDF
+    weights) is rebuilt once the items changed since the last build reach
+    half its size. Users are evicted least recently used once there are
+    more than max_users or their estimated memory exceeds max_bytes; the
+    most recently used one is always kept.
+    """
+
+    def __init__(self, min_similarity: float = 0.2, max_users: int = 32, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize index
+
+        Args:
+            min_similarity: Cosine similarity below which items are not related
+            max_users: Users kept in memory before the least recently used is evicted
+            max_bytes: Memory budget of the users kept, as estimated from
+                their vectors and IDF weights
+        """
+        self.min_similarity = min_similarity
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._users: "OrderedDict[UUID, _UserVectors]" = OrderedDict()
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+        self._rng = random.Random(0)
+
+    @staticmethod
+    def _build(items: List[GalmuriItem], rng: random.Random) -> _UserVectors:
+        vectors = _UserVectors()
+        texts = [(item.id, item.get_search_keywords()) for item in items]
+        counted = [(item_id, features(text), _fingerprint(text)) for item_id, text in texts]
+        for _, counts, _ in counted:
+            vectors.vectorizer.learn(counts)
+        for item_id, counts, fingerprint in counted:
+            vectors.put(item_id, vectors.vectorizer.vector(counts), fingerprint)
+        vectors.changed.clear()
+        if np is not None and len(vectors) >= IVF_MIN_ITEMS:
+            vectors.partition(rng)
+        return vectors
+
+    async def _load(self, user_id: UUID, repository: IGalmuriRepository) -> _UserVectors:
+        """A user's vectors, building them on first use or once they have drifted"""
+        vectors = self._users.get(user_id)
+        if vectors is not None and vectors.changes * 2 < max(len(vectors), 64):
+            self._users.move_to_end(user_id)
+            return vectors
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            vectors = self._users.get(user_id)
+            if vectors is None or vectors.changes * 2 >= max(len(vectors), 64):
+                items = await repository.find_search_texts(user_id)
+                vectors = await asyncio.to_thread(self._build, items, self._rng)
+                self._users[user_id] = vectors
+            self._users.move_to_end(user_id)
+            self._evict()
+        return vectors
+
+    def _evict(self) -> None:
+        """Drop least recently used users over the user or memory bound"""
+        while len(self._users) > 1 and (
+            len(self._users) > self.max_users or self.bytes() > self.max_bytes
+        ):
+            self._users.popitem(last=False)
+
+    def bytes(self) -> int:
+        """Estimated memory of the users in memory"""
+        return sum(vectors.bytes() for vectors in self._users.values())
+
+    def stats(self) -> dict:
+        """Users in memory and their estimated size"""
+        return {"users": len(self._users), "bytes": self.bytes(), "max_bytes": self.max_bytes}
+
+    async def related(
+        self,
+        item: GalmuriItem,
+        repository: IGalmuriRepository,
+        limit: int = 10
+    ) -> List[Tuple[float, UUID]]:
+        """
+        Find a user's items most similar to an item
+
+        Returns:
+            (cosine similarity, item ID) pairs, most similar first
+        """
+        vectors = await self._load(item.user_id, repository)
+        if item.id not in vectors.row_of:
+            self.add(item)
+        row = vectors.row_of[item.id]
+        if not vectors.scales[row]:
+            return []  # No text
+        matches = vectors.top(vectors.query_vector(item.id), limit, exclude=row)
+        return [
+            (score, vectors.ids[match_row])
+            for score, match_row in matches
+            if score >= self.min_similarity
+        ]
+
+    def add(self, item: GalmuriItem) -> None:
+        """Index an item's current text (users not loaded yet pick it up on first use)"""
+        vectors = self._users.get(item.user_id)
+        if vectors is not None:
+            text = item.get_search_keywords()
+            fingerprint = _fingerprint(text)
+            row = vectors.row_of.get(item.id)
+            if row is not None and vectors.fingerprints[row] == fingerprint:
+                return  # Saves that leave the text alone (sync, image moves)
+            counts = features(text)
+            if row is None:
+                vectors.vectorizer.learn(counts)
+            vectors.put(item.id, vectors.vectorizer.vector(counts), fingerprint)
+            self._evict()
+
+    def remove(self, item_id: UUID) -> None:
+        """Drop a deleted item from whichever user's matrix holds it"""
+        for vectors in self._users.values():
+            if vectors.discard(item_id):
+                return
@@ -0,0 +1,209 @@
+"""
+Same-text detection for OCR results
+Each item's OCR text gets a MinHash signature over character shingles;
+per-user locality-sensitive hashing (LSH) buckets turn "which items have
+this text" into a few dictionary lookups instead of a pairwise scan
+"""
+import asyncio
+import hashlib
+import random
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+from domain.repositories import IGalmuriRepository
+
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 5
+# Texts shorter than this (after removing whitespace) are not signed;
+# short strings like "OK" or a lone date would match everything alike
+MIN_TEXT_CHARS = 30
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(0x6A1)  # Fixed seed: stored signatures must stay comparable
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERMUTATIONS)
+]
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Character shingles of text with whitespace removed
+
+    Ignoring whitespace makes the same article at a different layout
+    (line breaks, column widths) produce the same shingles; character
+    shingles need no word segmentation, which matters for Korean.
+    """
+    normalized = "".join(text.lower().split())
+    if len(normalized) < size:
+        return {normalized} if normalized else set()
+    return {normalized[index:index + size] for index in range(len(normalized) - size + 1)}
+
+
+def text_signature(text: str) -> str:
+    """
+    MinHash signature of OCR text
+
+    Returns:
+        NUM_PERMUTATIONS 32-bit values as hex, or "" if the text is too short
+    """
+    if len("".join(text.split())) < MIN_TEXT_CHARS:
+        return ""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for shingle in shingles(text)
+    ]
+    values = []
+    for a, b in _PERMUTATIONS:
+        values.append(min((a * value + b) % _MERSENNE_PRIME for value in hashes) & 0xFFFFFFFF)
+    return "".join(f"{value:08x}" for value in values)
+
+
+def similarity(first: str, second: str) -> float:
+    """Estimated Jaccard similarity of two signatures (share of equal values)"""
+    if not first or len(first) != len(second):
+        return 0.0
+    equal = sum(first[index:index + 8] == second[index:index + 8] for index in range(0, len(first), 8))
+    return equal / (len(first) // 8)
+
+
+class TextDuplicateIndex:
+    """
+    Per-user LSH index over MinHash signatures
+
+    A signature is cut into `bands` bands; items sharing any band are
+    candidates and are then checked against the threshold. With 16 bands
+    of 4 values, pairs at 0.8 similarity are found with >99.9% probability
+    and pairs below 0.3 rarely become candidates.
+    """
+
+    def __init__(self, threshold: float = 0.8, bands: int = 16):
+        """
+        Initialize index
+
+        Args:
+            threshold: Estimated Jaccard similarity at which texts count as the same
+            bands: LSH bands (NUM_PERMUTATIONS must divide evenly)
+        """
+        self.threshold = threshold
+        self.bands = bands
+        self._band_chars = NUM_PERMUTATIONS // bands * 8
+        self._buckets: Dict[UUID, Dict[Tuple[int, str], Set[UUID]]] = {}
+        self._signatures: Dict[UUID, Dict[UUID, str]] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    def _bands(self, signature: str) -> List[Tuple[int, str]]:
+        return [
+            (band, signature[band * self._band_chars:(band + 1) * self._band_chars])
+            for band in range(self.bands)
+        ]
+
+    async def _load(self, user_id: UUID, repository: IGalmuriRepository) -> Dict[UUID, str]:
+        """A user's signatures, loading the index on first use"""
+        signatures = self._signatures.get(user_id)
+        if signatures is not None:
+            return signatures
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            if user_id not in self._signatures:
+                self._signatures[user_id] = {}
+                self._buckets[user_id] = {}
+                for item_id, signature in await repository.find_text_signatures(user_id):
+                    self._insert(user_id, item_id, signature)
+        return self._signatures[user_id]
+
+    def _insert(self, user_id: UUID, item_id: UUID, signature: str) -> None:
+        self._remove(user_id, item_id)
+        if len(signature) != NUM_PERMUTATIONS * 8:
+            return
+        self._signatures[user_id][item_id] = signature
+        buckets = self._buckets[user_id]
+        for key in self._bands(signature):
+            buckets.setdefault(key, set()).add(item_id)
+
+    def _remove(self, user_id: UUID, item_id: UUID) -> bool:
+        signature = self._signatures[user_id].pop(item_id, None)
+        if signature is None:
+            return False
+        buckets = self._buckets[user_id]
+        for key in self._bands(signature):
+            bucket = buckets.get(key)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del buckets[key]
+        return True
+
+    async def find(
+        self,
+        user_id: UUID,
+        signature: str,
+        repository: IGalmuriRepository,
+        exclude: Optional[UUID] = None
+    ) -> List[Tuple[float, UUID]]:
+        """
+        Find a user's items whose text matches a signature
+
+        Returns:
+            (similarity, item ID) pairs, most similar first
+        """
+        if not signature:
+            return []
+        signatures = await self._load(user_id, repository)
+        buckets = self._buckets[user_id]
+        candidates: Set[UUID] = set()
+        for key in self._bands(signature):
+            candidates |= buckets.get(key, set())
+        candidates.discard(exclude)
+
+        matches = []
+        for item_id in candidates:
+            score = similarity(signature, signatures[item_id])
+            if score >= self.threshold:
+                matches.append((score, item_id))
+        matches.sort(key=lambda match: (-match[0], str(match[1])))
+        return matches
+
+    async def report(self, user_id: UUID, repository: IGalmuriRepository) -> List[List[UUID]]:
+        """
+        Group a user's items with the same text
+
+        Items are grouped transitively, like near-duplicate images.
+
+        Returns:
+            Groups of two or more item IDs, largest first
+        """
+        signatures = await self._load(user_id, repository)
+        parent: Dict[UUID, UUID] = {}
+
+        def find_root(item_id: UUID) -> UUID:
+            while parent.get(item_id, item_id) != item_id:
+                item_id = parent[item_id]
+            return item_id
+
+        for item_id, signature in list(signatures.items()):
+            for _, other in await self.find(user_id, signature, repository, exclude=item_id):
+                root, other_root = find_root(item_id), find_root(other)
+                if root != other_root:
+                    parent[other_root] = root
+
+        groups: Dict[UUID, List[UUID]] = {}
+        for item_id in signatures:
+            groups.setdefault(find_root(item_id), []).append(item_id)
+        return sorted(
+            (sorted(group, key=str) for group in groups.values() if len(group) > 1),
+            key=lambda group: (-len(group), str(group[0]))
+        )
+
+    def add(self, user_id: UUID, item_id: UUID, signature: str) -> None:
+        """Index an item's new signature (users not loaded yet pick it up on first use)"""
+        if user_id in self._signatures:
+            if signature:
+                self._insert(user_id, item_id, signature)
+            else:
+                self._remove(user_id, item_id)
+
+    def remove(self, item_id: UUID) -> None:
+        """Drop a deleted item from whichever user's index holds it"""
+        for user_id in self._signatures:
+            if self._remove(user_id, item_id):
+                return
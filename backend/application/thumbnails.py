@@ -0,0 +1,121 @@
+"""
+Thumbnail service
+Small WebP previews per item, generated at ingest or lazily on first
+request, and cached in the blob store
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, Optional, Tuple
+from uuid import UUID
+
+from domain.entities import GalmuriItem
+from domain.repositories import IBlobStore
+from application.document_service import decode_document, render_page, sniff_document_kind
+from application.image_store import ImageStore
+from application.ingest import DecodedImage, IngestResult, decode_image, make_thumbnail_stage
+
+
+class ThumbnailService:
+    """
+    Creates, caches and serves item thumbnails
+    """
+    
+    def __init__(
+        self,
+        blob_store: IBlobStore,
+        image_store: Optional[ImageStore] = None,
+        sizes: Tuple[int, ...] = (128, 384),
+        quality: int = 80,
+        executor: Optional[Executor] = None,
+        pixel_budget: Optional[int] = None
+    ):
+        """
+        Initialize thumbnail service
+        
+        Args:
+            blob_store: Where thumbnails are cached
+            image_store: Resolves images kept outside image_data
+            sizes: Bounding box sizes in pixels (longest side)
+            quality: WebP quality
+            executor: Executor for lazy generation (default: loop executor)
+            pixel_budget: Downsample larger images while decoding them
+        """
+        self.blob_store = blob_store
+        self.image_store = image_store
+        self.sizes = tuple(sorted(sizes))
+        self.quality = quality
+        self.executor = executor
+        self.pixel_budget = pixel_budget
+    
+    @staticmethod
+    def key(item_id: UUID, size: int) -> str:
+        """Blob key of one thumbnail"""
+        return f"thumbnails/{item_id}/{size}.webp"
+    
+    def pick_size(self, requested: Optional[int] = None) -> int:
+        """Smallest configured size covering the request (smallest if none)"""
+        if requested is None:
+            return self.sizes[0]
+        for size in self.sizes:
+            if size >= requested:
+                return size
+        return self.sizes[-1]
+    
+    async def store(self, item_id: UUID, thumbnails: Dict[int, bytes]) -> None:
+        """Cache thumbnails rendered elsewhere (e.g. by the ingest pipeline)"""
+        for size, data in thumbnails.items():
+            await self.blob_store.put(self.key(item_id, size), data)
+    
+    async def get(self, item: GalmuriItem, size: Optional[int] = None) -> bytes:
+        """
+        Get a thumbnail, rendering and caching all sizes on a miss
+        
+        Args:
+            item: Item to preview
+            size: Requested size in pixels
+            
+        Returns:
+            WebP bytes
+        """
+        size = self.pick_size(size)
+        data = await self.blob_store.get(self.key(item.id, size))
+        if data is not None:
+            return data
+        
+        image_data = item.image_data
+        if self.image_store is not None:
+            image_data = await self.image_store.load_image_data(item)
+        
+        loop = asyncio.get_running_loop()
+        thumbnails = await loop.run_in_executor(self.executor, self.render, image_data)
+        await self.store(item.id, thumbnails)
+        return thumbnails[size]
+    
+    def render(self, image_data: str) -> Dict[int, bytes]:
+        """Render every configured size from stored image data (blocking)"""
+        kind = sniff_document_kind(image_data)
+        if kind is not None:
+            # Documents are previewed by their first page
+            page = render_page(decode_document(image_data), kind, 0, dpi=72)
+            decoded = DecodedImage(image=page, format="")
+        else:
+            decoded = decode_image(image_data, self.pixel_budget)
+        
+        result = IngestResult()
+        try:
+            make_thumbnail_stage(self.sizes, self.quality)(decoded, result)
+        finally:
+            decoded.close()
+        return result.thumbnails
+    
+    async def copy(self, source_id: UUID, target_id: UUID) -> None:
+        """Reuse another item's cached thumbnails (same image)"""
+        for size in self.sizes:
+            data = await self.blob_store.get(self.key(source_id, size))
+            if data is not None:
+                await self.blob_store.put(self.key(target_id, size), data)
+    
+    async def delete(self, item_id: UUID) -> None:
+        """Remove cached thumbnails of an item"""
+        for size in self.sizes:
+            await self.blob_store.delete(self.key(item_id, size))
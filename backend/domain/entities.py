@@ -5,9 +5,16 @@ Represents core business objects
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID, uuid4
 
+# Separates pages in ocr_text of multi-page documents (form feed, as Tesseract uses)
+PAGE_SEPARATOR = "\f"
+
+# Prefix of image_data values that point into the blob store instead of
+# holding the image inline
+BLOB_REFERENCE_PREFIX = "blob:"
+
 
 class OCRStatus(Enum):
     """OCR processing status"""
@@ -38,9 +45,15 @@ class GalmuriItem:
     page_title: str = ""
     memo_content: str = ""
     
+    content_hash: str = ""  # SHA-256 of the decoded image bytes
+    perceptual_hash: str = ""  # 64-bit dHash (hex) for near-duplicate detection
+    
     # Intelligence (OCR)
     ocr_text: str = ""
     ocr_status: OCRStatus = OCRStatus.PENDING
+    ocr_engine: str = ""  # Engine that produced ocr_text (server or on-device)
+    ocr_engine_version: str = ""
+    text_minhash: str = ""  # MinHash signature of ocr_text (hex) for same-text detection
     
     # Meta & Sync
     platform: Platform = Platform.WEB_EXTENSION
@@ -48,17 +61,42 @@ class GalmuriItem:
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
-    def mark_ocr_completed(self, extracted_text: str) -> None:
+    def mark_ocr_completed(self, extracted_text: str, engine: str = "", engine_version: str = "") -> None:
         """Mark OCR as completed with extracted text"""
         self.ocr_text = extracted_text
         self.ocr_status = OCRStatus.DONE
+        self.ocr_engine = engine
+        self.ocr_engine_version = engine_version
+        self.text_minhash = ""  # Signature of the previous text no longer applies
         self.updated_at = datetime.now()
     
+    def mark_ocr_pages_completed(self, pages: List[str], engine: str = "", engine_version: str = "") -> None:
+        """Mark OCR of a multi-page document as completed"""
+        self.mark_ocr_completed(PAGE_SEPARATOR.join(pages), engine, engine_version)
+    
+    def get_ocr_pages(self) -> List[str]:
+        """OCR text split per page (a single entry for plain images)"""
+        return self.ocr_text.split(PAGE_SEPARATOR)
+    
+    def find_pages(self, query: str) -> List[int]:
+        """1-based numbers of the OCR pages containing query, compared as search compares text"""
+        from .search import normalize_text  # search imports this module
+        needle = normalize_text(query)
+        return [
+            number for number, page in enumerate(self.get_ocr_pages(), start=1)
+            if needle and needle in normalize_text(page)
+        ]
+    
     def mark_ocr_failed(self) -> None:
         """Mark OCR as failed"""
         self.ocr_status = OCRStatus.FAILED
         self.updated_at = datetime.now()
     
+    def mark_ocr_pending(self) -> None:
+        """Mark OCR as pending so it is picked up again"""
+        self.ocr_status = OCRStatus.PENDING
+        self.updated_at = datetime.now()
+    
     def mark_synced(self) -> None:
         """Mark item as synced to server"""
         self.is_synced = True
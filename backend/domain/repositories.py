@@ -3,9 +3,11 @@ Repository interfaces (Port pattern in Clean Architecture)
 Defines contracts for data persistence without implementation details
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
 from uuid import UUID
-from .entities import GalmuriItem
+from .entities import GalmuriItem, OCRStatus
+from .search import FacetCounts, SearchPage, SearchQuery
 
 
 class IGalmuriRepository(ABC):
@@ -24,6 +26,11 @@ class IGalmuriRepository(ABC):
         """Find item by ID"""
         pass
     
+    @abstractmethod
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        """Find several items by ID (missing IDs are skipped, order is not kept)"""
+        pass
+    
     @abstractmethod
     async def find_by_user_id(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all items for a user"""
@@ -34,13 +41,183 @@ class IGalmuriRepository(ABC):
         """Search items by query (searches in title, memo, and OCR text)"""
         pass
     
+    @abstractmethod
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        """Find a user's items matching a structured query, newest first"""
+        pass
+    
+    @abstractmethod
+    async def search_page(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        limit: int,
+        deadline: Optional[float] = None,
+        offset: int = 0
+    ) -> SearchPage:
+        """
+        Find a user's newest items matching a structured query
+        
+        Args:
+            limit: Most items to return; candidates stop being read once
+                these and one more (setting has_more) are found
+            deadline: time.monotonic() after which the matches found so far
+                are returned, flagged as truncated
+            offset: Newest matches to skip, for the pages after the first
+        """
+        pass
+    
+    @abstractmethod
+    async def count_facets(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        facets: List[str],
+        deadline: Optional[float] = None
+    ) -> FacetCounts:
+        """
+        Count every item matching a query per value of each facet, as
+        facet_counts() would over the full result
+        
+        Args:
+            deadline: time.monotonic() after which counting stops; the
+                counts so far are returned, flagged as truncated
+        """
+        pass
+    
+    @abstractmethod
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a host, as url_host() gives it"""
+        pass
+    
+    @abstractmethod
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a page, compared by url_hash()"""
+        pass
+    
+    @abstractmethod
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        """(host, number of items) for each host a user captured from, most items first"""
+        pass
+    
+    @abstractmethod
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        """
+        Write the search document, host and URL hash of rows saved before they were stored
+        
+        Returns:
+            Number of rows updated
+        """
+        pass
+    
     @abstractmethod
     async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all unsynced items for a user"""
         pass
     
+    @abstractmethod
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        """Find items in an OCR state across all users, oldest first"""
+        pass
+    
+    @abstractmethod
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        """Find a user's item whose image has the given SHA-256, oldest first"""
+        pass
+    
+    @abstractmethod
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, perceptual hash) of a user's items that have one"""
+        pass
+    
+    @abstractmethod
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, OCR text MinHash signature) of a user's items that have one"""
+        pass
+    
+    @abstractmethod
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        """
+        Find a user's items with only their text fields and times loaded,
+        for building search indexes (image_data and hashes are left empty,
+        so these items must not be saved)
+        """
+        pass
+    
+    @abstractmethod
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        """
+        Number of a user's items and their latest updated_at (None without
+        items); saving or deleting an item changes it
+        """
+        pass
+    
+    @abstractmethod
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        """
+        Find items created before a time whose image is still stored inline, oldest first
+        
+        Args:
+            after: (created_at, id) of the last item of the previous batch;
+                only items ordered after it are returned
+        """
+        pass
+    
+    @abstractmethod
+    async def is_image_referenced(self, image_data: str) -> bool:
+        """Whether any item (of any user) has this blob reference as its image"""
+        pass
+    
     @abstractmethod
     async def delete(self, item_id: UUID) -> bool:
         """Delete an item"""
         pass
 
+
+
+class IBlobStore(ABC):
+    """
+    Storage interface for binary objects (thumbnails, images)
+    Keys are relative, slash-separated paths
+    """
+    
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        """Store data under key, replacing any previous value"""
+        pass
+    
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get data stored under key"""
+        pass
+    
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+        pass
+    
+    @abstractmethod
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of an existing object, if the store is on local disk"""
+        pass
+    
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Delete an object"""
+        pass
+    
+    @abstractmethod
+    def iter_keys(self, prefix: str = "", modified_before: Optional[float] = None) -> Iterator[str]:
+        """
+        Iterate keys under a prefix
+        
+        Args:
+            prefix: Key prefix, e.g. "images/"
+            modified_before: Only objects last written before this Unix time
+        """
+        pass
@@ -0,0 +1,345 @@
+"""
+Structured search queries
+A parsed query is a conjunction of filters; repositories compile it to
+indexed predicates and confirm candidates with SearchQuery.matches()
+"""
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .entities import GalmuriItem, OCRStatus, Platform
+
+_WHITESPACE = re.compile(r"\s+")
+# scheme://host[:port][/...] with a plain host name; urlsplit() is several times slower
+_PLAIN_HOST = re.compile(r"(?:[A-Za-z][A-Za-z0-9+.-]*:)?//([^/?#@:\[\]\s]+)(?::\d*)?(?=[/?#]|$)")
+
+# Separates the fields of a search document; normalized text never contains
+# it, so a match cannot span two fields
+DOCUMENT_SEPARATOR = "\n"
+
+# Longest snippet returned for a field, and most highlights in one snippet
+SNIPPET_CHARS = 160
+MAX_HIGHLIGHTS = 16
+
+# Facets results can be counted by, and the most values returned per facet
+FACETS = ("platform", "status", "site", "month")
+MAX_FACET_VALUES = 20
+
+# Facet -> (item attribute, converter from attribute to facet value)
+_FACET_KEYS = {
+    "platform": ("platform", lambda platform: platform.value),
+    "status": ("ocr_status", lambda status: status.value),
+    "site": ("source_url", lambda url: url_host(url)),
+    "month": ("created_at", lambda created_at: f"{created_at.year:04d}-{created_at.month:02d}"),
+}
+
+# Fields a text filter can target; "any" is title, memo or OCR text
+TEXT_FIELDS = ("any", "title", "memo", "url", "site")
+# Cheapest and most selective first: URLs and titles are short, OCR text is long
+_FIELD_COST = {"site": 0, "url": 1, "title": 2, "memo": 3, "any": 4}
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for matching
+
+    NFKC composes decomposed Hangul (NFD jamo sequences, as macOS and some
+    OCR engines produce) into syllables and folds full-width forms;
+    casefold() and collapsing whitespace make the match case- and
+    layout-insensitive.
+    """
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+
+
+def search_document(item: GalmuriItem) -> str:
+    """
+    The normalized title, memo and OCR text of an item, as stored by
+    repositories in one column and matched against normalized queries
+    """
+    return DOCUMENT_SEPARATOR.join(
+        normalize_text(text or "") for text in (item.page_title, item.memo_content, item.ocr_text)
+    )
+
+
+def url_host(url: Optional[str]) -> str:
+    """Lowercase host of a URL without a leading "www." ("" if there is none)"""
+    if not url:
+        return ""
+    match = _PLAIN_HOST.match(url)
+    if match:
+        host = match.group(1).lower()
+    else:
+        # IPv6 literals, credentials and other unusual forms
+        try:
+            host = urlsplit(url if "//" in url else f"//{url}").hostname or ""
+        except ValueError:
+            return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def facet_counts(items: List[GalmuriItem], facets: Iterable[str]) -> Dict[str, Dict[str, int]]:
+    """
+    Count items per value of each requested facet
+
+    Values are platform and OCR status values, hosts as url_host() gives
+    them ("" without a URL) and "YYYY-MM" creation months. Raw attributes
+    are counted by Counter in C, and only distinct ones are converted.
+
+    Returns:
+        Facet -> {value: count}, most common first, at most MAX_FACET_VALUES values
+    """
+    result = {}
+    for facet in facets:
+        attribute, to_value = _FACET_KEYS[facet]
+        values: Counter = Counter()
+        for key, count in Counter(map(attrgetter(attribute), items)).items():
+            values[to_value(key)] += count
+        result[facet] = top_facet_values(values)
+    return result
+
+
+def top_facet_values(counts: Dict[str, int]) -> Dict[str, int]:
+    """The MAX_FACET_VALUES most common values of a facet, most common first"""
+    return dict(sorted(counts.items(), key=lambda entry: (-entry[1], entry[0]))[:MAX_FACET_VALUES])
+
+
+@dataclass
+class Snippet:
+    """A bounded excerpt of a field with the [start, end) offsets of matches in it"""
+    field: str  # "title", "memo" or "ocr"
+    text: str
+    highlights: List[Tuple[int, int]]
+
+
+def _term_pattern(terms: List[str]) -> Optional["re.Pattern"]:
+    """Pattern for any normalized term, longest first, run against normalize_text() output"""
+    alternatives = sorted({normalize_text(term) for term in terms} - {""}, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, alternatives))) if alternatives else None
+
+
+@lru_cache(maxsize=4096)
+def _fold(char: str) -> str:
+    """normalize_text() of one character, before whitespace is collapsed"""
+    return unicodedata.normalize("NFKC", char).casefold()
+
+
+def _normalize_with_origins(text: str) -> Tuple[str, List[int]]:
+    """
+    normalize_text() of NFC text, character by character, with the index
+    in text each output character came from (a full-width letter folds to
+    one character, ß to two, a whitespace run to a single space)
+    """
+    chars: List[str] = []
+    origins: List[int] = []
+    for index, char in enumerate(text):
+        for folded in _fold(char):
+            if folded.isspace():
+                if not chars or chars[-1] == " ":
+                    continue
+                folded = " "
+            chars.append(folded)
+            origins.append(index)
+    if chars and chars[-1] == " ":
+        chars.pop()
+        origins.pop()
+    return "".join(chars), origins
+
+
+def _match_spans(text: str, pattern: "re.Pattern", limit: int) -> List[Tuple[int, int]]:
+    """
+    [start, end) offsets in text of the first `limit` matches, found in its
+    normalized form as search finds them and mapped back to text
+    """
+    # Most fields of a hit have no match: check without building offsets
+    if not pattern.search(normalize_text(text)):
+        return []
+    normalized, origins = _normalize_with_origins(text)
+    return [
+        (origins[match.start()], origins[match.end() - 1] + 1)
+        for _, match in zip(range(limit), pattern.finditer(normalized))
+    ]
+
+
+def _excerpt(text: str, pattern: "re.Pattern", max_chars: int) -> Optional[Snippet]:
+    spans = _match_spans(text, pattern, 1000)
+    if not spans:
+        return None
+    # Window that starts a little before a match and covers the most matches
+    best, best_count, last = 0, 0, 0
+    for index, (start, _) in enumerate(spans):
+        while last < len(spans) and spans[last][1] <= start + max_chars:
+            last += 1
+        if last - index > best_count:
+            best, best_count = index, last - index
+    start = max(0, spans[best][0] - max_chars // 5)
+    end = min(len(text), start + max_chars)
+    start = max(0, min(start, end - max_chars))
+
+    body = _WHITESPACE.sub(" ", text[start:end]).strip()
+    prefix = "…" if start > 0 else ""
+    excerpt = prefix + body + ("…" if end < len(text) else "")
+    highlights = [
+        (match_start + len(prefix), match_end + len(prefix))
+        for match_start, match_end in _match_spans(body, pattern, MAX_HIGHLIGHTS)
+    ]
+    return Snippet(field="", text=excerpt, highlights=highlights)
+
+
+def build_snippets(item: GalmuriItem, terms: List[str], max_chars: int = SNIPPET_CHARS) -> List[Snippet]:
+    """
+    Excerpts of an item's title, memo and OCR text around matches of terms
+
+    Text is NFC-composed and matched in its normalize_text() form, as
+    search matches it (full-width forms, case folding, line breaks), with
+    offsets mapped back to the composed characters clients display.
+
+    Returns:
+        One snippet per field with a match, each at most about max_chars long
+    """
+    pattern = _term_pattern(terms)
+    if pattern is None:
+        return []
+    snippets = []
+    for name, text in (("title", item.page_title), ("memo", item.memo_content), ("ocr", item.ocr_text)):
+        if not text:
+            continue
+        snippet = _excerpt(unicodedata.normalize("NFC", text), pattern, max_chars)
+        if snippet is not None:
+            snippet.field = name
+            snippets.append(snippet)
+    return snippets
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """
+    A URL reduced to what identifies the page: host as url_host() gives
+    it, non-default port, path without a trailing slash and query; the
+    scheme and fragment are dropped
+    """
+    if not url or not url.strip():
+        return ""
+    url = url.strip()
+    try:
+        parts = urlsplit(url if "//" in url else f"//{url}")
+        port = parts.port
+    except ValueError:
+        return url
+    netloc = url_host(url)
+    if port and port not in (80, 443):
+        netloc += f":{port}"
+    path = parts.path.rstrip("/")
+    return f"{netloc}{path}?{parts.query}" if parts.query else f"{netloc}{path}"
+
+
+def url_hash(url: Optional[str]) -> str:
+    """SHA-256 of normalize_url(url) ("" without a URL)"""
+    normalized = normalize_url(url)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest() if normalized else ""
+
+
+@dataclass
+class SearchPage:
+    """The newest matches of a search, up to a limit, after an offset"""
+    items: List[GalmuriItem]
+    # The deadline passed before every candidate was checked; items are
+    # still the newest matches among those that were
+    truncated: bool = False
+    # More matches follow these: the limit cut the results
+    has_more: bool = False
+
+    @classmethod
+    def cut_off(cls, items: List[GalmuriItem], limit: int) -> "SearchPage":
+        """
+        A page whose search stopped at the deadline: a full page may have
+        more matches after it, a partial one is truncated
+        """
+        if len(items) >= limit:
+            return cls(items=items, has_more=True)
+        return cls(items=items, truncated=True)
+
+
+@dataclass
+class FacetCounts:
+    """Counts of every match of a search per value of each facet"""
+    counts: Dict[str, Dict[str, int]]
+    # The deadline passed before every candidate was counted; counts
+    # cover those that were, or are empty if none were
+    truncated: bool = False
+
+
+@dataclass(frozen=True)
+class TextFilter:
+    """Substring match on a field (host match for "site")"""
+    field: str
+    value: str
+    negated: bool = False
+
+    def matches(self, item: GalmuriItem) -> bool:
+        if self.field == "site":
+            site = url_host(self.value)
+            host = url_host(item.source_url)
+            found = bool(site) and (host == site or host.endswith("." + site))
+        else:
+            if self.field == "title":
+                fields = [item.page_title]
+            elif self.field == "memo":
+                fields = [item.memo_content]
+            elif self.field == "url":
+                fields = [item.source_url or ""]
+            else:
+                fields = [item.page_title, item.memo_content, item.ocr_text]
+            value = normalize_text(self.value)
+            found = any(value in normalize_text(text) for text in fields)
+        return found != self.negated
+
+
+@dataclass
+class SearchQuery:
+    """
+    A parsed search: every filter must hold
+
+    Empty platform/status lists mean any platform/status; the date range
+    is [created_from, created_until).
+    """
+    text_filters: List[TextFilter] = field(default_factory=list)
+    platforms: List[Platform] = field(default_factory=list)
+    statuses: List[OCRStatus] = field(default_factory=list)
+    created_from: Optional[datetime] = None
+    created_until: Optional[datetime] = None
+
+    def ordered_text_filters(self) -> List[TextFilter]:
+        """
+        Text filters in evaluation order: positive before negated, cheap
+        fields before OCR text, longer (more selective) values first
+        """
+        return sorted(
+            self.text_filters,
+            key=lambda text_filter: (text_filter.negated, _FIELD_COST[text_filter.field], -len(text_filter.value))
+        )
+
+    def positive_terms(self) -> List[str]:
+        """Values of non-negated title, memo and OCR text filters"""
+        return [
+            text_filter.value for text_filter in self.text_filters
+            if not text_filter.negated and text_filter.field in ("any", "title", "memo")
+        ]
+
+    def matches(self, item: GalmuriItem) -> bool:
+        """Whether an item satisfies every filter"""
+        if self.created_from and item.created_at < self.created_from:
+            return False
+        if self.created_until and item.created_at >= self.created_until:
+            return False
+        # Compared by value: entities may come from another import of this package
+        if self.platforms and item.platform.value not in {platform.value for platform in self.platforms}:
+            return False
+        if self.statuses and item.ocr_status.value not in {status.value for status in self.statuses}:
+            return False
+        return all(text_filter.matches(item) for text_filter in self.ordered_text_filters())
@@ -0,0 +1,82 @@
+"""
+Local filesystem implementation of IBlobStore
+Objects are plain files under a root directory
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+from domain.repositories import IBlobStore
+
+
+class LocalBlobStore(IBlobStore):
+    """
+    Stores blobs as files under root_dir
+    Writes are atomic (temp file + rename)
+    """
+    
+    def __init__(self, root_dir: str = "blobs"):
+        self.root = Path(root_dir).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def _path(self, key: str) -> Path:
+        """Resolve key to a path, refusing keys that escape the root"""
+        path = (self.root / key).resolve()
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid blob key: {key}")
+        return path
+    
+    async def put(self, key: str, data: bytes) -> None:
+        """Store data under key, replacing any previous value"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get data stored under key"""
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+    
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under key"""
+        return self._path(key).is_file()
+    
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of an existing object"""
+        path = self._path(key)
+        return str(path) if path.is_file() else None
+    
+    async def delete(self, key: str) -> bool:
+        """Delete an object"""
+        try:
+            self._path(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def iter_keys(self, prefix: str = "", modified_before: Optional[float] = None) -> Iterator[str]:
+        """Iterate keys under a prefix, optionally only files older than a Unix time"""
+        top = self.root / prefix.rsplit("/", 1)[0] if "/" in prefix else self.root
+        for directory, _, files in os.walk(top):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                path = Path(directory) / name
+                key = path.relative_to(self.root).as_posix()
+                if not key.startswith(prefix):
+                    continue
+                if modified_before is not None and path.stat().st_mtime >= modified_before:
+                    continue
+                yield key
@@ -4,11 +4,47 @@ Uses SQLite for MVP - suitable for Local First strategy
 """
 import sqlite3
 import json
-from typing import List, Optional
-from uuid import UUID
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
 from datetime import datetime
-from domain.entities import GalmuriItem, OCRStatus, Platform
+from domain.entities import BLOB_REFERENCE_PREFIX, GalmuriItem, OCRStatus, Platform
 from domain.repositories import IGalmuriRepository
+from domain.search import (
+    FacetCounts, SearchPage, SearchQuery, TextFilter, normalize_text, search_document, top_facet_values,
+    url_hash, url_host
+)
+
+
+# Columns added after the original schema, in the order they were added.
+# They are always created with ALTER TABLE so that fresh and upgraded
+# databases end up with the same column order.
+ADDED_COLUMNS = [
+    ("ocr_engine", "TEXT NOT NULL DEFAULT ''"),
+    ("ocr_engine_version", "TEXT NOT NULL DEFAULT ''"),
+    ("content_hash", "TEXT NOT NULL DEFAULT ''"),
+    ("perceptual_hash", "TEXT NOT NULL DEFAULT ''"),
+    ("text_minhash", "TEXT NOT NULL DEFAULT ''"),
+    # NULL until written by save() or backfill_search_documents()
+    ("search_document", "TEXT"),
+    ("host", "TEXT"),
+    ("url_hash", "TEXT"),
+]
+
+# SQLite virtual machine steps between deadline checks (about a millisecond)
+DEADLINE_CHECK_STEPS = 10000
+
+# Facet -> SQL expression giving the value facet_counts() would
+FACET_COLUMNS = {
+    "platform": "platform",
+    "status": "ocr_status",
+    "site": "COALESCE(host, '')",
+    "month": "substr(created_at, 1, 7)",
+}
+# Text filter fields whose SQL condition is exactly TextFilter.matches()
+# (the search document holds the normalized fields, the host column the host)
+EXACT_TEXT_FIELDS = ("any", "site")
 
 
 class LocalGalmuriRepository(IGalmuriRepository):
@@ -19,11 +55,21 @@ class LocalGalmuriRepository(IGalmuriRepository):
     
     def __init__(self, db_path: str = "galmuri.db"):
         self.db_path = db_path
+        self._keepalive = None
+        if db_path == ":memory:":
+            # Every call opens its own connection, so give them one
+            # shared in-memory database and keep it alive with ours
+            self.db_path = f"file:galmuri-{uuid4()}?mode=memory&cache=shared"
+            self._keepalive = self._connect()
         self._initialize_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the database"""
+        return sqlite3.connect(self.db_path, uri=self.db_path.startswith("file:"))
+    
     def _initialize_database(self) -> None:
         """Initialize database schema"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -43,6 +89,8 @@ class LocalGalmuriRepository(IGalmuriRepository):
             )
         """)
         
+        self._add_missing_columns(cursor)
+        
         # Create index for search optimization
         cursor.execute("""
             CREATE INDEX IF NOT EXISTS idx_user_id ON galmuri_items(user_id)
@@ -52,9 +100,51 @@ class LocalGalmuriRepository(IGalmuriRepository):
             CREATE INDEX IF NOT EXISTS idx_is_synced ON galmuri_items(is_synced)
         """)
         
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_ocr_status ON galmuri_items(ocr_status, created_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_content_hash ON galmuri_items(user_id, content_hash)
+        """)
+        
+        # A site's captures, newest first, and per-host counts
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_host_created ON galmuri_items(user_id, host, created_at)
+        """)
+        
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_url_hash ON galmuri_items(user_id, url_hash)
+        """)
+        
+        # Blob references only; inline images are far too large to index
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_image_reference ON galmuri_items(image_data)
+            WHERE image_data LIKE 'blob:%'
+        """)
+        
+        cursor.execute("DROP INDEX IF EXISTS idx_user_created")
+        cursor.execute("DROP INDEX IF EXISTS idx_user_search")
+        # Serves (user_id, created_at) ranges and is also a covering index
+        # for text search: a user's documents are scanned, newest first,
+        # without reading table rows, which hold the (large) image data
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_user_created_search
+            ON galmuri_items(user_id, created_at, search_document)
+        """)
+        
         conn.commit()
         conn.close()
     
+    def _add_missing_columns(self, cursor: sqlite3.Cursor) -> None:
+        """Add columns introduced after the table was created"""
+        cursor.execute("PRAGMA table_info(galmuri_items)")
+        existing = {row[1] for row in cursor.fetchall()}
+        
+        for name, definition in ADDED_COLUMNS:
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE galmuri_items ADD COLUMN {name} {definition}")
+    
     def _to_dict(self, item: GalmuriItem) -> dict:
         """Convert GalmuriItem to dictionary for storage"""
         return {
@@ -69,7 +159,15 @@ class LocalGalmuriRepository(IGalmuriRepository):
             'platform': item.platform.value,
             'is_synced': 1 if item.is_synced else 0,
             'created_at': item.created_at.isoformat(),
-            'updated_at': item.updated_at.isoformat()
+            'updated_at': item.updated_at.isoformat(),
+            'ocr_engine': item.ocr_engine,
+            'ocr_engine_version': item.ocr_engine_version,
+            'content_hash': item.content_hash,
+            'perceptual_hash': item.perceptual_hash,
+            'text_minhash': item.text_minhash,
+            'search_document': search_document(item),
+            'host': url_host(item.source_url),
+            'url_hash': url_hash(item.source_url)
         }
     
     def _from_row(self, row: tuple) -> GalmuriItem:
@@ -86,12 +184,17 @@ class LocalGalmuriRepository(IGalmuriRepository):
             platform=Platform(row[8]),
             is_synced=bool(row[9]),
             created_at=datetime.fromisoformat(row[10]),
-            updated_at=datetime.fromisoformat(row[11])
+            updated_at=datetime.fromisoformat(row[11]),
+            ocr_engine=row[12],
+            ocr_engine_version=row[13],
+            content_hash=row[14],
+            perceptual_hash=row[15],
+            text_minhash=row[16]
         )
     
     async def save(self, item: GalmuriItem) -> GalmuriItem:
         """Save or update an item"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         data = self._to_dict(item)
@@ -99,13 +202,18 @@ class LocalGalmuriRepository(IGalmuriRepository):
         cursor.execute("""
             INSERT OR REPLACE INTO galmuri_items
             (id, user_id, image_data, source_url, page_title, memo_content,
-             ocr_text, ocr_status, platform, is_synced, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             ocr_text, ocr_status, platform, is_synced, created_at, updated_at,
+             ocr_engine, ocr_engine_version, content_hash, perceptual_hash, text_minhash,
+             search_document, host, url_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             data['id'], data['user_id'], data['image_data'], data['source_url'],
             data['page_title'], data['memo_content'], data['ocr_text'],
             data['ocr_status'], data['platform'], data['is_synced'],
-            data['created_at'], data['updated_at']
+            data['created_at'], data['updated_at'],
+            data['ocr_engine'], data['ocr_engine_version'],
+            data['content_hash'], data['perceptual_hash'], data['text_minhash'],
+            data['search_document'], data['host'], data['url_hash']
         ))
         
         conn.commit()
@@ -115,7 +223,7 @@ class LocalGalmuriRepository(IGalmuriRepository):
     
     async def find_by_id(self, item_id: UUID) -> Optional[GalmuriItem]:
         """Find item by ID"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -129,9 +237,26 @@ class LocalGalmuriRepository(IGalmuriRepository):
             return self._from_row(row)
         return None
     
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        """Find several items by ID (missing IDs are skipped, order is not kept)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        rows = []
+        ids = [str(item_id) for item_id in item_ids]
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT * FROM galmuri_items WHERE id IN ({placeholders})", chunk)
+            rows.extend(cursor.fetchall())
+        conn.close()
+        
+        return [self._from_row(row) for row in rows]
+    
     async def find_by_user_id(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all items for a user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -147,30 +272,294 @@ class LocalGalmuriRepository(IGalmuriRepository):
     
     async def search(self, user_id: UUID, query: str) -> List[GalmuriItem]:
         """Search items by query"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
-        search_pattern = f"%{query}%"
-        
+        # Matching rowids come from idx_user_created_search alone; only they are read
         cursor.execute("""
             SELECT * FROM galmuri_items 
-            WHERE user_id = ?
-            AND (
-                page_title LIKE ? OR
-                memo_content LIKE ? OR
-                ocr_text LIKE ?
+            WHERE rowid IN (
+                SELECT rowid FROM galmuri_items
+                WHERE user_id = ? AND search_document LIKE ? ESCAPE '\\'
             )
             ORDER BY created_at DESC
-        """, (str(user_id), search_pattern, search_pattern, search_pattern))
+        """, (str(user_id), self._like_pattern(normalize_text(query))))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [self._from_row(row) for row in rows]
+    
+    @staticmethod
+    def _like_pattern(value: str) -> str:
+        """LIKE pattern matching value anywhere (with ESCAPE '\\')"""
+        escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
+    
+    def _text_condition(self, text_filter: TextFilter) -> Tuple[str, list]:
+        """SQL prefilter for a text filter; SearchQuery.matches() has the final say"""
+        if text_filter.field == "site":
+            # The host or a subdomain of it, like TextFilter.matches()
+            site = url_host(text_filter.value)
+            condition = "(host = ? OR host LIKE ? ESCAPE '\\')"
+            params = [site, "%." + self._like_pattern(site)[1:-1]]
+            return (f"NOT {condition}" if text_filter.negated else condition), params
+        if text_filter.field == "url":
+            condition = "COALESCE(source_url, '') LIKE ? ESCAPE '\\'"
+            return (f"NOT {condition}" if text_filter.negated else condition), [self._like_pattern(text_filter.value)]
+        
+        # Title and memo matches are also matches in the search document,
+        # but their negations are not, so those are left to matches()
+        if text_filter.negated and text_filter.field != "any":
+            return "", []
+        condition = "search_document LIKE ? ESCAPE '\\'"
+        params = [self._like_pattern(normalize_text(text_filter.value))]
+        return (f"NOT {condition}" if text_filter.negated else condition), params
+    
+    def _query_conditions(self, user_id: UUID, query: SearchQuery) -> Tuple[str, list]:
+        """
+        WHERE clause prefiltering a structured query
+        
+        Conditions are written in evaluation order: the (user_id, created_at)
+        index bounds the rows, then cheap equality filters, then text
+        filters from the most selective to OCR text.
+        """
+        conditions = ["user_id = ?"]
+        params: list = [str(user_id)]
+        if query.created_from:
+            conditions.append("created_at >= ?")
+            params.append(query.created_from.isoformat())
+        if query.created_until:
+            conditions.append("created_at < ?")
+            params.append(query.created_until.isoformat())
+        if query.platforms:
+            conditions.append(f"platform IN ({', '.join('?' * len(query.platforms))})")
+            params.extend(platform.value for platform in query.platforms)
+        if query.statuses:
+            conditions.append(f"ocr_status IN ({', '.join('?' * len(query.statuses))})")
+            params.extend(status.value for status in query.statuses)
+        for text_filter in query.ordered_text_filters():
+            condition, condition_params = self._text_condition(text_filter)
+            if condition:
+                conditions.append(condition)
+                params.extend(condition_params)
+        return " AND ".join(conditions), params
+    
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        """Find a user's items matching a structured query, newest first"""
+        where, params = self._query_conditions(user_id, query)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT * FROM galmuri_items
+            WHERE {where}
+            ORDER BY created_at DESC
+        """, params)
+        rows = cursor.fetchall()
+        conn.close()
+        
+        items = (self._from_row(row) for row in rows)
+        return [item for item in items if query.matches(item)]
+    
+    async def search_page(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        limit: int,
+        deadline: Optional[float] = None,
+        offset: int = 0
+    ) -> SearchPage:
+        """
+        Find a user's newest items matching a structured query
+        
+        Rows are streamed newest first along idx_user_created_search, so a
+        broad query stops after `limit` matches past the offset (and one
+        more for has_more); a progress handler interrupts the scan of a
+        selective one at the deadline.
+        """
+        where, params = self._query_conditions(user_id, query)
+        conn = self._connect()
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, DEADLINE_CHECK_STEPS)
+        items: List[GalmuriItem] = []
+        skipped = 0
+        try:
+            cursor = conn.execute(f"""
+                SELECT * FROM galmuri_items
+                WHERE {where}
+                ORDER BY created_at DESC
+            """, params)
+            for row in cursor:
+                item = self._from_row(row)
+                if not query.matches(item):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                elif len(items) < limit:
+                    items.append(item)
+                else:
+                    return SearchPage(items=items, has_more=True)
+        except sqlite3.OperationalError as e:
+            if "interrupt" not in str(e):
+                raise
+            return SearchPage.cut_off(items, limit)
+        finally:
+            conn.close()
+        
+        return SearchPage(items=items)
+    
+    async def count_facets(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        facets: List[str],
+        deadline: Optional[float] = None
+    ) -> FacetCounts:
+        """
+        Count every item matching a query per value of each facet
+        
+        Queries SQL matches exactly are counted by one GROUP BY over the
+        combined values of every requested facet (SQLite has no GROUPING
+        SETS), rolled up per facet here. Others (title:, memo:, url:
+        filters) read only the facet values and the fields those filters
+        confirm, never image data. A progress handler stops either at the
+        deadline.
+        """
+        if not facets:
+            return FacetCounts(counts={})
+        where, params = self._query_conditions(user_id, query)
+        columns = ", ".join(FACET_COLUMNS[facet] for facet in facets)
+        # SQL conditions for these fields only narrow the candidates
+        confirm = [text_filter for text_filter in query.text_filters if text_filter.field not in EXACT_TEXT_FIELDS]
+        if confirm:
+            sql = f"SELECT {columns}, page_title, memo_content, source_url FROM galmuri_items WHERE {where}"
+        else:
+            sql = f"""
+                SELECT {columns}, COUNT(*) FROM galmuri_items
+                WHERE {where}
+                GROUP BY {', '.join(str(position) for position in range(1, len(facets) + 1))}
+            """
+        conn = self._connect()
+        if deadline is not None:
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, DEADLINE_CHECK_STEPS)
+        counts = {facet: Counter() for facet in facets}
+        truncated = False
+        try:
+            for row in conn.execute(sql, params):
+                if confirm:
+                    fields = GalmuriItem(
+                        user_id=user_id, page_title=row[-3], memo_content=row[-2] or "", source_url=row[-1]
+                    )
+                    if not all(text_filter.matches(fields) for text_filter in confirm):
+                        continue
+                    count = 1
+                else:
+                    count = row[-1]
+                for facet, value in zip(facets, row):
+                    counts[facet][value] += count
+        except sqlite3.OperationalError as e:
+            if "interrupt" not in str(e):
+                raise
+            truncated = True
+        finally:
+            conn.close()
+        
+        return FacetCounts(
+            counts={facet: top_facet_values(values) for facet, values in counts.items()}, truncated=truncated
+        )
+    
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a host, as url_host() gives it"""
+        host = url_host(host)
+        if not host:
+            return []
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM galmuri_items
+            WHERE user_id = ? AND host = ?
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (str(user_id), host, limit))
         
         rows = cursor.fetchall()
         conn.close()
         
         return [self._from_row(row) for row in rows]
     
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a page, compared by url_hash()"""
+        hashed = url_hash(url)
+        if not hashed:
+            return []
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM galmuri_items
+            WHERE user_id = ? AND url_hash = ?
+            ORDER BY created_at DESC
+            LIMIT ?
+        """, (str(user_id), hashed, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [self._from_row(row) for row in rows]
+    
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        """(host, number of items) for each host a user captured from, most items first"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT host, COUNT(*) AS items FROM galmuri_items
+            WHERE user_id = ? AND host > ''
+            GROUP BY host
+            ORDER BY items DESC, host
+        """, (str(user_id),))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(row[0], row[1]) for row in rows]
+    
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        """Write the search document, host and URL hash of rows saved before they were stored"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        updated = 0
+        while True:
+            cursor.execute("""
+                SELECT id, page_title, memo_content, ocr_text, source_url FROM galmuri_items
+                WHERE search_document IS NULL OR host IS NULL OR url_hash IS NULL
+                LIMIT ?
+            """, (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany("""
+                UPDATE galmuri_items SET search_document = ?, host = ?, url_hash = ? WHERE id = ?
+            """, [
+                (
+                    search_document(GalmuriItem(page_title=title, memo_content=memo, ocr_text=ocr_text)),
+                    url_host(source_url),
+                    url_hash(source_url),
+                    item_id
+                )
+                for item_id, title, memo, ocr_text, source_url in rows
+            ])
+            conn.commit()
+            updated += len(rows)
+        
+        conn.close()
+        return updated
+    
     async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all unsynced items for a user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -184,9 +573,162 @@ class LocalGalmuriRepository(IGalmuriRepository):
         
         return [self._from_row(row) for row in rows]
     
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        """Find items in an OCR state across all users, oldest first"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM galmuri_items 
+            WHERE ocr_status = ?
+            ORDER BY created_at ASC
+            LIMIT ?
+        """, (status.value, limit))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [self._from_row(row) for row in rows]
+    
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        """Find a user's item whose image has the given SHA-256, oldest first"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT * FROM galmuri_items 
+            WHERE user_id = ? AND content_hash = ?
+            ORDER BY created_at ASC
+            LIMIT 1
+        """, (str(user_id), content_hash))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return self._from_row(row) if row else None
+    
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, perceptual hash) of a user's items that have one"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, perceptual_hash FROM galmuri_items 
+            WHERE user_id = ? AND perceptual_hash != ''
+        """, (str(user_id),))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(UUID(row[0]), row[1]) for row in rows]
+    
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, OCR text MinHash signature) of a user's items that have one"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, text_minhash FROM galmuri_items 
+            WHERE user_id = ? AND text_minhash != ''
+        """, (str(user_id),))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [(UUID(row[0]), row[1]) for row in rows]
+    
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        """Find a user's items with only their text fields and times loaded"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT id, source_url, page_title, memo_content, ocr_text, ocr_status, created_at, updated_at
+            FROM galmuri_items 
+            WHERE user_id = ?
+        """, (str(user_id),))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [
+            GalmuriItem(
+                id=UUID(row[0]),
+                user_id=user_id,
+                source_url=row[1],
+                page_title=row[2],
+                memo_content=row[3],
+                ocr_text=row[4],
+                ocr_status=OCRStatus(row[5]),
+                created_at=datetime.fromisoformat(row[6]),
+                updated_at=datetime.fromisoformat(row[7])
+            )
+            for row in rows
+        ]
+    
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        """Number of a user's items and their latest updated_at"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT COUNT(*), MAX(updated_at) FROM galmuri_items 
+            WHERE user_id = ?
+        """, (str(user_id),))
+        
+        count, last_updated = cursor.fetchone()
+        conn.close()
+        
+        return count, datetime.fromisoformat(last_updated) if last_updated else None
+    
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        """Find items created before a time whose image is still stored inline, oldest first"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        where = "created_at < ? AND image_data NOT LIKE ?"
+        params = [created_before.isoformat(), BLOB_REFERENCE_PREFIX + '%']
+        if after is not None:
+            where += " AND (created_at > ? OR (created_at = ? AND id > ?))"
+            params += [after[0].isoformat(), after[0].isoformat(), str(after[1])]
+        
+        cursor.execute(f"""
+            SELECT * FROM galmuri_items 
+            WHERE {where}
+            ORDER BY created_at ASC, id ASC
+            LIMIT ?
+        """, params + [limit])
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [self._from_row(row) for row in rows]
+    
+    async def is_image_referenced(self, image_data: str) -> bool:
+        """Whether any item (of any user) has this blob reference as its image"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        # The LIKE term matches the partial index's, so the index is used
+        cursor.execute("""
+            SELECT 1 FROM galmuri_items
+            WHERE image_data = ? AND image_data LIKE 'blob:%'
+            LIMIT 1
+        """, (image_data,))
+        
+        row = cursor.fetchone()
+        conn.close()
+        
+        return row is not None
+    
     async def delete(self, item_id: UUID) -> bool:
         """Delete an item"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute("""
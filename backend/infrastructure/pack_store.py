@@ -0,0 +1,252 @@
+"""
+Pack file blob store (cold tier)
+Blobs are appended to large pack files and located through an SQLite
+offset index; reads are served from memory-mapped packs. Compression,
+file I/O and fsync run in a worker thread, off the event loop.
+"""
+import asyncio
+import mmap
+import os
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from domain.repositories import IBlobStore
+
+try:
+    import zstandard
+except ImportError:  # zlib is always available
+    zstandard = None
+
+RAW = "raw"
+ZSTD = "zstd"
+ZLIB = "zlib"
+
+
+class PackStore(IBlobStore):
+    """
+    Append-only, compressed pack files with an offset index
+
+    A blob is written once to the end of the current pack, fsynced, and
+    only then indexed, so a crash can leave unindexed bytes at the end of
+    a pack but never an index entry pointing at missing data. Deleting
+    drops the index entry; the space is not reclaimed.
+    """
+
+    def __init__(self, root_dir: str = "packs", max_pack_bytes: int = 256 * 1024 * 1024, level: int = 3):
+        """
+        Initialize pack store
+
+        Args:
+            root_dir: Directory holding pack files and the index
+            max_pack_bytes: Start a new pack once the current one is this large
+            level: Compression level
+        """
+        self.root = Path(root_dir).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_pack_bytes = max_pack_bytes
+        self.level = level
+        self.codec = ZSTD if zstandard is not None else ZLIB
+        self._lock = threading.Lock()
+        self._maps: Dict[int, Tuple[object, mmap.mmap]] = {}
+
+        self._index = sqlite3.connect(str(self.root / "index.db"), check_same_thread=False)
+        self._index.execute("""
+            CREATE TABLE IF NOT EXISTS pack_entries (
+                key TEXT PRIMARY KEY,
+                pack INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                codec TEXT NOT NULL
+            )
+        """)
+        self._index.commit()
+
+    def _pack_path(self, pack: int) -> Path:
+        return self.root / f"pack-{pack:06d}.pack"
+
+    def _current_pack(self) -> int:
+        """Pack to append to, rolling over when the newest one is full"""
+        packs = sorted(int(path.stem.split("-")[1]) for path in self.root.glob("pack-*.pack"))
+        if not packs:
+            return 1
+        newest = packs[-1]
+        if self._pack_path(newest).stat().st_size >= self.max_pack_bytes:
+            return newest + 1
+        return newest
+
+    def _compress(self, data: bytes) -> Tuple[str, bytes]:
+        if self.codec == ZSTD:
+            packed = zstandard.ZstdCompressor(level=self.level).compress(data)
+        else:
+            packed = zlib.compress(data, self.level)
+        # Already-compressed images often don't shrink; keep those raw
+        if len(packed) >= len(data):
+            return RAW, data
+        return self.codec, packed
+
+    @staticmethod
+    def _decompress(codec: str, data: bytes) -> bytes:
+        if codec == RAW:
+            return bytes(data)
+        if codec == ZLIB:
+            return zlib.decompress(data)
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed pack entry needs zstandard. Please install it: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+
+    def _map(self, pack: int, end: int) -> mmap.mmap:
+        """Memory map of a pack covering at least `end` bytes"""
+        entry = self._maps.get(pack)
+        if entry is None or len(entry[1]) < end:
+            # Packs only grow: remap to see appended data
+            if entry is not None:
+                entry[1].close()
+                entry[0].close()
+            f = open(self._pack_path(pack), "rb")
+            entry = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            self._maps[pack] = entry
+        return entry[1]
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Append data to the current pack and index it"""
+        await asyncio.to_thread(self._put, key, data)
+
+    def _put(self, key: str, data: bytes) -> None:
+        codec, packed = self._compress(data)
+        with self._lock:
+            pack = self._current_pack()
+            with open(self._pack_path(pack), "ab") as f:
+                offset = f.tell()
+                f.write(packed)
+                f.flush()
+                os.fsync(f.fileno())
+            self._index.execute(
+                "INSERT OR REPLACE INTO pack_entries (key, pack, offset, length, size, codec) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, pack, offset, len(packed), len(data), codec)
+            )
+            self._index.commit()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Read a blob through the pack's memory map"""
+        return await asyncio.to_thread(self._get, key)
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._index.execute(
+                "SELECT pack, offset, length, codec FROM pack_entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            pack, offset, length, codec = row
+            view = self._map(pack, offset + length)[offset:offset + length]
+        return self._decompress(codec, view)
+
+    async def exists(self, key: str) -> bool:
+        """Whether a blob is indexed under key"""
+        return await asyncio.to_thread(self._exists, key)
+
+    def _exists(self, key: str) -> bool:
+        with self._lock:
+            row = self._index.execute("SELECT 1 FROM pack_entries WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Packed blobs have no file of their own"""
+        return None
+
+    async def delete(self, key: str) -> bool:
+        """Drop a blob from the index"""
+        return await asyncio.to_thread(self._delete, key)
+
+    def _delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._index.execute("DELETE FROM pack_entries WHERE key = ?", (key,))
+            self._index.commit()
+        return cursor.rowcount > 0
+
+    def iter_keys(self, prefix: str = "", modified_before: Optional[float] = None) -> Iterator[str]:
+        """Iterate indexed keys under a prefix (pack entries have no mtime)"""
+        with self._lock:
+            rows = self._index.execute(
+                "SELECT key FROM pack_entries WHERE substr(key, 1, ?) = ? ORDER BY key",
+                (len(prefix), prefix)
+            ).fetchall()
+        for (key,) in rows:
+            yield key
+
+    def stats(self) -> dict:
+        """Entry count and logical vs packed bytes"""
+        with self._lock:
+            entries, size, length = self._index.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(length), 0) FROM pack_entries"
+            ).fetchone()
+        packs = list(self.root.glob("pack-*.pack"))
+        return {
+            "entries": entries,
+            "bytes": size,
+            "packed_bytes": length,
+            "packs": len(packs),
+            "pack_file_bytes": sum(path.stat().st_size for path in packs),
+            "codec": self.codec,
+        }
+
+    def close(self) -> None:
+        """Release memory maps and the index connection"""
+        with self._lock:
+            for f, mapped in self._maps.values():
+                mapped.close()
+                f.close()
+            self._maps.clear()
+            self._index.close()
+
+
+class TieredBlobStore(IBlobStore):
+    """
+    Hot blob store in front of a cold pack store
+
+    Writes go to the hot tier; reads fall back to the cold tier, so keys
+    (and every image reference) stay valid while blobs move between tiers.
+    """
+
+    def __init__(self, hot: IBlobStore, cold: IBlobStore):
+        self.hot = hot
+        self.cold = cold
+
+    async def put(self, key: str, data: bytes) -> None:
+        """Store data in the hot tier"""
+        await self.hot.put(key, data)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Get data from the hot tier, then the cold tier"""
+        data = await self.hot.get(key)
+        if data is None:
+            data = await self.cold.get(key)
+        return data
+
+    async def exists(self, key: str) -> bool:
+        """Whether either tier holds the key"""
+        return await self.hot.exists(key) or await self.cold.exists(key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Only hot blobs are plain files"""
+        return self.hot.local_path(key)
+
+    async def delete(self, key: str) -> bool:
+        """Delete from both tiers"""
+        deleted_hot = await self.hot.delete(key)
+        deleted_cold = await self.cold.delete(key)
+        return deleted_hot or deleted_cold
+
+    def iter_keys(self, prefix: str = "", modified_before: Optional[float] = None) -> Iterator[str]:
+        """Iterate keys of both tiers"""
+        seen = set()
+        for key in self.hot.iter_keys(prefix, modified_before):
+            seen.add(key)
+            yield key
+        for key in self.cold.iter_keys(prefix, modified_before):
+            if key not in seen:
+                yield key
@@ -3,19 +3,29 @@ PostgreSQL Repository Implementation
 For production deployment on Render, Railway, etc.
 """
 import os
-from typing import List, Optional
+import time
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Boolean, Index
+from sqlalchemy import create_engine, func, inspect, text, not_, or_, and_, tuple_, Column, String, Text, DateTime, Boolean, Index
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 
-from domain.entities import GalmuriItem, OCRStatus, Platform
+from domain.entities import BLOB_REFERENCE_PREFIX, GalmuriItem, OCRStatus, Platform
 from domain.repositories import IGalmuriRepository
+from domain.search import (
+    FacetCounts, SearchPage, SearchQuery, TextFilter, normalize_text, search_document, top_facet_values,
+    url_hash, url_host
+)
 
 Base = declarative_base()
 
+# Text filter fields whose SQL condition is exactly TextFilter.matches()
+# (the search document holds the normalized fields, the host column the host)
+EXACT_TEXT_FIELDS = ("any", "site")
+
 
 class GalmuriItemModel(Base):
     """SQLAlchemy model for PostgreSQL"""
@@ -25,10 +35,19 @@ class GalmuriItemModel(Base):
     user_id = Column(String(36), nullable=False, index=True)
     image_data = Column(Text, nullable=False)
     source_url = Column(String(2048), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    perceptual_hash = Column(String(16), nullable=True)
     page_title = Column(String(512), nullable=False)
     memo_content = Column(Text, nullable=True)
     ocr_text = Column(Text, nullable=True)
     ocr_status = Column(String(20), nullable=False, default="PENDING")
+    ocr_engine = Column(String(64), nullable=True)
+    ocr_engine_version = Column(String(64), nullable=True)
+    text_minhash = Column(Text, nullable=True)
+    # NULL until written by save() or backfill_search_documents()
+    search_document = Column(Text, nullable=True)
+    host = Column(String(255), nullable=True)
+    url_hash = Column(String(64), nullable=True)
     platform = Column(String(20), nullable=False, default="WEB_EXTENSION")
     is_synced = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, nullable=False)
@@ -39,9 +58,24 @@ class GalmuriItemModel(Base):
         Index('idx_user_id', 'user_id'),
         Index('idx_is_synced', 'is_synced'),
         Index('idx_created_at', 'created_at'),
+        Index('idx_ocr_status', 'ocr_status', 'created_at'),
+        Index('idx_user_content_hash', 'user_id', 'content_hash'),
+        Index('idx_user_created', 'user_id', 'created_at'),
+        Index('idx_user_host_created', 'user_id', 'host', 'created_at'),
+        Index('idx_user_url_hash', 'user_id', 'url_hash'),
+        # Blob references only; inline images are far too large to index
+        Index('idx_image_reference', 'image_data', postgresql_where=text("image_data LIKE 'blob:%'")),
     )
 
 
+# Facet -> SQL expression giving the value facet_counts() would
+FACET_COLUMNS = {
+    "platform": GalmuriItemModel.platform,
+    "status": GalmuriItemModel.ocr_status,
+    "site": func.coalesce(GalmuriItemModel.host, ""),
+    "month": func.to_char(GalmuriItemModel.created_at, "YYYY-MM"),
+}
+
 class PostgresGalmuriRepository(IGalmuriRepository):
     """
     PostgreSQL implementation of IGalmuriRepository
@@ -62,8 +96,37 @@ class PostgresGalmuriRepository(IGalmuriRepository):
             pool_recycle=3600,   # Recycle connections after 1 hour
         )
         Base.metadata.create_all(self.engine)
+        self._migrate()
         self.Session = sessionmaker(bind=self.engine)
     
+    def _migrate(self) -> None:
+        """Bring tables created by older versions up to date"""
+        # create_all() skips existing tables, so add columns and indexes
+        # introduced later (added columns are always nullable)
+        table = GalmuriItemModel.__table__
+        existing = {column['name'] for column in inspect(self.engine).get_columns(table.name)}
+        
+        with self.engine.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        
+        for index in table.indexes:
+            index.create(self.engine, checkfirst=True)
+        
+        # Trigram index for substring search on the search document; needs
+        # the pg_trgm extension, without which searches scan the user's rows
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_search_document_trgm "
+                    f"ON {table.name} USING gin (search_document gin_trgm_ops)"
+                ))
+        except Exception as e:
+            print(f"Trigram search index not created: {str(e)}")
+    
     def _to_entity(self, model: GalmuriItemModel) -> GalmuriItem:
         """Convert SQLAlchemy model to domain entity"""
         return GalmuriItem(
@@ -71,10 +134,15 @@ class PostgresGalmuriRepository(IGalmuriRepository):
             user_id=UUID(model.user_id),
             image_data=model.image_data,
             source_url=model.source_url,
+            content_hash=model.content_hash or '',
+            perceptual_hash=model.perceptual_hash or '',
             page_title=model.page_title,
             memo_content=model.memo_content or '',
             ocr_text=model.ocr_text or '',
             ocr_status=OCRStatus(model.ocr_status),
+            ocr_engine=model.ocr_engine or '',
+            ocr_engine_version=model.ocr_engine_version or '',
+            text_minhash=model.text_minhash or '',
             platform=Platform(model.platform),
             is_synced=model.is_synced,
             created_at=model.created_at,
@@ -88,10 +156,18 @@ class PostgresGalmuriRepository(IGalmuriRepository):
             user_id=str(entity.user_id),
             image_data=entity.image_data,
             source_url=entity.source_url,
+            content_hash=entity.content_hash,
+            perceptual_hash=entity.perceptual_hash,
             page_title=entity.page_title,
             memo_content=entity.memo_content,
             ocr_text=entity.ocr_text,
             ocr_status=entity.ocr_status.value,
+            ocr_engine=entity.ocr_engine,
+            ocr_engine_version=entity.ocr_engine_version,
+            text_minhash=entity.text_minhash,
+            search_document=search_document(entity),
+            host=url_host(entity.source_url),
+            url_hash=url_hash(entity.source_url),
             platform=entity.platform.value,
             is_synced=entity.is_synced,
             created_at=entity.created_at,
@@ -126,6 +202,20 @@ class PostgresGalmuriRepository(IGalmuriRepository):
         finally:
             session.close()
     
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        """Find several items by ID (missing IDs are skipped, order is not kept)"""
+        if not item_ids:
+            return []
+        session: Session = self.Session()
+        try:
+            models = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.id.in_([str(item_id) for item_id in item_ids])
+            ).all()
+            
+            return [self._to_entity(model) for model in models]
+        finally:
+            session.close()
+    
     async def find_by_user_id(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all items for a user"""
         session: Session = self.Session()
@@ -142,20 +232,276 @@ class PostgresGalmuriRepository(IGalmuriRepository):
         """Search items by query"""
         session: Session = self.Session()
         try:
-            search_pattern = f"%{query}%"
             models = session.query(GalmuriItemModel).filter(
                 GalmuriItemModel.user_id == str(user_id),
-                (
-                    GalmuriItemModel.page_title.ilike(search_pattern) |
-                    GalmuriItemModel.memo_content.ilike(search_pattern) |
-                    GalmuriItemModel.ocr_text.ilike(search_pattern)
-                )
+                GalmuriItemModel.search_document.like(self._like_pattern(normalize_text(query)), escape="\\")
             ).order_by(GalmuriItemModel.created_at.desc()).all()
             
             return [self._to_entity(model) for model in models]
         finally:
             session.close()
     
+    @staticmethod
+    def _like_pattern(value: str) -> str:
+        """LIKE pattern matching value anywhere (with escape '\\')"""
+        escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return f"%{escaped}%"
+    
+    @classmethod
+    def _text_condition(cls, text_filter: TextFilter):
+        """SQL prefilter for a text filter; SearchQuery.matches() has the final say"""
+        if text_filter.field == "site":
+            # The host or a subdomain of it, like TextFilter.matches()
+            site = url_host(text_filter.value)
+            column = GalmuriItemModel.host
+            condition = or_(column == site, column.like("%." + cls._like_pattern(site)[1:-1], escape="\\"))
+            return not_(condition) if text_filter.negated else condition
+        if text_filter.field == "url":
+            column = GalmuriItemModel.source_url
+            condition = column.ilike(cls._like_pattern(text_filter.value), escape="\\")
+            # NULL URLs contain nothing, so they satisfy a negation
+            return not_(column.isnot(None) & condition) if text_filter.negated else condition
+        
+        # Title and memo matches are also matches in the search document,
+        # but their negations are not, so those are left to matches()
+        if text_filter.negated and text_filter.field != "any":
+            return None
+        condition = GalmuriItemModel.search_document.like(
+            cls._like_pattern(normalize_text(text_filter.value)), escape="\\"
+        )
+        return not_(condition) if text_filter.negated else condition
+    
+    @classmethod
+    def _query_filters(cls, user_id: UUID, query: SearchQuery) -> list:
+        """
+        SQL prefilters of a structured query
+        
+        Filters are added in evaluation order: the (user_id, created_at)
+        index bounds the rows, then cheap equality filters, then text
+        filters from the most selective to OCR text.
+        """
+        filters = [GalmuriItemModel.user_id == str(user_id)]
+        if query.created_from:
+            filters.append(GalmuriItemModel.created_at >= query.created_from)
+        if query.created_until:
+            filters.append(GalmuriItemModel.created_at < query.created_until)
+        if query.platforms:
+            filters.append(GalmuriItemModel.platform.in_([platform.value for platform in query.platforms]))
+        if query.statuses:
+            filters.append(GalmuriItemModel.ocr_status.in_([status.value for status in query.statuses]))
+        for text_filter in query.ordered_text_filters():
+            condition = cls._text_condition(text_filter)
+            if condition is not None:
+                filters.append(condition)
+        return filters
+    
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        """Find a user's items matching a structured query, newest first"""
+        session: Session = self.Session()
+        try:
+            models = session.query(GalmuriItemModel).filter(*self._query_filters(user_id, query)).order_by(
+                GalmuriItemModel.created_at.desc()
+            ).all()
+            
+            items = (self._to_entity(model) for model in models)
+            return [item for item in items if query.matches(item)]
+        finally:
+            session.close()
+    
+    async def search_page(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        limit: int,
+        deadline: Optional[float] = None,
+        offset: int = 0
+    ) -> SearchPage:
+        """
+        Find a user's newest items matching a structured query
+        
+        Rows are streamed newest first through a server-side cursor (whose
+        fast-start plans walk idx_user_created backwards), so a broad query
+        stops after `limit` matches past the offset (and one more for
+        has_more) and a selective one at the deadline. A statement timeout
+        bounds plans that scan or sort before the first row arrives.
+        """
+        session: Session = self.Session()
+        items: List[GalmuriItem] = []
+        skipped = 0
+        try:
+            if deadline is not None:
+                timeout_ms = max(1, int((deadline - time.monotonic()) * 1000))
+                session.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+            models = session.query(GalmuriItemModel).filter(*self._query_filters(user_id, query)).order_by(
+                GalmuriItemModel.created_at.desc()
+            ).yield_per(max(limit + 1, 50))
+            
+            for model in models:
+                if deadline is not None and time.monotonic() > deadline:
+                    return SearchPage.cut_off(items, limit)
+                item = self._to_entity(model)
+                if not query.matches(item):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                elif len(items) < limit:
+                    items.append(item)
+                else:
+                    return SearchPage(items=items, has_more=True)
+            return SearchPage(items=items)
+        except OperationalError as e:
+            if "statement timeout" not in str(e):
+                raise
+            session.rollback()
+            return SearchPage.cut_off(items, limit)
+        finally:
+            session.close()
+    
+    async def count_facets(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        facets: List[str],
+        deadline: Optional[float] = None
+    ) -> FacetCounts:
+        """
+        Count every item matching a query per value of each facet
+        
+        Queries SQL matches exactly are counted by one GROUPING SETS query
+        (a set per facet). Others (title:, memo:, url: filters) stream only
+        the facet values and the fields those filters confirm, never image
+        data. A statement timeout and a check per row stop either at the
+        deadline.
+        """
+        if not facets:
+            return FacetCounts(counts={})
+        columns = [FACET_COLUMNS[facet] for facet in facets]
+        # SQL conditions for these fields only narrow the candidates
+        confirm = [text_filter for text_filter in query.text_filters if text_filter.field not in EXACT_TEXT_FIELDS]
+        session: Session = self.Session()
+        counts: Dict[str, Dict[str, int]] = {facet: {} for facet in facets}
+        try:
+            if deadline is not None:
+                timeout_ms = max(1, int((deadline - time.monotonic()) * 1000))
+                session.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+            if confirm:
+                rows = session.query(
+                    *columns, GalmuriItemModel.page_title, GalmuriItemModel.memo_content, GalmuriItemModel.source_url
+                ).filter(*self._query_filters(user_id, query)).yield_per(1000)
+                for row in rows:
+                    if deadline is not None and time.monotonic() > deadline:
+                        return self._facet_counts(counts, truncated=True)
+                    fields = GalmuriItem(
+                        user_id=user_id, page_title=row[-3], memo_content=row[-2] or "", source_url=row[-1]
+                    )
+                    if not all(text_filter.matches(fields) for text_filter in confirm):
+                        continue
+                    for facet, value in zip(facets, row):
+                        counts[facet][value] = counts[facet].get(value, 0) + 1
+                return self._facet_counts(counts)
+            
+            rows = session.query(
+                *columns, *(func.grouping(column) for column in columns), func.count()
+            ).filter(*self._query_filters(user_id, query)).group_by(
+                func.grouping_sets(*(tuple_(column) for column in columns))
+            ).all()
+            for row in rows:
+                # GROUPING() is 0 for the one column this row is grouped by
+                position = list(row[len(facets):-1]).index(0)
+                counts[facets[position]][row[position]] = row[-1]
+            return self._facet_counts(counts)
+        except OperationalError as e:
+            if "statement timeout" not in str(e):
+                raise
+            session.rollback()
+            return self._facet_counts(counts, truncated=True)
+        finally:
+            session.close()
+    
+    @staticmethod
+    def _facet_counts(counts: Dict[str, Dict[str, int]], truncated: bool = False) -> FacetCounts:
+        """The most common values of each facet"""
+        return FacetCounts(
+            counts={facet: top_facet_values(values) for facet, values in counts.items()}, truncated=truncated
+        )
+    
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a host, as url_host() gives it"""
+        host = url_host(host)
+        if not host:
+            return []
+        session: Session = self.Session()
+        try:
+            models = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.host == host
+            ).order_by(GalmuriItemModel.created_at.desc()).limit(limit).all()
+            
+            return [self._to_entity(model) for model in models]
+        finally:
+            session.close()
+    
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        """Find a user's newest items captured from a page, compared by url_hash()"""
+        hashed = url_hash(url)
+        if not hashed:
+            return []
+        session: Session = self.Session()
+        try:
+            models = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.url_hash == hashed
+            ).order_by(GalmuriItemModel.created_at.desc()).limit(limit).all()
+            
+            return [self._to_entity(model) for model in models]
+        finally:
+            session.close()
+    
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        """(host, number of items) for each host a user captured from, most items first"""
+        session: Session = self.Session()
+        try:
+            items = func.count(GalmuriItemModel.id)
+            rows = session.query(GalmuriItemModel.host, items).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.host > ''
+            ).group_by(GalmuriItemModel.host).order_by(items.desc(), GalmuriItemModel.host).all()
+            
+            return [(host, count) for host, count in rows]
+        finally:
+            session.close()
+    
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        """Write the search document, host and URL hash of rows saved before they were stored"""
+        session: Session = self.Session()
+        try:
+            updated = 0
+            while True:
+                rows = session.query(
+                    GalmuriItemModel.id, GalmuriItemModel.page_title,
+                    GalmuriItemModel.memo_content, GalmuriItemModel.ocr_text, GalmuriItemModel.source_url
+                ).filter(or_(
+                    GalmuriItemModel.search_document.is_(None),
+                    GalmuriItemModel.host.is_(None),
+                    GalmuriItemModel.url_hash.is_(None)
+                )).limit(batch_size).all()
+                if not rows:
+                    return updated
+                for item_id, title, memo, ocr_text, source_url in rows:
+                    document = search_document(GalmuriItem(page_title=title, memo_content=memo, ocr_text=ocr_text))
+                    session.query(GalmuriItemModel).filter(GalmuriItemModel.id == item_id).update({
+                        GalmuriItemModel.search_document: document,
+                        GalmuriItemModel.host: url_host(source_url),
+                        GalmuriItemModel.url_hash: url_hash(source_url),
+                    }, synchronize_session=False)
+                session.commit()
+                updated += len(rows)
+        except Exception as e:
+            session.rollback()
+            raise e
+        finally:
+            session.close()
+    
     async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
         """Find all unsynced items for a user"""
         session: Session = self.Session()
@@ -169,6 +515,141 @@ class PostgresGalmuriRepository(IGalmuriRepository):
         finally:
             session.close()
     
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        """Find items in an OCR state across all users, oldest first"""
+        session: Session = self.Session()
+        try:
+            models = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.ocr_status == status.value
+            ).order_by(GalmuriItemModel.created_at.asc()).limit(limit).all()
+            
+            return [self._to_entity(model) for model in models]
+        finally:
+            session.close()
+    
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        """Find a user's item whose image has the given SHA-256, oldest first"""
+        session: Session = self.Session()
+        try:
+            model = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.content_hash == content_hash
+            ).order_by(GalmuriItemModel.created_at.asc()).first()
+            
+            return self._to_entity(model) if model else None
+        finally:
+            session.close()
+    
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, perceptual hash) of a user's items that have one"""
+        session: Session = self.Session()
+        try:
+            rows = session.query(GalmuriItemModel.id, GalmuriItemModel.perceptual_hash).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.perceptual_hash != ''
+            ).all()
+            
+            return [(UUID(item_id), perceptual_hash) for item_id, perceptual_hash in rows]
+        finally:
+            session.close()
+    
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        """Find (item ID, OCR text MinHash signature) of a user's items that have one"""
+        session: Session = self.Session()
+        try:
+            rows = session.query(GalmuriItemModel.id, GalmuriItemModel.text_minhash).filter(
+                GalmuriItemModel.user_id == str(user_id),
+                GalmuriItemModel.text_minhash != ''
+            ).all()
+            
+            return [(UUID(item_id), signature) for item_id, signature in rows]
+        finally:
+            session.close()
+    
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        """Find a user's items with only their text fields and times loaded"""
+        session: Session = self.Session()
+        try:
+            rows = session.query(
+                GalmuriItemModel.id,
+                GalmuriItemModel.source_url,
+                GalmuriItemModel.page_title,
+                GalmuriItemModel.memo_content,
+                GalmuriItemModel.ocr_text,
+                GalmuriItemModel.ocr_status,
+                GalmuriItemModel.created_at,
+                GalmuriItemModel.updated_at
+            ).filter(GalmuriItemModel.user_id == str(user_id)).all()
+            
+            return [
+                GalmuriItem(
+                    id=UUID(row.id),
+                    user_id=user_id,
+                    source_url=row.source_url,
+                    page_title=row.page_title,
+                    memo_content=row.memo_content or '',
+                    ocr_text=row.ocr_text or '',
+                    ocr_status=OCRStatus(row.ocr_status),
+                    created_at=row.created_at,
+                    updated_at=row.updated_at
+                )
+                for row in rows
+            ]
+        finally:
+            session.close()
+    
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        """Number of a user's items and their latest updated_at"""
+        session: Session = self.Session()
+        try:
+            count, last_updated = session.query(
+                func.count(GalmuriItemModel.id), func.max(GalmuriItemModel.updated_at)
+            ).filter(GalmuriItemModel.user_id == str(user_id)).one()
+            
+            return count, last_updated
+        finally:
+            session.close()
+    
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        """Find items created before a time whose image is still stored inline, oldest first"""
+        session: Session = self.Session()
+        try:
+            db_query = session.query(GalmuriItemModel).filter(
+                GalmuriItemModel.created_at < created_before,
+                ~GalmuriItemModel.image_data.startswith(BLOB_REFERENCE_PREFIX)
+            )
+            if after is not None:
+                db_query = db_query.filter(or_(
+                    GalmuriItemModel.created_at > after[0],
+                    and_(GalmuriItemModel.created_at == after[0], GalmuriItemModel.id > str(after[1]))
+                ))
+            models = db_query.order_by(
+                GalmuriItemModel.created_at.asc(), GalmuriItemModel.id.asc()
+            ).limit(limit).all()
+            
+            return [self._to_entity(model) for model in models]
+        finally:
+            session.close()
+    
+    async def is_image_referenced(self, image_data: str) -> bool:
+        """Whether any item (of any user) has this blob reference as its image"""
+        session: Session = self.Session()
+        try:
+            # The LIKE term matches the partial index's, so the index is used
+            model_id = session.query(GalmuriItemModel.id).filter(
+                GalmuriItemModel.image_data == image_data,
+                GalmuriItemModel.image_data.like("blob:%")
+            ).first()
+            
+            return model_id is not None
+        finally:
+            session.close()
+    
     async def delete(self, item_id: UUID) -> bool:
         """Delete an item"""
         session: Session = self.Session()
@@ -0,0 +1,253 @@
+"""
+Search result cache
+Keeps the matching item IDs of recent searches per user. Every user has a
+generation counter, bumped by any write to their items (saves, including
+OCR completion, and deletes); an entry is only served while the generation
+it was computed at is current, so results stay valid until the user's data
+actually changes.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from domain.entities import GalmuriItem, OCRStatus
+from domain.repositories import IGalmuriRepository
+from domain.search import FacetCounts, SearchPage, SearchQuery, normalize_text
+
+# Rough per-entry overhead (tuple, key string, dict slot) on top of the ID bytes
+_ENTRY_OVERHEAD = 200
+
+# Trailing ID of a cached search page with more matches after it (never an item ID)
+_HAS_MORE = UUID(int=0)
+
+
+class SearchResultCache:
+    """Least recently used cache of search results, bounded by an estimate of its memory"""
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        """
+        Initialize cache
+
+        Args:
+            max_bytes: Memory budget; results over a quarter of it are not cached
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # (user_id, key) -> (generation, packed 16-byte item IDs)
+        self._entries: "OrderedDict[Tuple[UUID, str], Tuple[int, bytes]]" = OrderedDict()
+        self._generations: Dict[UUID, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def generation(self, user_id: UUID) -> int:
+        """Current generation of a user's items; read it before running a search"""
+        return self._epoch + self._generations.get(user_id, 0)
+
+    def get(self, user_id: UUID, key: str) -> Optional[List[UUID]]:
+        """Cached item IDs for a search, if still current"""
+        entry = self._entries.get((user_id, key))
+        if entry is None:
+            self.misses += 1
+            return None
+        generation, packed = entry
+        if generation != self.generation(user_id):
+            self.stale += 1
+            self.misses += 1
+            self._drop((user_id, key))
+            return None
+        self.hits += 1
+        self._entries.move_to_end((user_id, key))
+        return [UUID(bytes=packed[start:start + 16]) for start in range(0, len(packed), 16)]
+
+    def put(self, user_id: UUID, key: str, generation: int, item_ids: List[UUID]) -> None:
+        """
+        Cache the result of a search
+
+        Args:
+            generation: generation() read before the search ran, so a write
+                that raced with it leaves the entry stale
+        """
+        if generation != self.generation(user_id):
+            return
+        packed = b"".join(item_id.bytes for item_id in item_ids)
+        if len(packed) + _ENTRY_OVERHEAD > self.max_bytes // 4:
+            return
+        self._drop((user_id, key))
+        self._entries[(user_id, key)] = (generation, packed)
+        self.bytes += len(packed) + len(key) + _ENTRY_OVERHEAD
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, entry_key: Tuple[UUID, str]) -> None:
+        entry = self._entries.pop(entry_key, None)
+        if entry is not None:
+            self.bytes -= len(entry[1]) + len(entry_key[1]) + _ENTRY_OVERHEAD
+
+    def invalidate(self, user_id: UUID) -> None:
+        """Mark a user's cached results stale after their items changed"""
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def invalidate_all(self) -> None:
+        """Mark every cached result stale"""
+        self._epoch += 1
+
+    def stats(self) -> dict:
+        """Entries, memory and hit rate since start"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class CachedGalmuriRepository(IGalmuriRepository):
+    """
+    Repository decorator answering repeated searches from a SearchResultCache
+
+    save() and delete() invalidate the user's cached results; every other
+    call goes to the wrapped repository.
+    """
+
+    def __init__(self, inner: IGalmuriRepository, cache: SearchResultCache):
+        """
+        Initialize repository
+
+        Args:
+            inner: Repository holding the items
+            cache: Shared result cache
+        """
+        self.inner = inner
+        self.cache = cache
+
+    async def _cached(self, user_id: UUID, key: str, run) -> List[GalmuriItem]:
+        item_ids = self.cache.get(user_id, key)
+        if item_ids is not None:
+            return await self._fetch(item_ids)
+        generation = self.cache.generation(user_id)
+        items = await run()
+        self.cache.put(user_id, key, generation, [item.id for item in items])
+        return items
+
+    async def _fetch(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        """Items by ID, in the given order"""
+        items = {item.id: item for item in await self.inner.find_by_ids(item_ids)}
+        return [items[item_id] for item_id in item_ids if item_id in items]
+
+    async def save(self, item: GalmuriItem) -> GalmuriItem:
+        saved = await self.inner.save(item)
+        self.cache.invalidate(saved.user_id)
+        return saved
+
+    async def find_by_id(self, item_id: UUID) -> Optional[GalmuriItem]:
+        return await self.inner.find_by_id(item_id)
+
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        return await self.inner.find_by_ids(item_ids)
+
+    async def find_by_user_id(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_by_user_id(user_id)
+
+    async def search(self, user_id: UUID, query: str) -> List[GalmuriItem]:
+        return await self._cached(
+            user_id, f"search:{normalize_text(query)}", lambda: self.inner.search(user_id, query)
+        )
+
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        return await self._cached(
+            user_id, f"query:{query!r}", lambda: self.inner.find_by_query(user_id, query)
+        )
+
+    async def search_page(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        limit: int,
+        deadline: Optional[float] = None,
+        offset: int = 0
+    ) -> SearchPage:
+        """Find a user's newest items matching a query; truncated pages are not cached"""
+        key = f"page:{offset}:{limit}:{query!r}"
+        item_ids = self.cache.get(user_id, key)
+        if item_ids is not None:
+            has_more = item_ids[-1:] == [_HAS_MORE]
+            return SearchPage(items=await self._fetch(item_ids[:limit]), has_more=has_more)
+        generation = self.cache.generation(user_id)
+        page = await self.inner.search_page(user_id, query, limit, deadline, offset)
+        if not page.truncated:
+            item_ids = [item.id for item in page.items] + ([_HAS_MORE] if page.has_more else [])
+            self.cache.put(user_id, key, generation, item_ids)
+        return page
+
+    async def count_facets(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        facets: List[str],
+        deadline: Optional[float] = None
+    ) -> FacetCounts:
+        return await self.inner.count_facets(user_id, query, facets, deadline)
+
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        return await self.inner.find_by_host(user_id, host, limit)
+
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        return await self.inner.find_by_url(user_id, url, limit)
+
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        return await self.inner.count_by_host(user_id)
+
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        updated = await self.inner.backfill_search_documents(batch_size)
+        if updated:
+            self.cache.invalidate_all()
+        return updated
+
+    async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_unsynced(user_id)
+
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        return await self.inner.find_by_ocr_status(status, limit)
+
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        return await self.inner.find_by_content_hash(user_id, content_hash)
+
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return await self.inner.find_perceptual_hashes(user_id)
+
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return await self.inner.find_text_signatures(user_id)
+
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_search_texts(user_id)
+
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        return await self.inner.find_watermark(user_id)
+
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        return await self.inner.find_inline_images(created_before, limit, after)
+
+    async def is_image_referenced(self, image_data: str) -> bool:
+        return await self.inner.is_image_referenced(image_data)
+
+    async def delete(self, item_id: UUID) -> bool:
+        item = await self.inner.find_by_id(item_id)
+        deleted = await self.inner.delete(item_id)
+        if deleted and item is not None:
+            self.cache.invalidate(item.user_id)
+        return deleted
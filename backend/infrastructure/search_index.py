@@ -0,0 +1,520 @@
+"""
+Substring search index
+An in-process inverted index over character bigrams of each item's title,
+memo and OCR text. Character n-grams need no word segmentation, so partial
+Korean words ("배달" in "배달의민족") match, which LIKE-based search does
+slowly and FTS tokenizers miss. Each user's index is persisted as an
+append-only log, loaded on first search and evicted least recently used.
+
+The index lives in each server process. Writes made by another worker or
+instance only reach a user's index when it is next loaded: a log whose
+item count and latest update no longer match the database is rebuilt.
+Run a single worker with the index, or turn it off (SEARCH_INDEX_DIR="").
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from uuid import UUID
+
+from domain.entities import GalmuriItem, OCRStatus
+from domain.repositories import IGalmuriRepository
+from domain.search import FacetCounts, SearchPage, SearchQuery, normalize_text as normalize, search_document
+
+
+def bigrams(text: str) -> Set[str]:
+    """Character bigrams of normalized text"""
+    return {text[index:index + 2] for index in range(len(text) - 1)}
+
+
+def time_key(moment: Optional[datetime]) -> float:
+    """Seconds since datetime.min of a wall-clock time (like the databases' order)"""
+    return ((moment or datetime.min).replace(tzinfo=None) - datetime.min).total_seconds()
+
+
+def created_key(item: GalmuriItem) -> float:
+    """Sort key of an item's creation time, newest largest"""
+    return time_key(item.created_at)
+
+
+# Estimated memory of an indexed item besides its text, of a bigram's
+# posting set, and of one item in a posting set (measured with tracemalloc)
+_DOC_BYTES = 200
+_GRAM_BYTES = 300
+_POSTING_BYTES = 48
+
+
+class _StaleLog(Exception):
+    """A log written by a version that did not record creation or update times"""
+
+
+class _UserIndex:
+    """One user's postings; item IDs are mapped to small integers to save memory"""
+
+    def __init__(self):
+        self.texts: Dict[int, str] = {}
+        self.created: Dict[int, float] = {}
+        self.updated: Dict[int, float] = {}
+        self.postings: Dict[str, Set[int]] = {}
+        self.doc_of: Dict[UUID, int] = {}
+        self.id_of: Dict[int, UUID] = {}
+        self.log_entries = 0
+        # Estimated memory of texts and postings
+        self.bytes = 0
+        self._next_doc = 0
+
+    def put(self, item_id: UUID, text: str, created: float, updated: float) -> None:
+        doc = self.doc_of.get(item_id)
+        if doc is not None:
+            self.created[doc] = created
+            self.updated[doc] = updated
+            if self.texts[doc] == text:
+                return
+            self._unindex(doc)
+        else:
+            doc = self._next_doc
+            self._next_doc += 1
+            self.doc_of[item_id] = doc
+            self.id_of[doc] = item_id
+            self.created[doc] = created
+            self.updated[doc] = updated
+            self.bytes += _DOC_BYTES
+        self.texts[doc] = text
+        self.bytes += sys.getsizeof(text)
+        for gram in bigrams(text):
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = set()
+                self.bytes += _GRAM_BYTES
+            posting.add(doc)
+            self.bytes += _POSTING_BYTES
+
+    def discard(self, item_id: UUID) -> None:
+        doc = self.doc_of.pop(item_id, None)
+        if doc is not None:
+            self._unindex(doc)
+            del self.texts[doc]
+            del self.created[doc]
+            del self.updated[doc]
+            del self.id_of[doc]
+            self.bytes -= _DOC_BYTES
+
+    def watermark(self) -> Tuple[int, Optional[float]]:
+        """Item count and latest update time, to compare with the repository's"""
+        return len(self.texts), max(self.updated.values(), default=None)
+
+    def _unindex(self, doc: int) -> None:
+        text = self.texts[doc]
+        self.bytes -= sys.getsizeof(text)
+        for gram in bigrams(text):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(doc)
+                self.bytes -= _POSTING_BYTES
+                if not posting:
+                    del self.postings[gram]
+                    self.bytes -= _GRAM_BYTES
+
+    def search(self, query: str) -> List[UUID]:
+        return [self.id_of[doc] for doc in self.search_docs(query)]
+
+    def search_docs(self, query: str) -> Set[int]:
+        if len(query) < 2:
+            # Single characters are not indexed; the in-memory texts are still
+            # far cheaper to scan than the database
+            return {doc for doc, text in self.texts.items() if query in text}
+
+        # Intersect the rarest postings first, so the candidate set shrinks fast
+        grams = sorted(bigrams(query), key=lambda gram: len(self.postings.get(gram, ())))
+        candidates: Optional[Set[int]] = None
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        # Bigrams can all occur without the whole query occurring; verify
+        return {doc for doc in candidates if query in self.texts[doc]}
+
+    def newest(self, queries: List[str]) -> Iterator[UUID]:
+        """IDs of items containing every query, newest first, ordered lazily"""
+        docs: Optional[Set[int]] = None
+        for query in queries:
+            found = self.search_docs(query)
+            docs = found if docs is None else docs & found
+            if not docs:
+                return
+        # Heapify is linear; each item taken costs a log-time pop, so
+        # reading the first k of n candidates does not sort all n
+        heap = [(-self.created[doc], doc) for doc in docs or ()]
+        heapq.heapify(heap)
+        while heap:
+            yield self.id_of[heapq.heappop(heap)[1]]
+
+
+class NgramIndex:
+    """
+    Per-user substring indexes persisted under root_dir
+
+    Each user has a JSON-lines log (<user_id>.log) of {"id", "text",
+    "created", "updated"} and {"id", "deleted"} entries, replayed on load and rewritten once it holds
+    far more entries than live items. A user without a log, or whose log
+    disagrees with the repository's find_watermark() (a crash between a
+    save and its log entry, writes from another process), is built from
+    the repository on first search. Users are evicted least recently used
+    once there are more than max_users or their estimated memory exceeds
+    max_bytes; the most recently used one is always kept.
+    """
+
+    def __init__(self, root_dir: str, max_users: int = 32, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize index
+
+        Args:
+            root_dir: Directory holding the per-user logs
+            max_users: Users kept in memory before the least recently used is evicted
+            max_bytes: Memory budget of the users kept, as estimated from
+                their texts and postings
+        """
+        self.root_dir = Path(root_dir)
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._users: "OrderedDict[UUID, _UserIndex]" = OrderedDict()
+        self._loading: Dict[UUID, List[Tuple[UUID, Optional[str], float, float]]] = {}
+        self._locks: Dict[UUID, asyncio.Lock] = {}
+
+    def _log_path(self, user_id: UUID) -> Path:
+        return self.root_dir / f"{user_id}.log"
+
+    async def _user(self, user_id: UUID, repository: IGalmuriRepository) -> _UserIndex:
+        """A user's index, loading it on first use"""
+        index = self._users.get(user_id)
+        if index is not None:
+            self._users.move_to_end(user_id)
+            return index
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            index = self._users.get(user_id)
+            if index is None:
+                # Changes made while loading are queued and applied afterwards
+                self._loading[user_id] = []
+                try:
+                    index = None
+                    if self._log_path(user_id).exists():
+                        try:
+                            index = await asyncio.to_thread(self._replay, user_id)
+                        except _StaleLog:
+                            pass
+                    if index is not None:
+                        count, last_updated = await repository.find_watermark(user_id)
+                        if index.watermark() != (count, time_key(last_updated) if last_updated else None):
+                            index = None
+                    if index is None:
+                        items = await repository.find_search_texts(user_id)
+                        index = _UserIndex()
+                        for item in items:
+                            index.put(item.id, search_document(item), created_key(item), time_key(item.updated_at))
+                        await asyncio.to_thread(self._write_snapshot, user_id, index)
+                    for item_id, text, created, updated in self._loading[user_id]:
+                        self._apply(user_id, index, item_id, text, created, updated)
+                finally:
+                    del self._loading[user_id]
+                self._users[user_id] = index
+                self._evict()
+        return index
+
+    def _evict(self) -> None:
+        """Drop least recently used users over the user or memory bound"""
+        while len(self._users) > 1 and (
+            len(self._users) > self.max_users or self.bytes() > self.max_bytes
+        ):
+            self._users.popitem(last=False)
+
+    def bytes(self) -> int:
+        """Estimated memory of the users in memory"""
+        return sum(index.bytes for index in self._users.values())
+
+    def stats(self) -> dict:
+        """Users in memory and their estimated size"""
+        return {"users": len(self._users), "bytes": self.bytes(), "max_bytes": self.max_bytes}
+
+    def _replay(self, user_id: UUID) -> _UserIndex:
+        index = _UserIndex()
+        with open(self._log_path(user_id), encoding="utf-8") as log:
+            for line in log:
+                try:
+                    entry = json.loads(line)
+                    item_id = UUID(entry["id"])
+                except (ValueError, KeyError):
+                    continue  # A torn final line from a crash mid-append
+                index.log_entries += 1
+                if entry.get("deleted"):
+                    index.discard(item_id)
+                elif "created" not in entry or "updated" not in entry:
+                    raise _StaleLog()
+                else:
+                    index.put(item_id, entry["text"], entry["created"], entry["updated"])
+        if index.log_entries > 2 * len(index.texts) + 100:
+            self._write_snapshot(user_id, index)
+        return index
+
+    def _write_snapshot(self, user_id: UUID, index: _UserIndex) -> None:
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+        path = self._log_path(user_id)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as log:
+            for doc, text in index.texts.items():
+                entry = {
+                    "id": str(index.id_of[doc]),
+                    "text": text,
+                    "created": index.created[doc],
+                    "updated": index.updated[doc]
+                }
+                log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temp_path, path)
+        index.log_entries = len(index.texts)
+
+    def _append(self, user_id: UUID, item_id: UUID, text: Optional[str], created: float, updated: float) -> None:
+        if text is None:
+            entry = {"id": str(item_id), "deleted": True}
+        else:
+            entry = {"id": str(item_id), "text": text, "created": created, "updated": updated}
+        with open(self._log_path(user_id), "a", encoding="utf-8") as log:
+            log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _apply(
+        self,
+        user_id: UUID,
+        index: Optional[_UserIndex],
+        item_id: UUID,
+        text: Optional[str],
+        created: float,
+        updated: float
+    ) -> None:
+        """Record a change: in memory if the user is loaded, in the log if one exists"""
+        if index is not None:
+            if text is None:
+                if item_id not in index.doc_of:
+                    return
+                index.discard(item_id)
+            else:
+                doc = index.doc_of.get(item_id)
+                if (
+                    doc is not None and index.texts[doc] == text
+                    and index.created[doc] == created and index.updated[doc] == updated
+                ):
+                    return
+                index.put(item_id, text, created, updated)
+            index.log_entries += 1
+            self._evict()
+        if self._log_path(user_id).exists():
+            self._append(user_id, item_id, text, created, updated)
+
+    def update(self, item: GalmuriItem) -> None:
+        """Index an item's current text (users without an index pick it up on first search)"""
+        self._change(item.user_id, item.id, search_document(item), created_key(item), time_key(item.updated_at))
+
+    def remove(self, user_id: UUID, item_id: UUID) -> None:
+        """Drop a deleted item"""
+        self._change(user_id, item_id, None, 0.0, 0.0)
+
+    def _change(self, user_id: UUID, item_id: UUID, text: Optional[str], created: float, updated: float) -> None:
+        pending = self._loading.get(user_id)
+        if pending is not None:
+            pending.append((item_id, text, created, updated))
+            return
+        try:
+            self._apply(user_id, self._users.get(user_id), item_id, text, created, updated)
+        except OSError as e:
+            # A missed log entry would go stale on disk; rebuild the user next time
+            print(f"Search index update failed for user {user_id}: {str(e)}")
+            self.invalidate(user_id)
+
+    def invalidate(self, user_id: UUID) -> None:
+        """Forget a user's index and log so it is rebuilt from the repository"""
+        self._users.pop(user_id, None)
+        self._log_path(user_id).unlink(missing_ok=True)
+
+    async def search(self, user_id: UUID, query: str, repository: IGalmuriRepository) -> List[UUID]:
+        """
+        Find a user's items whose title, memo or OCR text contains query
+
+        Returns:
+            Matching item IDs (unordered)
+        """
+        index = await self._user(user_id, repository)
+        return index.search(normalize(query))
+
+    async def newest(self, user_id: UUID, queries: List[str], repository: IGalmuriRepository) -> Iterator[UUID]:
+        """
+        Find a user's items whose text contains every query
+
+        Returns:
+            Matching item IDs, newest first, produced lazily
+        """
+        index = await self._user(user_id, repository)
+        return index.newest([normalize(query) for query in queries])
+
+
+class IndexedGalmuriRepository(IGalmuriRepository):
+    """
+    Repository decorator answering search() from an NgramIndex
+
+    Every other call goes to the wrapped repository; save() and delete()
+    also keep the index current.
+    """
+
+    def __init__(self, inner: IGalmuriRepository, index: NgramIndex):
+        """
+        Initialize repository
+
+        Args:
+            inner: Repository holding the items
+            index: Shared substring index
+        """
+        self.inner = inner
+        self.index = index
+
+    async def save(self, item: GalmuriItem) -> GalmuriItem:
+        saved = await self.inner.save(item)
+        self.index.update(saved)
+        return saved
+
+    async def find_by_id(self, item_id: UUID) -> Optional[GalmuriItem]:
+        return await self.inner.find_by_id(item_id)
+
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        return await self.inner.find_by_ids(item_ids)
+
+    async def find_by_user_id(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_by_user_id(user_id)
+
+    async def search(self, user_id: UUID, query: str) -> List[GalmuriItem]:
+        """Search items by query, newest first"""
+        if not normalize(query):
+            return await self.inner.search(user_id, query)
+        item_ids = await self.index.search(user_id, query, self.inner)
+        items = await self.inner.find_by_ids(item_ids) if item_ids else []
+        items.sort(key=lambda item: item.created_at or datetime.min, reverse=True)
+        return items
+
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        """Find items matching a structured query, narrowing by the index when it has terms"""
+        terms = [term for term in (normalize(value) for value in query.positive_terms()) if term]
+        if not terms:
+            return await self.inner.find_by_query(user_id, query)
+        # Each term narrows the candidates; stop as soon as none are left
+        candidates = None
+        for term in terms:
+            found = set(await self.index.search(user_id, term, self.inner))
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+        items = [item for item in await self.inner.find_by_ids(list(candidates)) if query.matches(item)]
+        items.sort(key=lambda item: item.created_at or datetime.min, reverse=True)
+        return items
+    
+    async def count_facets(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        facets: List[str],
+        deadline: Optional[float] = None
+    ) -> FacetCounts:
+        return await self.inner.count_facets(user_id, query, facets, deadline)
+    
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        return await self.inner.find_by_host(user_id, host, limit)
+    
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        return await self.inner.find_by_url(user_id, url, limit)
+    
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        return await self.inner.count_by_host(user_id)
+    
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        return await self.inner.backfill_search_documents(batch_size)
+    
+    async def search_page(
+        self,
+        user_id: UUID,
+        query: SearchQuery,
+        limit: int,
+        deadline: Optional[float] = None,
+        offset: int = 0
+    ) -> SearchPage:
+        """
+        Find a user's newest items matching a structured query
+
+        Candidates from the index are taken newest first and confirmed in
+        batches, stopping after `limit` matches past the offset (and one
+        more for has_more) or at the deadline.
+        """
+        terms = [term for term in (normalize(value) for value in query.positive_terms()) if term]
+        if not terms:
+            return await self.inner.search_page(user_id, query, limit, deadline, offset)
+        candidates = await self.index.newest(user_id, terms, self.inner)
+        items: List[GalmuriItem] = []
+        skipped = 0
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return SearchPage.cut_off(items, limit)
+            batch = list(itertools.islice(candidates, max(offset - skipped + limit + 1 - len(items), 16)))
+            if not batch:
+                return SearchPage(items=items)
+            found = {item.id: item for item in await self.inner.find_by_ids(batch)}
+            for item_id in batch:
+                if item_id not in found or not query.matches(found[item_id]):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                elif len(items) < limit:
+                    items.append(found[item_id])
+                else:
+                    return SearchPage(items=items, has_more=True)
+
+    async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_unsynced(user_id)
+
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        return await self.inner.find_by_ocr_status(status, limit)
+
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        return await self.inner.find_by_content_hash(user_id, content_hash)
+
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return await self.inner.find_perceptual_hashes(user_id)
+
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return await self.inner.find_text_signatures(user_id)
+
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        return await self.inner.find_search_texts(user_id)
+
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        return await self.inner.find_watermark(user_id)
+
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        return await self.inner.find_inline_images(created_before, limit, after)
+    
+    async def is_image_referenced(self, image_data: str) -> bool:
+        return await self.inner.is_image_referenced(image_data)
+
+    async def delete(self, item_id: UUID) -> bool:
+        item = await self.inner.find_by_id(item_id)
+        deleted = await self.inner.delete(item_id)
+        if deleted and item is not None:
+            self.index.remove(item.user_id, item_id)
+        return deleted
@@ -0,0 +1,154 @@
+"""
+Resumable upload sessions on local disk
+Each session is a partial data file plus a JSON metadata file; the
+committed offset is simply the size of the data file
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
+from uuid import UUID
+
+
+class UploadError(ValueError):
+    """Raised for invalid upload operations"""
+
+
+class UploadOffsetMismatch(UploadError):
+    """Raised when a chunk does not start at the committed offset"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+@dataclass
+class UploadSession:
+    """An upload in progress"""
+    upload_id: str
+    user_id: str
+    total_size: int
+    sha256: Optional[str] = None
+    metadata: dict = field(default_factory=dict)  # Capture fields applied at finalize
+    created_at: float = field(default_factory=time.time)
+    offset: int = 0
+
+
+class LocalUploadStore:
+    """
+    Stores upload sessions under root_dir
+    """
+
+    def __init__(self, root_dir: str = "uploads", max_bytes: int = 50 * 1024 * 1024, ttl_seconds: float = 86400):
+        """
+        Initialize upload store
+
+        Args:
+            root_dir: Directory for partial uploads
+            max_bytes: Largest upload accepted
+            ttl_seconds: Unfinished sessions older than this are purged
+        """
+        self.root = Path(root_dir).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def _paths(self, upload_id: str):
+        # Upload IDs are item UUIDs; normalizing also rejects path tricks
+        name = str(UUID(upload_id))
+        return self.root / f"{name}.part", self.root / f"{name}.json"
+
+    def create(self, session: UploadSession) -> UploadSession:
+        """
+        Create a session, or return the existing one with the same ID
+
+        Raises:
+            UploadError: If the size is out of bounds or the ID belongs
+                to a different upload
+        """
+        if session.total_size <= 0 or session.total_size > self.max_bytes:
+            raise UploadError(f"Upload size must be between 1 and {self.max_bytes} bytes")
+
+        existing = self.get(session.upload_id)
+        if existing is not None:
+            if existing.user_id != session.user_id or existing.total_size != session.total_size:
+                raise UploadError("Upload ID already in use for a different upload")
+            return existing
+
+        data_path, meta_path = self._paths(session.upload_id)
+        data_path.touch()
+        meta = asdict(session)
+        meta.pop("offset")
+        tmp_path = meta_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(meta))
+        os.replace(tmp_path, meta_path)
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        """Get a session with its committed offset"""
+        data_path, meta_path = self._paths(upload_id)
+        try:
+            meta = json.loads(meta_path.read_text())
+            offset = data_path.stat().st_size
+        except FileNotFoundError:
+            return None
+        return UploadSession(offset=offset, **meta)
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Append a chunk at the committed offset
+
+        Bytes that arrive before a dropped connection are kept, so the
+        client resumes from whatever offset was reached. The offset check
+        and the write are not atomic: callers serialize appends to one
+        upload.
+
+        Returns:
+            New committed offset
+
+        Raises:
+            UploadError: If the session is unknown or the chunk overruns the upload
+            UploadOffsetMismatch: If offset is not the committed offset
+        """
+        session = self.get(upload_id)
+        if session is None:
+            raise UploadError("Unknown upload")
+        if offset != session.offset:
+            raise UploadOffsetMismatch(session.offset)
+
+        data_path, _ = self._paths(upload_id)
+        written = session.offset
+        with open(data_path, "ab") as f:
+            async for chunk in chunks:
+                if written + len(chunk) > session.total_size:
+                    # Drop the overrun but keep what fit
+                    f.write(chunk[:session.total_size - written])
+                    raise UploadError("Chunk extends past the declared upload size")
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        return written
+
+    def read(self, upload_id: str) -> bytes:
+        """Read a complete upload"""
+        data_path, _ = self._paths(upload_id)
+        return data_path.read_bytes()
+
+    def delete(self, upload_id: str) -> None:
+        """Remove a session and its data"""
+        for path in self._paths(upload_id):
+            path.unlink(missing_ok=True)
+
+    def purge_expired(self) -> List[str]:
+        """Remove sessions older than the TTL; returns their IDs"""
+        cutoff = time.time() - self.ttl_seconds
+        expired = []
+        for meta_path in self.root.glob("*.json"):
+            if meta_path.stat().st_mtime < cutoff:
+                upload_id = meta_path.stem
+                self.delete(upload_id)
+                expired.append(upload_id)
+        return expired
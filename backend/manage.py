@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Galmuri Diary Backend - Management Commands
+Maintenance tasks run outside the server process
+
+Usage:
+    python manage.py compact [--days N] [--limit N]
+    python manage.py backfill-search [--batch-size N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from dotenv import load_dotenv
+
+# Load environment variables before the app reads its configuration
+load_dotenv()
+
+
+async def compact(days: float, limit: int) -> None:
+    """Move images older than `days` into the cold pack tier"""
+    from presentation import main
+
+    main.PACK_MIN_AGE_DAYS = days
+    report = await main.get_compactor().run(limit=limit)
+    print(
+        f"Compacted {report['items']} inline images ({report['item_bytes']} bytes) and "
+        f"{report['blobs']} blob files ({report['blob_bytes']} bytes) "
+        f"in {report['elapsed_ms']:.0f} ms, skipped {report['skipped']}"
+    )
+    blob_store = main.get_blob_store()
+    print(f"Cold tier: {blob_store.cold.stats()}")
+
+
+async def backfill_search(batch_size: int) -> None:
+    """Store the normalized search document, host and URL hash of items saved before they existed"""
+    from presentation import main
+
+    started = time.perf_counter()
+    updated = await main.get_repository().backfill_search_documents(batch_size)
+    print(f"Backfilled search columns of {updated} items in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def main():
+    """Parse arguments and run a command"""
+    parser = argparse.ArgumentParser(description="Galmuri Diary maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser("compact", help="Compact old images into pack files")
+    compact_parser.add_argument(
+        "--days", type=float, default=float(os.getenv("PACK_MIN_AGE_DAYS", "30")),
+        help="Minimum image age in days"
+    )
+    compact_parser.add_argument("--limit", type=int, default=10000, help="Maximum images per source")
+
+    backfill_parser = commands.add_parser(
+        "backfill-search", help="Store search documents, hosts and URL hashes for items saved by older versions"
+    )
+    backfill_parser.add_argument("--batch-size", type=int, default=500, help="Rows updated per transaction")
+
+    args = parser.parse_args()
+    try:
+        if args.command == "compact":
+            asyncio.run(compact(args.days, args.limit))
+        elif args.command == "backfill-search":
+            asyncio.run(backfill_search(args.batch_size))
+    except RuntimeError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Request body size limit
+Enforced while the body streams in, so an oversized upload is cut off
+after max_bytes instead of being buffered first
+"""
+import json
+
+from fastapi import HTTPException
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies larger than max_bytes with 413
+
+    A declared Content-Length over the limit is rejected before reading.
+    Bodies without one (chunked transfer) are counted as they arrive; the
+    HTTPException raised from receive() reaches FastAPI's exception
+    handling, which turns it into the 413 response.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        """
+        Initialize middleware
+
+        Args:
+            app: Wrapped ASGI application
+            max_bytes: Largest request body accepted
+        """
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self) -> str:
+        return f"Request body exceeds {self.max_bytes} bytes"
+
+    async def _reject(self, send) -> None:
+        body = json.dumps({"detail": self._detail()}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,134 @@
+"""
+HTTP responses for stored images
+Conditional requests (ETag) and single byte ranges, served from a
+local file when possible and from memory otherwise
+"""
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from application.image_store import StoredImage
+
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised when a byte range lies outside the resource"""
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header
+
+    Malformed and multi-range headers are ignored (the whole resource
+    is served), as RFC 9110 allows.
+
+    Returns:
+        Inclusive (start, end) offsets, or None to serve everything
+
+    Raises:
+        RangeNotSatisfiable: If the range starts past the end
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start_text, _, end_text = header[6:].strip().partition("-")
+    try:
+        if not start_text:
+            # Suffix range: the last N bytes
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(0, size - length), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as required for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def _read_file_range(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def stored_image_response(
+    image: StoredImage,
+    range_header: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_range: Optional[str] = None
+) -> Response:
+    """
+    Build the response for GET of a stored image
+
+    Args:
+        image: Image to serve
+        range_header: Request Range header
+        if_none_match: Request If-None-Match header
+        if_range: Request If-Range header (range is honoured only if it
+            matches the current ETag)
+
+    Returns:
+        304, 206, 416 or 200 response
+    """
+    headers = {
+        "ETag": image.etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if _etag_matches(if_none_match, image.etag):
+        return Response(status_code=304, headers=headers)
+
+    if if_range is not None and if_range.strip() != image.etag:
+        range_header = None
+    try:
+        byte_range = parse_byte_range(range_header, image.size)
+    except RangeNotSatisfiable:
+        headers["Content-Range"] = f"bytes */{image.size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        if image.path is not None:
+            # Lets the server send the file without copying it through Python
+            return FileResponse(image.path, media_type=image.mime_type, headers=headers)
+        return Response(content=image.data, media_type=image.mime_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{image.size}"
+    headers["Content-Length"] = str(length)
+    if image.path is not None:
+        return StreamingResponse(
+            _read_file_range(image.path, start, length),
+            status_code=206,
+            media_type=image.mime_type,
+            headers=headers
+        )
+    return Response(
+        content=image.data[start:end + 1],
+        status_code=206,
+        media_type=image.mime_type,
+        headers=headers
+    )
@@ -2,10 +2,12 @@
 FastAPI Main Application
 Clean Architecture - Presentation Layer
 """
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Optional
-from uuid import UUID
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Union
+from uuid import UUID, uuid4
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -17,18 +19,159 @@ backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
 
 from domain.entities import GalmuriItem, OCRStatus, Platform
-from domain.repositories import IGalmuriRepository
+from domain.repositories import IBlobStore, IGalmuriRepository
+from domain.search import FACETS, SearchQuery, TextFilter, build_snippets, facet_counts, normalize_text
 from infrastructure.local_repository import LocalGalmuriRepository
+from infrastructure.blob_store import LocalBlobStore
+from infrastructure.pack_store import PackStore, TieredBlobStore
+from infrastructure.search_index import IndexedGalmuriRepository, NgramIndex
+from infrastructure.search_cache import CachedGalmuriRepository, SearchResultCache
+from infrastructure.upload_store import LocalUploadStore, UploadError, UploadOffsetMismatch, UploadSession
 from application.ocr_service import IOCRService, TesseractOCRService
+from application.ocr_scheduler import FairOCRScheduler, OCRJob, OCRPriority, SchedulerClosedError
+from application.ocr_verifier import ClientOCRVerifier
+from application.ingest import IngestPipeline, ImageDecodeError, ImageTooLargeError, default_stages
+from application.thumbnails import ThumbnailService
+from application.image_store import ImageStore
+from application.compactor import ImageCompactor
+from application.delta import DeltaBlock, DeltaError, apply_delta
+from application.near_duplicates import NearDuplicateIndex
+from application.text_duplicates import TextDuplicateIndex, text_signature
+from application.related import RelatedItemsIndex
+from application.autocomplete import AutocompleteIndex
+from application.query_parser import QueryError, parse_query
+from application.document_service import (
+    DocumentOCRService, MIME_TYPES, count_pages, decode_document, sniff_document_kind
+)
+from presentation.body_limit import BodySizeLimitMiddleware
+from presentation.file_responses import stored_image_response
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import base64
+import hashlib
+import os
+import time
+
+# OCR execution: a bounded thread pool fed by a fair, prioritized scheduler
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+OCR_DRAIN_TIMEOUT = float(os.getenv("OCR_DRAIN_TIMEOUT", "20"))  # seconds
+OCR_RECOVER_ON_STARTUP = os.getenv("OCR_RECOVER_ON_STARTUP", "true").lower() == "true"
+ocr_executor = ThreadPoolExecutor(max_workers=OCR_WORKERS, thread_name_prefix="ocr")
+# Decoding, hashing and thumbnails of incoming captures, kept off the OCR
+# pool so a capture never waits behind the OCR backlog
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+ingest_executor = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest")
+ocr_scheduler = FairOCRScheduler(
+    workers=OCR_WORKERS,
+    quantum=float(os.getenv("OCR_SCHEDULER_QUANTUM", "1.0"))
+)
+OCR_SKIP_TEXTLESS = os.getenv("OCR_SKIP_TEXTLESS", "false").lower() == "true"
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", "blobs")
+# "inline" keeps images base64 in image_data; "blob" stores new captures in the blob store
+IMAGE_STORAGE = os.getenv("IMAGE_STORAGE", "inline").lower()
+# Cold tier: images older than PACK_MIN_AGE_DAYS are compacted into pack files
+PACK_STORE_DIR = os.getenv("PACK_STORE_DIR", "")  # empty disables the cold tier
+PACK_MIN_AGE_DAYS = float(os.getenv("PACK_MIN_AGE_DAYS", "30"))
+PACK_COMPACT_INTERVAL = float(os.getenv("PACK_COMPACT_INTERVAL", "0"))  # seconds, 0 = manual only
+PACK_COMPACT_BATCH = int(os.getenv("PACK_COMPACT_BATCH", "500"))  # images per background pass
+# Resumable uploads
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_TTL = float(os.getenv("UPLOAD_TTL", "86400"))  # seconds an unfinished upload is kept
+# Per-upload locks serializing chunk appends and finalize, with their holder counts
+upload_locks: Dict[str, asyncio.Lock] = {}
+upload_lock_holders: Dict[str, int] = {}
+THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv("THUMBNAIL_SIZES", "128,384").split(","))
+# Render thumbnails during capture; otherwise on first request
+THUMBNAILS_AT_INGEST = os.getenv("THUMBNAILS_AT_INGEST", "true").lower() == "true"
+# Re-encode captures as WebP for storage: "off", "lossless" or "lossy"
+IMAGE_TRANSCODE = os.getenv("IMAGE_TRANSCODE", "off").lower()
+IMAGE_TRANSCODE_QUALITY = int(os.getenv("IMAGE_TRANSCODE_QUALITY", "90"))
+# Decode limits: larger images are downsampled for thumbnails, text detection
+# and OCR (storage keeps the original); images over IMAGE_MAX_PIXELS are rejected
+IMAGE_PIXEL_BUDGET = int(os.getenv("IMAGE_PIXEL_BUDGET", str(24_000_000)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(60_000_000)))
+# Largest request body, counted while it streams in (default fits a base64 upload)
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(UPLOAD_MAX_BYTES * 4 // 3 + 1024 * 1024)))
+# Decodes each capture once for hashing, thumbnails, text detection and OCR preprocessing
+ingest_pipeline = IngestPipeline(
+    stages=default_stages(
+        thumbnail_sizes=THUMBNAIL_SIZES if THUMBNAILS_AT_INGEST else (),
+        text_threshold=float(os.getenv("TEXT_DETECT_THRESHOLD", "0.02")),
+        transcode=IMAGE_TRANSCODE if IMAGE_TRANSCODE in ("lossless", "lossy") else None,
+        transcode_quality=IMAGE_TRANSCODE_QUALITY
+    ),
+    executor=ingest_executor,
+    pixel_budget=IMAGE_PIXEL_BUDGET,
+    max_pixels=IMAGE_MAX_PIXELS
+)
+# Captures whose perceptual hashes differ in at most this many of 64 bits are near-duplicates
+NEAR_DUPLICATE_RADIUS = int(os.getenv("NEAR_DUPLICATE_RADIUS", "6"))
+near_duplicate_index = NearDuplicateIndex(radius=NEAR_DUPLICATE_RADIUS)
+# Items whose OCR texts have at least this estimated Jaccard similarity hold the same text
+TEXT_DUPLICATE_THRESHOLD = float(os.getenv("TEXT_DUPLICATE_THRESHOLD", "0.8"))
+text_duplicate_index = TextDuplicateIndex(threshold=TEXT_DUPLICATE_THRESHOLD)
+# Related captures: cosine similarity of hashed TF-IDF vectors over title, memo and OCR text
+related_index = RelatedItemsIndex(
+    min_similarity=float(os.getenv("RELATED_MIN_SIMILARITY", "0.2")),
+    max_users=int(os.getenv("RELATED_INDEX_MAX_USERS", "32")),
+    max_bytes=int(os.getenv("RELATED_INDEX_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+# Search-box completions from each user's title, memo and OCR terms
+autocomplete_index = AutocompleteIndex(max_users=int(os.getenv("AUTOCOMPLETE_MAX_USERS", "64")))
+# Substring search over title, memo and OCR text (empty disables the index)
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", "search_index")
+search_index = NgramIndex(
+    SEARCH_INDEX_DIR,
+    max_users=int(os.getenv("SEARCH_INDEX_MAX_USERS", "32")),
+    max_bytes=int(os.getenv("SEARCH_INDEX_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+# Memory for cached search results, invalidated when the user's items change (0 disables)
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+search_cache = SearchResultCache(max_bytes=SEARCH_CACHE_MAX_BYTES)
+# Searches return at most SEARCH_MAX_LIMIT items and stop looking after
+# SEARCH_DEADLINE_MS, returning what they found flagged as truncated
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "500"))
+SEARCH_DEADLINE_MS = float(os.getenv("SEARCH_DEADLINE_MS", "1000"))
+DOCUMENT_MAX_PAGES = int(os.getenv("DOCUMENT_MAX_PAGES", "200"))
+DOCUMENT_DPI = int(os.getenv("DOCUMENT_DPI", "200"))
+# Pages of one document OCR'd at once; a document job holds one scheduler
+# slot, so more than 1 takes pool threads other users' jobs are waiting for
+DOCUMENT_PARALLEL_PAGES = min(max(1, int(os.getenv("DOCUMENT_PARALLEL_PAGES", "1"))), OCR_WORKERS)
+# Share of client-side OCR results re-checked on the server
+ocr_verifier = ClientOCRVerifier(
+    sample_rate=float(os.getenv("OCR_VERIFY_SAMPLE_RATE", "0.0")),
+    min_similarity=float(os.getenv("OCR_VERIFY_MIN_SIMILARITY", "0.6"))
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start OCR workers on boot, drain them on shutdown"""
+    # Create or migrate the schema before the first request needs it
+    resolve_dependency(get_repository)
+    await ocr_scheduler.start()
+    if OCR_RECOVER_ON_STARTUP:
+        await recover_pending_ocr()
+    compactor_task = None
+    if PACK_STORE_DIR and PACK_COMPACT_INTERVAL > 0:
+        compactor_task = asyncio.create_task(run_compactor_periodically(PACK_COMPACT_INTERVAL))
+    yield
+    if compactor_task is not None:
+        compactor_task.cancel()
+        await asyncio.gather(compactor_task, return_exceptions=True)
+    app.state.ocr_shutdown_report = await drain_ocr(OCR_DRAIN_TIMEOUT)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Galmuri Diary API",
     description="Hybrid Capture & Archiving System with OCR",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Body size limit (inside CORS, so 413 responses still carry CORS headers)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_REQUEST_BYTES)
+
 # CORS middleware for web extension
 app.add_middleware(
     CORSMiddleware,
@@ -39,28 +182,93 @@ app.add_middleware(
 )
 
 # Dependency Injection
+@lru_cache(maxsize=None)
 def get_repository() -> IGalmuriRepository:
-    """Get repository instance"""
-    import os
+    """
+    Get the shared repository
+    Built once per process: construction creates or migrates the schema,
+    and the PostgreSQL engine keeps its connection pool
+    """
     database_url = os.getenv("DATABASE_URL")
     
     if database_url and database_url.startswith("postgresql"):
         # Production: PostgreSQL (Render, Railway, etc.)
         from infrastructure.postgres_repository import PostgresGalmuriRepository
-        return PostgresGalmuriRepository(database_url)
+        repository = PostgresGalmuriRepository(database_url)
     else:
         # Development: SQLite
-        return LocalGalmuriRepository(db_path="galmuri.db")
+        repository = LocalGalmuriRepository(db_path="galmuri.db")
+    if SEARCH_INDEX_DIR:
+        repository = IndexedGalmuriRepository(repository, search_index)
+    if SEARCH_CACHE_MAX_BYTES > 0:
+        repository = CachedGalmuriRepository(repository, search_cache)
+    return repository
 
 def get_ocr_service() -> IOCRService:
     """Get OCR service instance"""
     try:
-        return TesseractOCRService()
+        return TesseractOCRService(executor=ocr_executor, pixel_budget=IMAGE_PIXEL_BUDGET)
     except RuntimeError:
         # Tesseract not installed - use mock for development
         from application.ocr_service import MockOCRService
         return MockOCRService()
 
+@lru_cache(maxsize=None)
+def get_blob_store() -> IBlobStore:
+    """Get the shared blob store (thumbnails, images)"""
+    if PACK_STORE_DIR:
+        return TieredBlobStore(LocalBlobStore(BLOB_STORE_DIR), PackStore(PACK_STORE_DIR))
+    return LocalBlobStore(BLOB_STORE_DIR)
+
+def get_compactor() -> ImageCompactor:
+    """
+    Get the image compactor
+    
+    Raises:
+        RuntimeError: If no cold tier is configured
+    """
+    blob_store = resolve_dependency(get_blob_store)
+    if not isinstance(blob_store, TieredBlobStore):
+        raise RuntimeError("Image compaction requires a cold tier (set PACK_STORE_DIR)")
+    return ImageCompactor(
+        resolve_dependency(get_repository),
+        blob_store.hot,
+        blob_store.cold,
+        min_age_days=PACK_MIN_AGE_DAYS
+    )
+
+async def run_compactor_periodically(interval: float) -> None:
+    """Background compaction loop"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await get_compactor().run(limit=PACK_COMPACT_BATCH)
+            print(f"Image compaction: {report}")
+        except Exception as e:
+            print(f"Image compaction failed: {str(e)}")
+
+@lru_cache(maxsize=None)
+def get_upload_store() -> LocalUploadStore:
+    """Get the resumable upload store"""
+    return LocalUploadStore(UPLOAD_DIR, max_bytes=UPLOAD_MAX_BYTES, ttl_seconds=UPLOAD_TTL)
+
+def get_image_store() -> ImageStore:
+    """Get image store instance (also usable outside requests)"""
+    return ImageStore(resolve_dependency(get_blob_store), externalize=IMAGE_STORAGE == "blob")
+
+def get_thumbnail_service(
+    blob_store: IBlobStore = Depends(get_blob_store),
+    image_store: ImageStore = Depends(get_image_store)
+) -> ThumbnailService:
+    """Get thumbnail service instance"""
+    return ThumbnailService(
+        blob_store, image_store, sizes=THUMBNAIL_SIZES, executor=ingest_executor, pixel_budget=IMAGE_PIXEL_BUDGET
+    )
+
+def resolve_dependency(dependency):
+    """Call a dependency outside a request, honouring test overrides"""
+    return app.dependency_overrides.get(dependency, dependency)()
+
 # Authentication
 def verify_api_key(x_api_key: str = Header(...)) -> str:
     """Simple API key verification"""
@@ -70,14 +278,114 @@ def verify_api_key(x_api_key: str = Header(...)) -> str:
     return x_api_key
 
 # Pydantic Models for API
-class CaptureRequest(BaseModel):
-    """Request model for capturing an item"""
+class CaptureMetadata(BaseModel):
+    """Capture fields shared by JSON captures and resumable uploads"""
     user_id: str = Field(..., description="User UUID")
-    image_data: str = Field(..., description="Base64 encoded image")
+    item_id: Optional[str] = Field(None, description="Client-generated item UUID; makes retries idempotent")
     source_url: Optional[str] = Field(None, description="Original URL")
     page_title: str = Field(..., description="Page title")
     memo_content: str = Field(default="", description="User memo")
     platform: str = Field(default="WEB_EXTENSION", description="Platform")
+    priority: str = Field(default="INTERACTIVE", description="OCR priority (INTERACTIVE, SYNC, BACKFILL)")
+    ocr_text: Optional[str] = Field(None, description="OCR text computed on the client; skips server OCR")
+    ocr_engine: str = Field(default="", description="Client OCR engine name")
+    ocr_engine_version: str = Field(default="", description="Client OCR engine version")
+    check_duplicates: bool = Field(default=False, description="Report near-duplicate items in the response")
+
+class CaptureRequest(CaptureMetadata):
+    """Request model for capturing an item"""
+    image_data: str = Field(..., description="Base64 encoded image")
+
+class UploadCreateRequest(CaptureMetadata):
+    """Request model for starting a resumable upload"""
+    total_size: int = Field(..., description="Image size in bytes")
+    sha256: Optional[str] = Field(None, description="Hex SHA-256 of the image, checked at finalize")
+
+class NegotiateRequest(BaseModel):
+    """Request model for asking whether an image is already stored"""
+    user_id: str = Field(..., description="User UUID")
+    sha256: str = Field(..., description="Hex SHA-256 of the image bytes")
+
+class NearDuplicateGroupsResponse(BaseModel):
+    """Response model for near-duplicate groups"""
+    radius: int = Field(..., description="Hamming radius (of 64 bits) used for grouping")
+    groups: List[List[str]] = Field(..., description="Groups of near-identical item IDs, largest first")
+
+class TextMatchResponse(BaseModel):
+    """An item with the same OCR text"""
+    id: str
+    similarity: float = Field(..., description="Estimated Jaccard similarity of the OCR texts")
+
+class RelatedItemResponse(BaseModel):
+    """An item with similar text"""
+    id: str
+    similarity: float = Field(..., description="Cosine similarity of the items' TF-IDF vectors")
+
+class SuggestionResponse(BaseModel):
+    """A completion of the search text"""
+    text: str
+    count: int = Field(..., description="Items containing the completed term")
+
+class AutocompleteResponse(BaseModel):
+    """Response model for search autocomplete"""
+    suggestions: List[SuggestionResponse]
+
+class SiteCountResponse(BaseModel):
+    """A site a user captured from"""
+    host: str = Field(..., description="Lowercase host without a leading www.")
+    count: int
+
+class TextDuplicateReport(BaseModel):
+    """Response model for the same-text report"""
+    threshold: float
+    groups: List[List[str]] = Field(..., description="Groups of item IDs with the same text, largest first")
+    duplicate_items: int = Field(..., description="Items beyond the first of each group")
+
+class NegotiateResponse(BaseModel):
+    """Response model for capture negotiation"""
+    known: bool = Field(..., description="True if the image can be captured by reference")
+
+class ReferenceCaptureRequest(CaptureMetadata):
+    """Request model for capturing an already stored image without uploading it"""
+    sha256: str = Field(..., description="Hex SHA-256 of the image bytes")
+
+class DeltaBlockModel(BaseModel):
+    """One changed block of a delta recapture"""
+    x: int = Field(..., ge=0, description="Left edge in the new image")
+    y: int = Field(..., ge=0, description="Top edge in the new image")
+    image_data: str = Field(..., description="Base64 encoded PNG of the block")
+
+class DeltaCaptureRequest(CaptureMetadata):
+    """Request model for a recapture sent as changes to an earlier capture"""
+    base_item_id: str = Field(..., description="Item whose image the blocks are applied to")
+    width: int = Field(..., gt=0, description="Width of the new image")
+    height: int = Field(..., gt=0, description="Height of the new image")
+    pixel_sha256: str = Field(..., description="Hex SHA-256 of the new image's RGBA pixels")
+    blocks: List[DeltaBlockModel] = Field(default_factory=list, description="Blocks that differ from the base")
+
+class DocumentCaptureRequest(BaseModel):
+    """Request model for capturing a multi-page document (PDF or TIFF)"""
+    user_id: str = Field(..., description="User UUID")
+    document_data: str = Field(..., description="Base64 encoded PDF or multi-frame TIFF")
+    source_url: Optional[str] = Field(None, description="Original URL")
+    page_title: str = Field(..., description="Document title")
+    memo_content: str = Field(default="", description="User memo")
+    platform: str = Field(default="WEB_EXTENSION", description="Platform")
+    priority: str = Field(default="INTERACTIVE", description="OCR priority (INTERACTIVE, SYNC, BACKFILL)")
+
+class StorageReport(BaseModel):
+    """How a new capture's image was stored"""
+    mime_type: str
+    original_bytes: int
+    stored_bytes: int
+    saved_bytes: int
+    transcode_ms: float
+
+class SnippetResponse(BaseModel):
+    """Excerpt of a field around search matches"""
+    field: str = Field(..., description="title, memo or ocr")
+    text: str
+    highlights: List[List[int]] = Field(..., description="[start, end) character offsets of matches in text")
 
 class ItemResponse(BaseModel):
     """Response model for item"""
@@ -86,21 +394,124 @@ class ItemResponse(BaseModel):
     source_url: Optional[str]
     page_title: str
     memo_content: str
-    ocr_text: str
+    ocr_text: Optional[str] = Field(..., description="Omitted (null) in search results unless include_text is set")
     ocr_status: str
+    ocr_engine: str = ""
+    ocr_engine_version: str = ""
     platform: str
     is_synced: bool
     created_at: datetime
     updated_at: datetime
+    content_hash: str = ""
+    thumbnail_url: str = ""
+    page_count: int = 1
+    matched_pages: List[int] = Field(default_factory=list, description="Pages matching the search query")
+    storage: Optional[StorageReport] = Field(None, description="Image storage report (capture only)")
+    near_duplicates: Optional[List[str]] = Field(
+        None, description="IDs of near-identical items, closest first (capture with check_duplicates only)"
+    )
+    snippets: Optional[List[SnippetResponse]] = Field(None, description="Match excerpts (search only)")
 
     class Config:
         from_attributes = True
 
-class SearchRequest(BaseModel):
+def to_item_response(item: GalmuriItem) -> ItemResponse:
+    """Convert domain entity to API response"""
+    return ItemResponse(
+        id=str(item.id),
+        user_id=str(item.user_id),
+        source_url=item.source_url,
+        page_title=item.page_title,
+        memo_content=item.memo_content,
+        ocr_text=item.ocr_text,
+        ocr_status=item.ocr_status.value,
+        ocr_engine=item.ocr_engine,
+        ocr_engine_version=item.ocr_engine_version,
+        platform=item.platform.value,
+        is_synced=item.is_synced,
+        created_at=item.created_at,
+        updated_at=item.updated_at,
+        content_hash=item.content_hash,
+        thumbnail_url=f"/api/item/{item.id}/thumbnail",
+        page_count=len(item.get_ocr_pages())
+    )
+
+def to_search_response(item: GalmuriItem, terms: List[str], include_text: bool = False) -> ItemResponse:
+    """Convert a search hit to an API response with snippets instead of the full OCR text"""
+    response = to_item_response(item)
+    if response.page_count > 1:
+        response.matched_pages = sorted({page for term in terms for page in item.find_pages(term)})
+    response.snippets = [
+        SnippetResponse(field=snippet.field, text=snippet.text, highlights=[list(span) for span in snippet.highlights])
+        for snippet in build_snippets(item, terms)
+    ]
+    if not include_text:
+        response.ocr_text = None
+    return response
+
+class UploadStatusResponse(BaseModel):
+    """Progress of a resumable upload"""
+    upload_id: str
+    offset: int = Field(..., description="Bytes committed so far; the next chunk starts here")
+    total_size: int
+    item: Optional[ItemResponse] = Field(None, description="Item, once the upload is finalized")
+
+class SearchOptions(BaseModel):
+    """Options shared by the search endpoints"""
+    include_text: bool = Field(False, description="Return the full OCR text of each hit besides its snippets")
+    limit: int = Field(50, ge=1, le=SEARCH_MAX_LIMIT, description="Most hits to return, newest first")
+    offset: int = Field(0, ge=0, description="Newest hits to skip; the next page starts at offset + limit")
+    facets: List[str] = Field(
+        default_factory=list,
+        description=f"Facets to count over every match, not only the returned hits ({', '.join(FACETS)}); results then come as {{items, facets}}"
+    )
+
+class SearchResultsResponse(BaseModel):
+    """Results with facet counts"""
+    items: List[ItemResponse]
+    facets: Dict[str, Dict[str, int]] = Field(..., description="Facet -> {value: item count}, most common first")
+    truncated: bool = Field(
+        False, description="A search deadline passed; items are the newest matches found by then, facets count the matches counted by then"
+    )
+    has_more: bool = Field(False, description="The limit cut the results; ask again with offset + limit for the next page")
+
+def check_facets(facets: List[str]) -> List[str]:
+    """Requested facets without duplicates; unknown ones are rejected with 422"""
+    unknown = [facet for facet in facets if facet not in FACETS]
+    if unknown:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown facets: {', '.join(unknown)} (use {', '.join(FACETS)})"
+        )
+    return list(dict.fromkeys(facets))
+
+def with_facets(
+    responses: List[ItemResponse],
+    facets: List[str],
+    counts: Dict[str, Dict[str, int]],
+    truncated: bool = False,
+    has_more: bool = False
+):
+    """Responses as a plain list, or with facet counts when any were requested"""
+    if not facets:
+        return responses
+    return SearchResultsResponse(items=responses, facets=counts, truncated=truncated, has_more=has_more)
+
+def search_deadline() -> float:
+    """time.monotonic() at which a search starting now returns what it has"""
+    return time.monotonic() + SEARCH_DEADLINE_MS / 1000
+
+class SearchRequest(SearchOptions):
     """Request model for search"""
     user_id: str
     query: str
 
+class StructuredSearchRequest(SearchOptions):
+    """Request model for search in the query language"""
+    user_id: str
+    query: str = Field(
+        ..., description='Words, "phrases", -negation and title:, memo:, url:, site:, platform:, status:, after:, before:, date: filters'
+    )
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -116,6 +527,8 @@ async def capture_item(
     request: CaptureRequest,
     repository: IGalmuriRepository = Depends(get_repository),
     ocr_service: IOCRService = Depends(get_ocr_service),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    image_store: ImageStore = Depends(get_image_store),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -123,60 +536,626 @@ async def capture_item(
     Processes OCR in background
     """
     try:
-        # Create new item
+        # Retried request: the item was already created
+        existing = await find_existing_capture(request.item_id, request.user_id, repository)
+        if existing is not None:
+            return to_item_response(existing)
+        
+        return await store_capture(
+            request, request.image_data, repository, ocr_service, thumbnail_service, image_store
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to capture item: {str(e)}")
+
+async def find_existing_capture(
+    item_id: Optional[str],
+    user_id: str,
+    repository: IGalmuriRepository
+) -> Optional[GalmuriItem]:
+    """
+    Item already stored under a client-supplied ID
+    
+    Raises:
+        HTTPException: 409 if the ID belongs to another user's item
+    """
+    if not item_id:
+        return None
+    existing = await repository.find_by_id(UUID(item_id))
+    if existing is not None and existing.user_id != UUID(user_id):
+        raise HTTPException(status_code=409, detail="Item ID already in use")
+    return existing
+
+async def store_capture(
+    metadata: CaptureMetadata,
+    image: Union[str, bytes],
+    repository: IGalmuriRepository,
+    ocr_service: IOCRService,
+    thumbnail_service: ThumbnailService,
+    image_store: ImageStore
+) -> ItemResponse:
+    """
+    Create, save and schedule OCR for a new capture
+    
+    Args:
+        metadata: Capture fields (title, memo, client OCR, ...)
+        image: Base64 image data (JSON capture) or raw bytes (upload)
+    """
+    # Create new item (keeping a client-generated ID when given)
+    item = GalmuriItem(
+        user_id=UUID(metadata.user_id),
+        image_data=image if isinstance(image, str) else "",
+        source_url=metadata.source_url,
+        page_title=metadata.page_title,
+        memo_content=metadata.memo_content,
+        platform=Platform(metadata.platform)
+    )
+    if metadata.item_id:
+        item.id = UUID(metadata.item_id)
+    
+    priority = OCRPriority(metadata.priority)
+    
+    # Decode once for hashing, text detection and OCR preprocessing
+    try:
+        ingest = await ingest_pipeline.run(image)
+        item.content_hash = ingest.content_hash
+        item.perceptual_hash = ingest.perceptual_hash
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImageDecodeError as e:
+        # Keep the capture (Local First); OCR will report the failure
+        print(f"Ingest skipped for capture: {str(e)}")
+        ingest = None
+    
+    if metadata.ocr_text is not None:
+        # OCR already ran on the device
+        item.mark_ocr_completed(metadata.ocr_text, metadata.ocr_engine, metadata.ocr_engine_version)
+        ocr_verifier.record_accepted()
+    elif OCR_SKIP_TEXTLESS and ingest is not None and not ingest.has_text:
+        # Nothing that looks like text - don't spend Tesseract time on it
+        item.mark_ocr_completed("", "text-detector")
+    
+    if ingest is not None and (image_store.externalize or ingest.transcoded or not item.image_data):
+        await image_store.save(item, ingest.stored_data, ingest.mime_type)
+    elif not item.image_data:
+        # Undecodable upload: keep the bytes as they came
+        item.image_data = base64.b64encode(image).decode('ascii')
+    
+    # Save immediately (Local First)
+    saved_item = await save_item(item, repository)
+    if ingest is not None and ingest.thumbnails:
+        await thumbnail_service.store(saved_item.id, ingest.thumbnails)
+    
+    # Process OCR in background (non-blocking)
+    if saved_item.ocr_status == OCRStatus.PENDING:
+        await schedule_ocr(
+            saved_item, repository, ocr_service, priority,
+            ocr_image=ingest.ocr_image if ingest else None
+        )
+    elif metadata.ocr_text is not None and ocr_verifier.should_verify():
+        schedule_ocr_verification(saved_item, repository, ocr_service)
+    
+    response = to_item_response(saved_item)
+    if ingest is not None:
+        response.storage = StorageReport(
+            mime_type=ingest.mime_type,
+            original_bytes=ingest.original_size,
+            stored_bytes=len(ingest.stored_data),
+            saved_bytes=ingest.original_size - len(ingest.stored_data),
+            transcode_ms=round(ingest.timings.get("transcode", 0.0), 3)
+        )
+    response.near_duplicates = await index_near_duplicates(saved_item, repository, metadata.check_duplicates)
+    return response
+
+async def save_item(item: GalmuriItem, repository: IGalmuriRepository) -> GalmuriItem:
+    """Save an item, signing OCR text that has no signature yet for same-text lookups"""
+    if item.ocr_status == OCRStatus.DONE and item.ocr_text and not item.text_minhash:
+        loop = asyncio.get_running_loop()
+        item.text_minhash = await loop.run_in_executor(ocr_executor, text_signature, item.ocr_text)
+    saved_item = await repository.save(item)
+    text_duplicate_index.add(saved_item.user_id, saved_item.id, saved_item.text_minhash)
+    related_index.add(saved_item)
+    autocomplete_index.add(saved_item)
+    return saved_item
+
+async def index_near_duplicates(
+    item: GalmuriItem,
+    repository: IGalmuriRepository,
+    check: bool = False
+) -> Optional[List[str]]:
+    """
+    Add a new item to the near-duplicate index
+    
+    Returns:
+        IDs of the user's near-identical items if check is set, else None
+    """
+    near_duplicate_index.add(item.user_id, item.id, item.perceptual_hash)
+    if not check:
+        return None
+    matches = await near_duplicate_index.find(item.user_id, item.perceptual_hash, repository, exclude=item.id)
+    return [str(item_id) for _, item_id in matches]
+
+@app.post("/api/capture/negotiate", response_model=NegotiateResponse)
+async def negotiate_capture(
+    request: NegotiateRequest,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Check whether an image is already stored for this user
+    If it is, capture it with /api/capture/by-reference instead of uploading
+    """
+    try:
+        # Scoped to the user: other users' images are never revealed
+        source = await repository.find_by_content_hash(UUID(request.user_id), request.sha256.lower())
+        return NegotiateResponse(known=source is not None)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Negotiation failed: {str(e)}")
+
+@app.post("/api/capture/by-reference", response_model=ItemResponse)
+async def capture_by_reference(
+    request: ReferenceCaptureRequest,
+    repository: IGalmuriRepository = Depends(get_repository),
+    ocr_service: IOCRService = Depends(get_ocr_service),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Capture an image the user already stored, identified by its SHA-256
+    The image, its OCR text and thumbnails are reused
+    """
+    try:
+        existing = await find_existing_capture(request.item_id, request.user_id, repository)
+        if existing is not None:
+            return to_item_response(existing)
+        
+        source = await repository.find_by_content_hash(UUID(request.user_id), request.sha256.lower())
+        if source is None:
+            raise HTTPException(status_code=404, detail="Image not found; upload it with /api/capture")
+        
         item = GalmuriItem(
             user_id=UUID(request.user_id),
-            image_data=request.image_data,
+            image_data=source.image_data,
             source_url=request.source_url,
             page_title=request.page_title,
             memo_content=request.memo_content,
-            platform=Platform(request.platform)
+            platform=Platform(request.platform),
+            content_hash=source.content_hash,
+            perceptual_hash=source.perceptual_hash
         )
+        if request.item_id:
+            item.id = UUID(request.item_id)
         
-        # Save immediately (Local First)
-        saved_item = await repository.save(item)
+        if request.ocr_text is not None:
+            item.mark_ocr_completed(request.ocr_text, request.ocr_engine, request.ocr_engine_version)
+        elif source.ocr_status == OCRStatus.DONE:
+            # Same pixels, same text
+            item.mark_ocr_completed(source.ocr_text, source.ocr_engine, source.ocr_engine_version)
+            item.text_minhash = source.text_minhash
         
-        # Process OCR in background (non-blocking)
-        asyncio.create_task(process_ocr_background(
-            item_id=saved_item.id,
-            image_data=request.image_data,
-            repository=repository,
-            ocr_service=ocr_service
-        ))
+        saved_item = await save_item(item, repository)
+        await thumbnail_service.copy(source.id, saved_item.id)
+        
+        if saved_item.ocr_status == OCRStatus.PENDING:
+            await schedule_ocr(saved_item, repository, ocr_service, OCRPriority(request.priority))
+        
+        response = to_item_response(saved_item)
+        response.near_duplicates = await index_near_duplicates(saved_item, repository, request.check_duplicates)
+        return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to capture item: {str(e)}")
+
+@app.post("/api/capture/delta", response_model=ItemResponse)
+async def capture_delta(
+    request: DeltaCaptureRequest,
+    repository: IGalmuriRepository = Depends(get_repository),
+    ocr_service: IOCRService = Depends(get_ocr_service),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    image_store: ImageStore = Depends(get_image_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Capture a recapture of an earlier item by uploading only the changed blocks
+    The full image is rebuilt and verified by its pixel hash, then ingested
+    like /api/capture; on 422 the client should upload the full image
+    """
+    try:
+        existing = await find_existing_capture(request.item_id, request.user_id, repository)
+        if existing is not None:
+            return to_item_response(existing)
+        
+        base = await repository.find_by_id(UUID(request.base_item_id))
+        if base is None or str(base.user_id) != request.user_id:
+            raise HTTPException(status_code=404, detail="Base item not found")
+        if request.width * request.height > IMAGE_MAX_PIXELS:
+            raise HTTPException(status_code=413, detail=f"Image exceeds {IMAGE_MAX_PIXELS} pixels")
         
-        return ItemResponse(
-            id=str(saved_item.id),
-            user_id=str(saved_item.user_id),
-            source_url=saved_item.source_url,
-            page_title=saved_item.page_title,
-            memo_content=saved_item.memo_content,
-            ocr_text=saved_item.ocr_text,
-            ocr_status=saved_item.ocr_status.value,
-            platform=saved_item.platform.value,
-            is_synced=saved_item.is_synced,
-            created_at=saved_item.created_at,
-            updated_at=saved_item.updated_at
+        base_data = await image_store.load(base)
+        blocks = [DeltaBlock(block.x, block.y, block.image_data) for block in request.blocks]
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(
+            ingest_executor, apply_delta,
+            base_data, request.width, request.height, blocks, request.pixel_sha256, IMAGE_MAX_PIXELS
         )
         
+        return await store_capture(request, image, repository, ocr_service, thumbnail_service, image_store)
+        
+    except HTTPException:
+        raise
+    except DeltaError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=422, detail="Base item image is missing")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to capture item: {str(e)}")
 
+@asynccontextmanager
+async def upload_lock(upload_id: str):
+    """Hold an upload's lock; the entry is dropped when its last holder leaves"""
+    try:
+        key = str(UUID(upload_id))
+    except ValueError:
+        key = upload_id
+    lock = upload_locks.setdefault(key, asyncio.Lock())
+    upload_lock_holders[key] = upload_lock_holders.get(key, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        upload_lock_holders[key] -= 1
+        if not upload_lock_holders[key]:
+            del upload_lock_holders[key]
+            del upload_locks[key]
+
+@app.post("/api/uploads", response_model=UploadStatusResponse)
+async def create_upload(
+    request: UploadCreateRequest,
+    repository: IGalmuriRepository = Depends(get_repository),
+    upload_store: LocalUploadStore = Depends(get_upload_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Start (or resume) a resumable capture upload
+    The upload ID is the item ID, so a client that lost the response
+    can create the session again and continue from its offset
+    """
+    try:
+        existing = await find_existing_capture(request.item_id, request.user_id, repository)
+        if existing is not None:
+            return UploadStatusResponse(
+                upload_id=str(existing.id),
+                offset=request.total_size,
+                total_size=request.total_size,
+                item=to_item_response(existing)
+            )
+        
+        upload_store.purge_expired()
+        metadata = CaptureMetadata.model_validate(request.model_dump())
+        metadata.item_id = str(UUID(request.item_id)) if request.item_id else str(uuid4())
+        session = upload_store.create(UploadSession(
+            upload_id=metadata.item_id,
+            user_id=metadata.user_id,
+            total_size=request.total_size,
+            sha256=request.sha256.lower() if request.sha256 else None,
+            metadata=metadata.model_dump()
+        ))
+        return UploadStatusResponse(upload_id=session.upload_id, offset=session.offset, total_size=session.total_size)
+        
+    except HTTPException:
+        raise
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create upload: {str(e)}")
+
+@app.get("/api/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def get_upload(
+    upload_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    upload_store: LocalUploadStore = Depends(get_upload_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """Committed offset of an upload (or the item, once finalized)"""
+    try:
+        session = upload_store.get(upload_id)
+        if session is not None:
+            return UploadStatusResponse(upload_id=upload_id, offset=session.offset, total_size=session.total_size)
+        
+        item = await repository.find_by_id(UUID(upload_id))
+        if item is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return UploadStatusResponse(upload_id=upload_id, offset=0, total_size=0, item=to_item_response(item))
+        
+    except HTTPException:
+        raise
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve upload: {str(e)}")
+
+@app.put("/api/uploads/{upload_id}", response_model=UploadStatusResponse)
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    http_request: Request,
+    upload_store: LocalUploadStore = Depends(get_upload_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Append a chunk (raw request body) starting at `offset`
+    A chunk at the wrong offset gets 409 with the committed offset
+    """
+    try:
+        # Concurrent chunks at the same offset: the offset is checked again
+        # under the lock, so only the first one is appended
+        async with upload_lock(upload_id):
+            new_offset = await upload_store.append(upload_id, offset, http_request.stream())
+            session = upload_store.get(upload_id)
+        return UploadStatusResponse(upload_id=upload_id, offset=new_offset, total_size=session.total_size)
+        
+    except HTTPException:
+        raise
+    except UploadOffsetMismatch as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Upload-Offset": str(e.expected)})
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to store chunk: {str(e)}")
+
+@app.post("/api/uploads/{upload_id}/finalize", response_model=ItemResponse)
+async def finalize_upload(
+    upload_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    ocr_service: IOCRService = Depends(get_ocr_service),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    image_store: ImageStore = Depends(get_image_store),
+    upload_store: LocalUploadStore = Depends(get_upload_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Turn a complete upload into an item
+    Finalizing twice returns the same item
+    """
+    try:
+        async with upload_lock(upload_id):
+            try:
+                item_id = UUID(upload_id)
+            except ValueError:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            
+            existing = await repository.find_by_id(item_id)
+            if existing is not None:
+                return to_item_response(existing)
+            
+            session = upload_store.get(upload_id)
+            if session is None:
+                raise HTTPException(status_code=404, detail="Upload not found")
+            if session.offset < session.total_size:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Upload incomplete: {session.offset} of {session.total_size} bytes",
+                    headers={"Upload-Offset": str(session.offset)}
+                )
+            
+            data = upload_store.read(upload_id)
+            if session.sha256 and hashlib.sha256(data).hexdigest() != session.sha256:
+                # Corrupt upload: start over
+                upload_store.delete(upload_id)
+                raise HTTPException(status_code=422, detail="Upload does not match its SHA-256")
+            
+            metadata = CaptureMetadata.model_validate(session.metadata)
+            response = await store_capture(
+                metadata, data, repository, ocr_service, thumbnail_service, image_store
+            )
+            upload_store.delete(upload_id)
+            # Later callers, and a waiter on this lock, find the item
+            return response
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to finalize upload: {str(e)}")
+
+@app.post("/api/capture/document", response_model=ItemResponse)
+async def capture_document(
+    request: DocumentCaptureRequest,
+    repository: IGalmuriRepository = Depends(get_repository),
+    ocr_service: IOCRService = Depends(get_ocr_service),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Capture a multi-page document
+    Pages are OCR'd in parallel in the background
+    """
+    try:
+        kind = sniff_document_kind(request.document_data)
+        if kind is None:
+            raise HTTPException(status_code=400, detail="Only PDF and TIFF documents are supported")
+        
+        document_b64 = request.document_data.split(',', 1)[-1]
+        item = GalmuriItem(
+            user_id=UUID(request.user_id),
+            image_data=f"data:{MIME_TYPES[kind]};base64,{document_b64}",
+            source_url=request.source_url,
+            page_title=request.page_title,
+            memo_content=request.memo_content,
+            platform=Platform(request.platform)
+        )
+        
+        saved_item = await save_item(item, repository)
+        await schedule_ocr(saved_item, repository, ocr_service, OCRPriority(request.priority))
+        
+        return to_item_response(saved_item)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to capture document: {str(e)}")
+
+async def schedule_ocr(
+    item: GalmuriItem,
+    repository: IGalmuriRepository,
+    ocr_service: IOCRService,
+    priority: OCRPriority = OCRPriority.INTERACTIVE,
+    ocr_image=None
+) -> None:
+    """
+    Queue OCR for an item on the shared scheduler
+    While shutting down the item is left PENDING for the next instance
+    
+    Args:
+        ocr_image: Image already preprocessed by the ingest pipeline, used
+            when a worker is free to run the job now; otherwise (or when
+            omitted) the job loads and decodes the image itself
+    """
+    image_store = resolve_dependency(get_image_store)
+    if ocr_scheduler.idle_workers() == 0:
+        # A queued job would hold the decoded image until it runs; it
+        # decodes again instead, so a backlog only holds item IDs
+        ocr_image = None
+    # Documents are always kept inline
+    kind = None if image_store.is_reference(item.image_data) else sniff_document_kind(item.image_data)
+    cost = None
+    if kind:
+        # Every page is an OCR run of its own
+        cost = await count_document_pages(item.image_data, kind)
+        run = lambda: process_document_ocr_background(
+            item_id=item.id,
+            repository=repository,
+            ocr_service=ocr_service,
+            image_store=image_store
+        )
+    else:
+        run = lambda: process_ocr_background(
+            item_id=item.id,
+            repository=repository,
+            ocr_service=ocr_service,
+            image_store=image_store,
+            ocr_image=ocr_image
+        )
+    submit_ocr_job(item, priority, run, cost=cost)
+
+def schedule_ocr_verification(
+    item: GalmuriItem,
+    repository: IGalmuriRepository,
+    ocr_service: IOCRService
+) -> None:
+    """Queue a server-side spot check of client OCR at BACKFILL priority"""
+    image_store = resolve_dependency(get_image_store)
+    submit_ocr_job(item, OCRPriority.BACKFILL, lambda: verify_client_ocr_background(
+        item_id=item.id,
+        repository=repository,
+        ocr_service=ocr_service,
+        image_store=image_store
+    ), verification=True)
+
+async def count_document_pages(image_data: str, kind: str) -> int:
+    """
+    Pages of an inline document, counted off the event loop
+    Documents OCR will reject (unreadable, over DOCUMENT_MAX_PAGES) count as one
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        pages = await loop.run_in_executor(
+            ingest_executor, lambda: count_pages(decode_document(image_data), kind)
+        )
+    except Exception:
+        return 1
+    return pages if 0 < pages <= DOCUMENT_MAX_PAGES else 1
+
+def submit_ocr_job(
+    item: GalmuriItem,
+    priority: OCRPriority,
+    run,
+    verification: bool = False,
+    cost: Optional[float] = None
+) -> None:
+    """Submit OCR work for an item, deferring it if the server is shutting down"""
+    if cost is None:
+        # Larger images cost more of the user's round-robin share
+        cost = 1.0 + len(item.image_data) / 1_048_576
+    try:
+        ocr_scheduler.submit(OCRJob(
+            user_id=item.user_id,
+            item_id=item.id,
+            priority=priority,
+            cost=cost,
+            run=run,
+            verification=verification
+        ))
+    except SchedulerClosedError:
+        print(f"OCR deferred for item {item.id}: server is shutting down")
+
+async def recover_pending_ocr(limit: int = 1000) -> int:
+    """Re-queue items left PENDING by a previous instance"""
+    repository = resolve_dependency(get_repository)
+    ocr_service = resolve_dependency(get_ocr_service)
+    items = await repository.find_by_ocr_status(OCRStatus.PENDING, limit=limit)
+    for item in items:
+        await schedule_ocr(item, repository, ocr_service, OCRPriority.BACKFILL)
+    if items:
+        print(f"Recovered {len(items)} pending OCR items")
+    return len(items)
+
+async def drain_ocr(timeout: float) -> dict:
+    """
+    Let running OCR finish within the deadline and hand the rest back
+    
+    Unfinished items are written back as PENDING so that
+    recover_pending_ocr() picks them up on the next start. Unfinished
+    spot checks are dropped: their item already holds an accepted
+    client result, and PENDING would have it OCRed again from scratch.
+    """
+    report = await ocr_scheduler.drain(timeout)
+    deferred = [job for job in report["deferred"] if not job.verification]
+    
+    repository = resolve_dependency(get_repository)
+    for job in deferred:
+        item = await repository.find_by_id(job.item_id)
+        if item and item.ocr_status != OCRStatus.PENDING:
+            item.mark_ocr_pending()
+            await repository.save(item)
+    
+    summary = {
+        "drained": report["drained"],
+        "deferred": len(deferred),
+        "deferred_item_ids": [str(job.item_id) for job in deferred],
+        "verifications_dropped": len(report["deferred"]) - len(deferred)
+    }
+    print(f"OCR shutdown: {summary['drained']} drained, {summary['deferred']} deferred")
+    return summary
+
 async def process_ocr_background(
     item_id: UUID,
-    image_data: str,
     repository: IGalmuriRepository,
-    ocr_service: IOCRService
+    ocr_service: IOCRService,
+    image_store: ImageStore,
+    ocr_image=None
 ):
     """Background task for OCR processing"""
     try:
-        # Extract text from image
-        extracted_text = await ocr_service.extract_text(image_data)
+        # Extract text from image (reusing the ingest decode when available)
+        if ocr_image is not None:
+            extracted_text = await ocr_service.extract_text_from_image(ocr_image)
+        else:
+            item = await repository.find_by_id(item_id)
+            if item is None:
+                return
+            extracted_text = await ocr_service.extract_text(await image_store.load_image_data(item))
         
         # Update item with OCR result
         item = await repository.find_by_id(item_id)
         if item:
-            item.mark_ocr_completed(extracted_text)
-            await repository.save(item)
+            item.mark_ocr_completed(extracted_text, ocr_service.engine, ocr_service.engine_version)
+            await save_item(item, repository)
             
     except Exception as e:
         # Mark OCR as failed
@@ -186,66 +1165,189 @@ async def process_ocr_background(
             await repository.save(item)
         print(f"OCR processing failed for item {item_id}: {str(e)}")
 
-@app.get("/api/items/{user_id}", response_model=List[ItemResponse])
+@app.post("/api/items/{user_id}/reprocess")
+async def reprocess_items(
+    user_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    ocr_service: IOCRService = Depends(get_ocr_service),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Re-run OCR for a user's failed or pending items
+    Queued at BACKFILL priority so interactive captures go first; items
+    whose OCR is already queued or running are skipped
+    """
+    try:
+        items = await repository.find_by_user_id(UUID(user_id))
+        queued = skipped = 0
+        for item in items:
+            if item.ocr_status == OCRStatus.DONE:
+                continue
+            if ocr_scheduler.is_queued(item.id):
+                skipped += 1
+                continue
+            await schedule_ocr(item, repository, ocr_service, OCRPriority.BACKFILL)
+            queued += 1
+        
+        return {"success": True, "queued": queued, "already_queued": skipped}
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to reprocess items: {str(e)}")
+
+@app.get("/api/ocr/stats")
+async def get_ocr_stats(api_key: str = Depends(verify_api_key)):
+    """OCR queue depth and queue-wait percentiles per priority class"""
+    return {
+        "workers": ocr_scheduler.workers,
+        "queued": ocr_scheduler.queued(),
+        "classes": ocr_scheduler.stats(),
+        "client_ocr": ocr_verifier.stats()
+    }
+
+async def process_document_ocr_background(
+    item_id: UUID,
+    repository: IGalmuriRepository,
+    ocr_service: IOCRService,
+    image_store: ImageStore
+):
+    """Background task for page-parallel document OCR"""
+    document_ocr = DocumentOCRService(
+        ocr_service,
+        executor=ocr_executor,
+        max_parallel_pages=DOCUMENT_PARALLEL_PAGES,
+        max_pages=DOCUMENT_MAX_PAGES,
+        dpi=DOCUMENT_DPI
+    )
+    try:
+        item = await repository.find_by_id(item_id)
+        if item is None:
+            return
+        image_data = await image_store.load_image_data(item)
+        kind = sniff_document_kind(image_data)
+        pages = await document_ocr.extract_pages(decode_document(image_data), kind)
+        
+        item = await repository.find_by_id(item_id)
+        if item:
+            item.mark_ocr_pages_completed(pages, ocr_service.engine, ocr_service.engine_version)
+            await save_item(item, repository)
+            
+    except Exception as e:
+        item = await repository.find_by_id(item_id)
+        if item:
+            item.mark_ocr_failed()
+            await repository.save(item)
+        print(f"Document OCR failed for item {item_id}: {str(e)}")
+
+async def verify_client_ocr_background(
+    item_id: UUID,
+    repository: IGalmuriRepository,
+    ocr_service: IOCRService,
+    image_store: ImageStore
+):
+    """Background task comparing client OCR with a server run"""
+    item = await repository.find_by_id(item_id)
+    if item is None or item.ocr_status != OCRStatus.DONE:
+        return
+    
+    image_data = await image_store.load_image_data(item)
+    if await ocr_verifier.verify(item, image_data, ocr_service):
+        await save_item(item, repository)
+
+@app.get("/api/ingest/stats")
+async def get_ingest_stats(api_key: str = Depends(verify_api_key)):
+    """Mean time per ingest stage (decode, hashing, transcoding, ...) and bytes saved"""
+    return ingest_pipeline.stats()
+
+@app.get("/api/items/{user_id}", response_model=Union[List[ItemResponse], SearchResultsResponse])
 async def get_user_items(
     user_id: str,
+    facets: str = "",
     repository: IGalmuriRepository = Depends(get_repository),
     api_key: str = Depends(verify_api_key)
 ):
-    """Get all items for a user"""
+    """
+    Get all items for a user
+    facets (comma-separated) adds counts per platform, status, site or month
+    """
     try:
+        requested = check_facets([facet for facet in facets.split(",") if facet])
         items = await repository.find_by_user_id(UUID(user_id))
         
-        return [
-            ItemResponse(
-                id=str(item.id),
-                user_id=str(item.user_id),
-                source_url=item.source_url,
-                page_title=item.page_title,
-                memo_content=item.memo_content,
-                ocr_text=item.ocr_text,
-                ocr_status=item.ocr_status.value,
-                platform=item.platform.value,
-                is_synced=item.is_synced,
-                created_at=item.created_at,
-                updated_at=item.updated_at
-            )
-            for item in items
-        ]
+        return with_facets([to_item_response(item) for item in items], requested, facet_counts(items, requested))
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve items: {str(e)}")
 
-@app.post("/api/search", response_model=List[ItemResponse])
+@app.post("/api/search", response_model=Union[List[ItemResponse], SearchResultsResponse])
 async def search_items(
     request: SearchRequest,
+    response: Response,
     repository: IGalmuriRepository = Depends(get_repository),
     api_key: str = Depends(verify_api_key)
 ):
     """
     Search items by query
-    Searches in title, memo, and OCR text
-    """
-    try:
-        items = await repository.search(UUID(request.user_id), request.query)
-        
-        return [
-            ItemResponse(
-                id=str(item.id),
-                user_id=str(item.user_id),
-                source_url=item.source_url,
-                page_title=item.page_title,
-                memo_content=item.memo_content,
-                ocr_text=item.ocr_text,
-                ocr_status=item.ocr_status.value,
-                platform=item.platform.value,
-                is_synced=item.is_synced,
-                created_at=item.created_at,
-                updated_at=item.updated_at
-            )
-            for item in items
-        ]
+    Searches in title, memo, and OCR text; newest hits first, limit at a time from offset
+    """
+    try:
+        facets = check_facets(request.facets)
+        query = SearchQuery(text_filters=[TextFilter(field="any", value=request.query)])
+        if not normalize_text(request.query):
+            query = SearchQuery()
+        page = await repository.search_page(
+            UUID(request.user_id), query, request.limit, search_deadline(), request.offset
+        )
+        # Counted over every match, not just the returned page, with its own deadline
+        counts = await repository.count_facets(UUID(request.user_id), query, facets, search_deadline())
+        truncated = page.truncated or counts.truncated
+        response.headers["X-Search-Truncated"] = "true" if truncated else "false"
+        response.headers["X-Search-Has-More"] = "true" if page.has_more else "false"
         
+        responses = [to_search_response(item, [request.query], request.include_text) for item in page.items]
+        return with_facets(responses, facets, counts.counts, truncated, page.has_more)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+@app.get("/api/search/stats")
+async def get_search_stats(api_key: str = Depends(verify_api_key)):
+    """Search result cache size and hit rate, and the memory of the substring and related-items indexes"""
+    return {"cache": search_cache.stats(), "index": search_index.stats(), "related": related_index.stats()}
+
+@app.post("/api/search/query", response_model=Union[List[ItemResponse], SearchResultsResponse])
+async def search_items_by_query(
+    request: StructuredSearchRequest,
+    response: Response,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Search items with the query language
+    Filters narrow the rows before text is matched; newest hits first, limit at a time from offset
+    """
+    try:
+        facets = check_facets(request.facets)
+        query = parse_query(request.query)
+        page = await repository.search_page(
+            UUID(request.user_id), query, request.limit, search_deadline(), request.offset
+        )
+        # Counted over every match, not just the returned page, with its own deadline
+        counts = await repository.count_facets(UUID(request.user_id), query, facets, search_deadline())
+        truncated = page.truncated or counts.truncated
+        response.headers["X-Search-Truncated"] = "true" if truncated else "false"
+        response.headers["X-Search-Has-More"] = "true" if page.has_more else "false"
+        
+        responses = [to_search_response(item, query.positive_terms(), request.include_text) for item in page.items]
+        return with_facets(responses, facets, counts.counts, truncated, page.has_more)
+        
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -259,26 +1361,179 @@ async def get_unsynced_items(
     try:
         items = await repository.find_unsynced(UUID(user_id))
         
-        return [
-            ItemResponse(
-                id=str(item.id),
-                user_id=str(item.user_id),
-                source_url=item.source_url,
-                page_title=item.page_title,
-                memo_content=item.memo_content,
-                ocr_text=item.ocr_text,
-                ocr_status=item.ocr_status.value,
-                platform=item.platform.value,
-                is_synced=item.is_synced,
-                created_at=item.created_at,
-                updated_at=item.updated_at
-            )
-            for item in items
-        ]
+        return [to_item_response(item) for item in items]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve unsynced items: {str(e)}")
 
+@app.get("/api/items/{user_id}/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete(
+    user_id: str,
+    q: str,
+    limit: int = 10,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Complete the last word of a search, most common terms first"""
+    try:
+        if not 1 <= limit <= 50:
+            raise HTTPException(status_code=422, detail="limit must be between 1 and 50")
+        
+        suggestions = await autocomplete_index.complete(UUID(user_id), q, repository, limit)
+        return AutocompleteResponse(
+            suggestions=[SuggestionResponse(text=text, count=count) for text, count in suggestions]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to complete search: {str(e)}")
+
+@app.get("/api/items/{user_id}/sites", response_model=List[SiteCountResponse])
+async def get_sites(
+    user_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Sites a user captured from with their number of items, most items first"""
+    try:
+        counts = await repository.count_by_host(UUID(user_id))
+        return [SiteCountResponse(host=host, count=count) for host, count in counts]
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to count sites: {str(e)}")
+
+@app.get("/api/items/{user_id}/sites/{host}", response_model=List[ItemResponse])
+async def get_site_items(
+    user_id: str,
+    host: str,
+    limit: int = 50,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Captures from a site (www. and letter case ignored), newest first"""
+    try:
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise HTTPException(status_code=422, detail=f"limit must be between 1 and {SEARCH_MAX_LIMIT}")
+        
+        items = await repository.find_by_host(UUID(user_id), host, limit)
+        return [to_item_response(item) for item in items]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve site items: {str(e)}")
+
+@app.get("/api/items/{user_id}/pages", response_model=List[ItemResponse])
+async def get_page_items(
+    user_id: str,
+    url: str,
+    limit: int = 50,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Captures from a page, newest first
+    URLs differing only in scheme, www., trailing slash or fragment are the same page
+    """
+    try:
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            raise HTTPException(status_code=422, detail=f"limit must be between 1 and {SEARCH_MAX_LIMIT}")
+        
+        items = await repository.find_by_url(UUID(user_id), url, limit)
+        return [to_item_response(item) for item in items]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve page items: {str(e)}")
+
+@app.get("/api/items/{user_id}/near-duplicates", response_model=NearDuplicateGroupsResponse)
+async def get_near_duplicates(
+    user_id: str,
+    radius: Optional[int] = None,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Group a user's near-identical captures by perceptual hash"""
+    try:
+        radius = NEAR_DUPLICATE_RADIUS if radius is None else radius
+        if not 0 <= radius <= 16:
+            raise HTTPException(status_code=422, detail="radius must be between 0 and 16")
+        
+        groups = await near_duplicate_index.groups(UUID(user_id), repository, radius)
+        return NearDuplicateGroupsResponse(
+            radius=radius,
+            groups=[[str(item_id) for item_id in group] for group in groups]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find near-duplicates: {str(e)}")
+
+@app.get("/api/items/{user_id}/text-duplicates", response_model=TextDuplicateReport)
+async def get_text_duplicates(
+    user_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Group a user's items whose OCR text is the same (at any layout)"""
+    try:
+        groups = await text_duplicate_index.report(UUID(user_id), repository)
+        return TextDuplicateReport(
+            threshold=text_duplicate_index.threshold,
+            groups=[[str(item_id) for item_id in group] for group in groups],
+            duplicate_items=sum(len(group) - 1 for group in groups)
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to build text duplicate report: {str(e)}")
+
+@app.get("/api/item/{item_id}/same-text", response_model=List[TextMatchResponse])
+async def get_same_text_items(
+    item_id: str,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Items of the same user whose OCR text matches this item's"""
+    try:
+        item = await repository.find_by_id(UUID(item_id))
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        matches = await text_duplicate_index.find(item.user_id, item.text_minhash, repository, exclude=item.id)
+        return [TextMatchResponse(id=str(match_id), similarity=round(score, 3)) for score, match_id in matches]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find items with the same text: {str(e)}")
+
+@app.get("/api/item/{item_id}/related", response_model=List[RelatedItemResponse])
+async def get_related_items(
+    item_id: str,
+    limit: int = 10,
+    repository: IGalmuriRepository = Depends(get_repository),
+    api_key: str = Depends(verify_api_key)
+):
+    """Items of the same user with the most similar title, memo and OCR text"""
+    try:
+        if not 1 <= limit <= 100:
+            raise HTTPException(status_code=422, detail="limit must be between 1 and 100")
+        
+        item = await repository.find_by_id(UUID(item_id))
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        matches = await related_index.related(item, repository, limit)
+        return [RelatedItemResponse(id=str(match_id), similarity=round(score, 3)) for score, match_id in matches]
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find related items: {str(e)}")
+
 @app.get("/api/item/{item_id}", response_model=ItemResponse)
 async def get_item(
     item_id: str,
@@ -292,38 +1547,105 @@ async def get_item(
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
         
-        return ItemResponse(
-            id=str(item.id),
-            user_id=str(item.user_id),
-            source_url=item.source_url,
-            page_title=item.page_title,
-            memo_content=item.memo_content,
-            ocr_text=item.ocr_text,
-            ocr_status=item.ocr_status.value,
-            platform=item.platform.value,
-            is_synced=item.is_synced,
-            created_at=item.created_at,
-            updated_at=item.updated_at
-        )
+        return to_item_response(item)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve item: {str(e)}")
 
+@app.get("/api/item/{item_id}/thumbnail")
+async def get_item_thumbnail(
+    item_id: str,
+    size: Optional[int] = None,
+    repository: IGalmuriRepository = Depends(get_repository),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get a WebP thumbnail of an item
+    Uses the smallest configured size that covers `size` pixels
+    """
+    try:
+        item = await repository.find_by_id(UUID(item_id))
+        
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        data = await thumbnail_service.get(item, size)
+        return Response(
+            content=data,
+            media_type="image/webp",
+            headers={"Cache-Control": "private, max-age=31536000, immutable"}
+        )
+        
+    except HTTPException:
+        raise
+    except ImageDecodeError:
+        raise HTTPException(status_code=422, detail="Item image cannot be decoded")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve thumbnail: {str(e)}")
+
+@app.get("/api/item/{item_id}/image")
+async def get_item_image(
+    item_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    repository: IGalmuriRepository = Depends(get_repository),
+    image_store: ImageStore = Depends(get_image_store),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Get the raw image of an item
+    Supports ETag revalidation and byte ranges; images kept on disk
+    are sent as files
+    """
+    try:
+        item = await repository.find_by_id(UUID(item_id))
+        
+        if not item:
+            raise HTTPException(status_code=404, detail="Item not found")
+        
+        try:
+            image = await image_store.open(item)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Image not found")
+        
+        return stored_image_response(image, range_header, if_none_match, if_range)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve image: {str(e)}")
+
 @app.delete("/api/item/{item_id}")
 async def delete_item(
     item_id: str,
     repository: IGalmuriRepository = Depends(get_repository),
+    thumbnail_service: ThumbnailService = Depends(get_thumbnail_service),
+    image_store: ImageStore = Depends(get_image_store),
     api_key: str = Depends(verify_api_key)
 ):
-    """Delete an item"""
+    """
+    Delete an item with its thumbnails
+    Its image blob goes too unless another item (same content) still uses it
+    """
     try:
-        success = await repository.delete(UUID(item_id))
+        item = await repository.find_by_id(UUID(item_id))
+        success = item is not None and await repository.delete(item.id)
         
         if not success:
             raise HTTPException(status_code=404, detail="Item not found")
         
+        await thumbnail_service.delete(item.id)
+        if image_store.is_reference(item.image_data) and not await repository.is_image_referenced(item.image_data):
+            await image_store.delete_blob(item.image_data)
+        near_duplicate_index.remove(UUID(item_id))
+        text_duplicate_index.remove(UUID(item_id))
+        related_index.remove(UUID(item_id))
+        autocomplete_index.remove(UUID(item_id))
+        
         return {"success": True, "message": "Item deleted successfully"}
         
     except HTTPException:
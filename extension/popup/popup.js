@@ -88,7 +88,8 @@ async function captureCurrentTab() {
         captureData = {
             screenshot: screenshot,
             url: tab.url,
-            title: tab.title
+            title: tab.title,
+            itemId: crypto.randomUUID()
         };
 
         // Update UI
@@ -102,6 +103,104 @@ async function captureCurrentTab() {
     }
 }
 
+// Hex SHA-256 of base64 image data (hash of the decoded bytes)
+async function sha256Hex(base64Data) {
+    return sha256HexBytes(Uint8Array.from(atob(base64Data), (char) => char.charCodeAt(0)));
+}
+
+async function sha256HexBytes(bytes) {
+    const digest = await crypto.subtle.digest('SHA-256', bytes);
+    return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, '0')).join('');
+}
+
+// Delta recaptures: only blocks that changed since the last capture of the page are sent
+const DELTA_BLOCK_SIZE = 64;
+const DELTA_MAX_CHANGED_RATIO = 0.5; // Above this, a full upload is about as small
+
+async function loadPixels(dataUrl) {
+    const bitmap = await createImageBitmap(await (await fetch(dataUrl)).blob());
+    const canvas = new OffscreenCanvas(bitmap.width, bitmap.height);
+    const context = canvas.getContext('2d');
+    context.drawImage(bitmap, 0, 0);
+    return context.getImageData(0, 0, bitmap.width, bitmap.height);
+}
+
+function blockChanged(base, next, x, y, width, height) {
+    if (x + width > base.width || y + height > base.height) {
+        return true; // Outside the base image
+    }
+    for (let row = y; row < y + height; row++) {
+        const nextStart = (row * next.width + x) * 4;
+        const baseStart = (row * base.width + x) * 4;
+        for (let i = 0; i < width * 4; i++) {
+            if (next.data[nextStart + i] !== base.data[baseStart + i]) {
+                return true;
+            }
+        }
+    }
+    return false;
+}
+
+async function blobToBase64(blob) {
+    return new Promise((resolve, reject) => {
+        const reader = new FileReader();
+        reader.onload = () => resolve(reader.result.split(',')[1]);
+        reader.onerror = () => reject(reader.error);
+        reader.readAsDataURL(blob);
+    });
+}
+
+// Changed blocks of `dataUrl` against `baseDataUrl`, or null if a full upload is better
+async function buildDelta(baseDataUrl, dataUrl) {
+    const base = await loadPixels(baseDataUrl);
+    const next = await loadPixels(dataUrl);
+    const blocks = [];
+    let changedPixels = 0;
+
+    for (let y = 0; y < next.height; y += DELTA_BLOCK_SIZE) {
+        for (let x = 0; x < next.width; x += DELTA_BLOCK_SIZE) {
+            const width = Math.min(DELTA_BLOCK_SIZE, next.width - x);
+            const height = Math.min(DELTA_BLOCK_SIZE, next.height - y);
+            if (!blockChanged(base, next, x, y, width, height)) {
+                continue;
+            }
+            const tile = new OffscreenCanvas(width, height);
+            tile.getContext('2d').putImageData(next, -x, -y, x, y, width, height);
+            const png = await tile.convertToBlob({ type: 'image/png' });
+            blocks.push({ x, y, image_data: await blobToBase64(png) });
+            changedPixels += width * height;
+        }
+    }
+
+    if (changedPixels > next.width * next.height * DELTA_MAX_CHANGED_RATIO) {
+        return null;
+    }
+    return {
+        width: next.width,
+        height: next.height,
+        pixel_sha256: await sha256HexBytes(next.data),
+        blocks
+    };
+}
+
+async function sendDelta(settings, headers, requestData) {
+    const { lastCapture } = await chrome.storage.local.get('lastCapture');
+    if (!lastCapture || lastCapture.url !== captureData.url) {
+        return null;
+    }
+    const delta = await buildDelta(lastCapture.screenshot, captureData.screenshot);
+    if (!delta) {
+        return null;
+    }
+    const response = await fetch(`${settings.apiUrl}/api/capture/delta`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ ...requestData, ...delta, base_item_id: lastCapture.itemId })
+    });
+    // Base gone, or pixels didn't match: fall back to a full upload
+    return response.ok ? response : null;
+}
+
 // Save functionality
 saveBtn.addEventListener('click', async () => {
     const settings = await loadSettings();
@@ -119,24 +218,44 @@ saveBtn.addEventListener('click', async () => {
 
     try {
         // Prepare data
+        const imageData = captureData.screenshot.split(',')[1]; // Remove data:image/png;base64, prefix
         const requestData = {
             user_id: settings.userId,
-            image_data: captureData.screenshot.split(',')[1], // Remove data:image/png;base64, prefix
+            item_id: captureData.itemId, // Same ID on retry, so no duplicates
             source_url: captureData.url,
             page_title: captureData.title,
             memo_content: memoInput.value || '',
             platform: 'WEB_EXTENSION'
         };
+        const headers = {
+            'Content-Type': 'application/json',
+            'X-API-Key': settings.apiKey
+        };
 
-        // Send to API
-        const response = await fetch(`${settings.apiUrl}/api/capture`, {
+        // Ask first: an image the server already has is captured by reference
+        const sha256 = await sha256Hex(imageData);
+        const negotiation = await fetch(`${settings.apiUrl}/api/capture/negotiate`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-                'X-API-Key': settings.apiKey
-            },
-            body: JSON.stringify(requestData)
+            headers,
+            body: JSON.stringify({ user_id: settings.userId, sha256 })
         });
+        const known = negotiation.ok && (await negotiation.json()).known;
+
+        // Send to API
+        let response = known
+            ? await fetch(`${settings.apiUrl}/api/capture/by-reference`, {
+                method: 'POST',
+                headers,
+                body: JSON.stringify({ ...requestData, sha256 })
+            })
+            : await sendDelta(settings, headers, requestData).catch(() => null);
+        if (!response) {
+            response = await fetch(`${settings.apiUrl}/api/capture`, {
+                method: 'POST',
+                headers,
+                body: JSON.stringify({ ...requestData, image_data: imageData })
+            });
+        }
 
         if (!response.ok) {
             const errorData = await response.json();
@@ -146,6 +265,11 @@ saveBtn.addEventListener('click', async () => {
         const result = await response.json();
         console.log('Saved successfully:', result);
 
+        // Base for the next recapture of this page
+        await chrome.storage.local.set({
+            lastCapture: { url: captureData.url, itemId: result.id, screenshot: captureData.screenshot }
+        }).catch(() => {});
+
         showStatus(status, '✅ 저장되었습니다! OCR 처리가 백그라운드에서 진행됩니다.', 'success');
 
         // Clear memo and close after delay
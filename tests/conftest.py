@@ -0,0 +1,8 @@
+"""
+Shared pytest configuration
+"""
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level packages (domain, application, ...)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
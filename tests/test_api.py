@@ -9,9 +9,16 @@ import base64
 from io import BytesIO
 from PIL import Image
 
-from backend.presentation.main import app, get_repository, get_ocr_service
+import asyncio
+import time
+from uuid import UUID
+
+from backend.presentation.main import app, get_repository, get_ocr_service, get_blob_store, get_upload_store
+from backend.domain.entities import GalmuriItem
 from backend.infrastructure.local_repository import LocalGalmuriRepository
 from backend.application.ocr_service import MockOCRService
+from backend.infrastructure.blob_store import LocalBlobStore
+import hashlib
 
 
 # Test API Key
@@ -32,6 +39,15 @@ def test_ocr_service():
     return MockOCRService(mock_text="테스트 OCR 텍스트")
 
 
+@pytest.fixture(autouse=True)
+def test_blob_store(tmp_path):
+    """Keep blobs (thumbnails, images) in a temporary directory"""
+    store = LocalBlobStore(str(tmp_path / "blobs"))
+    app.dependency_overrides[get_blob_store] = lambda: store
+    yield store
+    app.dependency_overrides.pop(get_blob_store, None)
+
+
 @pytest.fixture
 def client(test_repository, test_ocr_service):
     """Create test client with dependency overrides"""
@@ -110,6 +126,775 @@ class TestCaptureEndpoint:
         assert data["ocr_status"] == "PENDING"
         assert data["platform"] == "WEB_EXTENSION"
 
+    def test_capture_with_client_ocr(self, client):
+        """Should store client OCR text as DONE without server OCR"""
+        response = client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "On-device OCR",
+                "platform": "MOBILE_APP",
+                "ocr_text": "기기에서 추출한 텍스트",
+                "ocr_engine": "mlkit",
+                "ocr_engine_version": "16.0.0"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["ocr_status"] == "DONE"
+        assert data["ocr_text"] == "기기에서 추출한 텍스트"
+        assert data["ocr_engine"] == "mlkit"
+        assert data["ocr_engine_version"] == "16.0.0"
+
+
+class TestCaptureLimits:
+    """Test request body and pixel limits"""
+    
+    def test_capture_over_pixel_limit(self, client, monkeypatch):
+        """Should reject images with too many pixels with 413"""
+        import backend.presentation.main as main
+        monkeypatch.setattr(main.ingest_pipeline, "max_pixels", 100)
+        
+        response = client.post(
+            "/api/capture",
+            json={"user_id": TEST_USER_ID, "image_data": create_test_image(), "page_title": "Huge"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 413
+    
+    def test_body_limit(self):
+        """Should reject oversized bodies, declared or streamed, with 413"""
+        from fastapi import FastAPI, Request
+        from backend.presentation.body_limit import BodySizeLimitMiddleware
+        
+        limited = FastAPI()
+        limited.add_middleware(BodySizeLimitMiddleware, max_bytes=100)
+        
+        @limited.post("/echo")
+        async def echo(request: Request):
+            return {"size": len(await request.body())}
+        
+        def chunks():
+            for _ in range(10):
+                yield b"x" * 20
+        
+        with TestClient(limited) as limited_client:
+            assert limited_client.post("/echo", content=b"x" * 100).json() == {"size": 100}
+            assert limited_client.post("/echo", content=b"x" * 101).status_code == 413
+            assert limited_client.post("/echo", content=chunks()).status_code == 413
+
+
+class TestDocumentCaptureEndpoint:
+    """Test multi-page document capture"""
+    
+    def test_capture_document_and_search_pages(self, test_repository):
+        """Should OCR every page and report matching page numbers"""
+        pages = [Image.new('RGB', (100 + index, 50), color='white') for index in range(3)]
+        buffered = BytesIO()
+        pages[0].save(buffered, format="TIFF", save_all=True, append_images=pages[1:])
+        document = base64.b64encode(buffered.getvalue()).decode()
+        
+        class PageOCRService(MockOCRService):
+            async def extract_text_from_image(self, image):
+                return "영수증 합계" if image.width == 101 else "빈 페이지"
+        
+        app.dependency_overrides[get_repository] = lambda: test_repository
+        app.dependency_overrides[get_ocr_service] = lambda: PageOCRService()
+        try:
+            with TestClient(app) as c:
+                item_id = c.post(
+                    "/api/capture/document",
+                    json={
+                        "user_id": TEST_USER_ID,
+                        "document_data": document,
+                        "page_title": "Scanned Receipts"
+                    },
+                    headers={"X-API-Key": TEST_API_KEY}
+                ).json()["id"]
+                
+                for _ in range(50):
+                    item = c.get(f"/api/item/{item_id}", headers={"X-API-Key": TEST_API_KEY}).json()
+                    if item["ocr_status"] == "DONE":
+                        break
+                    time.sleep(0.02)
+                
+                results = c.post(
+                    "/api/search",
+                    json={"user_id": TEST_USER_ID, "query": "합계"},
+                    headers={"X-API-Key": TEST_API_KEY}
+                ).json()
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert item["page_count"] == 3
+        assert len(results) == 1
+        assert results[0]["matched_pages"] == [2]
+    
+    def test_document_cost_counts_pages(self, monkeypatch):
+        """Should charge the OCR scheduler per page, and one page for documents OCR rejects"""
+        import backend.presentation.main as main
+        pages = [Image.new('RGB', (100, 50), color='white') for _ in range(3)]
+        buffered = BytesIO()
+        pages[0].save(buffered, format="TIFF", save_all=True, append_images=pages[1:])
+        document = "data:image/tiff;base64," + base64.b64encode(buffered.getvalue()).decode()
+        
+        counted = asyncio.run(main.count_document_pages(document, "tiff"))
+        unreadable = asyncio.run(main.count_document_pages("data:image/tiff;base64,SUkqAA==", "tiff"))
+        monkeypatch.setattr(main, "DOCUMENT_MAX_PAGES", 2)
+        too_long = asyncio.run(main.count_document_pages(document, "tiff"))
+        
+        assert (counted, unreadable, too_long) == (3, 1, 1)
+        assert main.DOCUMENT_PARALLEL_PAGES <= main.OCR_WORKERS
+    
+    def test_reject_non_document(self, client):
+        """Should reject plain images"""
+        response = client.post(
+            "/api/capture/document",
+            json={
+                "user_id": TEST_USER_ID,
+                "document_data": create_test_image(),
+                "page_title": "Not a document"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 400
+
+
+class TestThumbnailEndpoint:
+    """Test thumbnail generation and serving"""
+    
+    def test_thumbnail_generated_at_capture(self, client, test_blob_store):
+        """Should store WebP thumbnails during capture and serve them"""
+        item = client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "Thumbnail Page"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+        
+        assert item["thumbnail_url"] == f"/api/item/{item['id']}/thumbnail"
+        assert test_blob_store.local_path(f"thumbnails/{item['id']}/128.webp") is not None
+        
+        response = client.get(
+            item["thumbnail_url"] + "?size=100",
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert Image.open(BytesIO(response.content)).format == "WEBP"
+    
+    def test_thumbnail_generated_lazily(self, client, test_repository, test_blob_store):
+        """Should render and cache thumbnails for items captured without them"""
+        item = GalmuriItem(user_id=UUID(TEST_USER_ID), image_data=create_test_image())
+        asyncio.run(test_repository.save(item))
+        
+        response = client.get(
+            f"/api/item/{item.id}/thumbnail?size=384",
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        assert test_blob_store.local_path(f"thumbnails/{item.id}/384.webp") is not None
+    
+    def test_thumbnails_deleted_with_item(self, client, test_blob_store):
+        """Should remove cached thumbnails when the item is deleted"""
+        item_id = client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "Short-lived"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()["id"]
+        
+        client.delete(f"/api/item/{item_id}", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert test_blob_store.local_path(f"thumbnails/{item_id}/128.webp") is None
+
+
+class TestImageEndpoint:
+    """Test raw image serving"""
+    
+    def capture(self, client) -> dict:
+        return client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "Image Page"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+    
+    def test_image_served_with_validators(self, client):
+        """Should return raw bytes with content type, strong ETag and immutable caching"""
+        item = self.capture(client)
+        
+        response = client.get(f"/api/item/{item['id']}/image", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["etag"] == f'"{item["content_hash"]}"'
+        assert "immutable" in response.headers["cache-control"]
+        assert response.content == base64.b64decode(create_test_image())
+    
+    def test_image_not_modified(self, client):
+        """Should answer 304 when the ETag matches"""
+        item = self.capture(client)
+        
+        response = client.get(
+            f"/api/item/{item['id']}/image",
+            headers={"X-API-Key": TEST_API_KEY, "If-None-Match": f'"{item["content_hash"]}"'}
+        )
+        
+        assert response.status_code == 304
+        assert response.content == b""
+    
+    def test_image_byte_ranges(self, client):
+        """Should serve partial content and reject ranges past the end"""
+        item = self.capture(client)
+        original = base64.b64decode(create_test_image())
+        
+        partial = client.get(
+            f"/api/item/{item['id']}/image",
+            headers={"X-API-Key": TEST_API_KEY, "Range": "bytes=8-"}
+        )
+        unsatisfiable = client.get(
+            f"/api/item/{item['id']}/image",
+            headers={"X-API-Key": TEST_API_KEY, "Range": f"bytes={len(original)}-"}
+        )
+        
+        assert partial.status_code == 206
+        assert partial.content == original[8:]
+        assert partial.headers["content-range"] == f"bytes 8-{len(original) - 1}/{len(original)}"
+        assert unsatisfiable.status_code == 416
+        assert unsatisfiable.headers["content-range"] == f"bytes */{len(original)}"
+    
+    def test_image_stored_in_blob_store(self, client, test_repository, test_blob_store, monkeypatch):
+        """Should keep images on disk when configured and serve them as files"""
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "IMAGE_STORAGE", "blob")
+        original = base64.b64decode(create_test_image())
+        
+        item = self.capture(client)
+        stored = asyncio.run(test_repository.find_by_id(UUID(item["id"])))
+        
+        assert stored.image_data.startswith("blob:images/")
+        assert test_blob_store.local_path(stored.image_data[len("blob:"):]) is not None
+        
+        full = client.get(f"/api/item/{item['id']}/image", headers={"X-API-Key": TEST_API_KEY})
+        ranged = client.get(
+            f"/api/item/{item['id']}/image",
+            headers={"X-API-Key": TEST_API_KEY, "Range": "bytes=0-7"}
+        )
+        
+        assert full.status_code == 200
+        assert full.content == original
+        assert full.headers["etag"] == f'"{item["content_hash"]}"'
+        assert ranged.status_code == 206
+        assert ranged.content == original[:8]
+    
+    def test_delete_removes_unshared_image_blob(self, client, test_blob_store, monkeypatch):
+        """Should delete an image blob with the last item referencing it"""
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "IMAGE_STORAGE", "blob")
+        first, second = self.capture(client), self.capture(client)
+        key = next(test_blob_store.iter_keys("images/"))
+        
+        client.delete(f"/api/item/{first['id']}", headers={"X-API-Key": TEST_API_KEY})
+        shared = test_blob_store.local_path(key)
+        client.delete(f"/api/item/{second['id']}", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert shared is not None
+        assert test_blob_store.local_path(key) is None
+        assert list(test_blob_store.iter_keys()) == []
+
+
+    def test_transcoded_capture(self, client, monkeypatch):
+        """Should store a transcoded capture and report the savings"""
+        import backend.presentation.main as main
+        from backend.application.ingest import IngestPipeline, default_stages
+        monkeypatch.setattr(main, "ingest_pipeline", IngestPipeline(stages=default_stages(transcode="lossless")))
+        
+        item = self.capture(client)
+        image = client.get(f"/api/item/{item['id']}/image", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert item["storage"]["mime_type"] == "image/webp"
+        assert item["storage"]["saved_bytes"] > 0
+        assert item["storage"]["stored_bytes"] == len(image.content)
+        assert image.headers["content-type"] == "image/webp"
+
+
+class TestResumableUpload:
+    """Test chunked, resumable capture uploads"""
+    
+    @pytest.fixture(autouse=True)
+    def upload_store(self, tmp_path):
+        # The app imports modules without the "backend." prefix; use its
+        # class so the upload exceptions it catches are the ones raised
+        import backend.presentation.main as main
+        store = main.LocalUploadStore(str(tmp_path / "uploads"))
+        app.dependency_overrides[get_upload_store] = lambda: store
+        yield store
+        app.dependency_overrides.pop(get_upload_store, None)
+    
+    def start(self, client, data: bytes, item_id: str, **fields) -> dict:
+        response = client.post(
+            "/api/uploads",
+            json={
+                "user_id": TEST_USER_ID,
+                "item_id": item_id,
+                "page_title": "Uploaded",
+                "total_size": len(data),
+                **fields
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        assert response.status_code == 200
+        return response.json()
+    
+    def put(self, client, item_id: str, offset: int, chunk: bytes):
+        return client.put(
+            f"/api/uploads/{item_id}?offset={offset}",
+            content=chunk,
+            headers={"X-API-Key": TEST_API_KEY, "Content-Type": "application/octet-stream"}
+        )
+    
+    def test_chunked_upload_and_idempotent_finalize(self, client):
+        """Should assemble chunks into an item with the client's ID, once"""
+        data = base64.b64decode(create_test_image())
+        item_id = str(uuid4())
+        
+        session = self.start(client, data, item_id, sha256=hashlib.sha256(data).hexdigest())
+        assert session["upload_id"] == item_id
+        assert self.put(client, item_id, 0, data[:100]).json()["offset"] == 100
+        assert self.put(client, item_id, 100, data[100:]).json()["offset"] == len(data)
+        
+        first = client.post(f"/api/uploads/{item_id}/finalize", headers={"X-API-Key": TEST_API_KEY})
+        second = client.post(f"/api/uploads/{item_id}/finalize", headers={"X-API-Key": TEST_API_KEY})
+        image = client.get(f"/api/item/{item_id}/image", headers={"X-API-Key": TEST_API_KEY})
+        items = client.get(f"/api/items/{TEST_USER_ID}", headers={"X-API-Key": TEST_API_KEY}).json()
+        
+        assert first.status_code == 200
+        assert first.json()["id"] == item_id
+        assert second.json()["id"] == item_id
+        assert image.content == data
+        assert [item["id"] for item in items].count(item_id) == 1
+    
+    def test_resume_after_lost_response(self, client):
+        """Should report the committed offset and reject chunks at other offsets"""
+        data = base64.b64decode(create_test_image())
+        item_id = str(uuid4())
+        self.start(client, data, item_id)
+        self.put(client, item_id, 0, data[:50])
+        
+        resumed = self.start(client, data, item_id)
+        stale = self.put(client, item_id, 0, data[:50])
+        early = client.post(f"/api/uploads/{item_id}/finalize", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert resumed["offset"] == 50
+        assert stale.status_code == 409
+        assert stale.headers["upload-offset"] == "50"
+        assert early.status_code == 409
+    
+    def test_checksum_mismatch(self, client):
+        """Should refuse to finalize an upload that doesn't match its SHA-256"""
+        data = base64.b64decode(create_test_image())
+        item_id = str(uuid4())
+        self.start(client, data, item_id, sha256="0" * 64)
+        self.put(client, item_id, 0, data)
+        
+        response = client.post(f"/api/uploads/{item_id}/finalize", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert response.status_code == 422
+    
+    def test_concurrent_chunks_at_same_offset(self, client, upload_store):
+        """Should append only one of two chunks racing for the same offset"""
+        import backend.presentation.main as main
+        from fastapi import HTTPException
+        data = base64.b64decode(create_test_image())
+        item_id = str(uuid4())
+        self.start(client, data, item_id)
+        
+        class SlowRequest:
+            async def stream(self):
+                yield data[:50]
+                await asyncio.sleep(0.01)
+                yield data[50:100]
+        
+        async def put():
+            try:
+                return (await main.upload_chunk(item_id, 0, SlowRequest(), upload_store, TEST_API_KEY)).offset
+            except HTTPException as e:
+                return e.status_code
+        
+        async def race():
+            return await asyncio.gather(put(), put())
+        
+        assert sorted(asyncio.run(race())) == [100, 409]
+        assert upload_store.get(item_id).offset == 100
+        assert main.upload_locks == {}
+    
+    def test_failed_finalize_releases_lock(self, client):
+        """Should not keep a lock for uploads whose finalize fails"""
+        import backend.presentation.main as main
+        
+        missing = client.post(f"/api/uploads/{uuid4()}/finalize", headers={"X-API-Key": TEST_API_KEY})
+        invalid = client.post("/api/uploads/not-a-uuid/finalize", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert missing.status_code == 404
+        assert invalid.status_code == 404
+        assert main.upload_locks == {}
+    
+    def test_capture_with_client_id_is_idempotent(self, client):
+        """Should return the existing item when a capture is retried"""
+        payload = {
+            "user_id": TEST_USER_ID,
+            "item_id": str(uuid4()),
+            "image_data": create_test_image(),
+            "page_title": "Retried"
+        }
+        
+        first = client.post("/api/capture", json=payload, headers={"X-API-Key": TEST_API_KEY})
+        second = client.post("/api/capture", json=payload, headers={"X-API-Key": TEST_API_KEY})
+        stolen = client.post(
+            "/api/capture",
+            json={**payload, "user_id": str(uuid4())},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert first.json()["id"] == payload["item_id"]
+        assert second.json()["id"] == payload["item_id"]
+        assert stolen.status_code == 409
+
+
+class TestCaptureNegotiation:
+    """Test hash-first capture"""
+    
+    def negotiate(self, client, user_id: str, sha256: str) -> bool:
+        return client.post(
+            "/api/capture/negotiate",
+            json={"user_id": user_id, "sha256": sha256},
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()["known"]
+    
+    def test_capture_known_image_by_reference(self, client):
+        """Should create an item from a stored image without re-uploading it"""
+        data = base64.b64decode(create_test_image())
+        sha256 = hashlib.sha256(data).hexdigest()
+        assert self.negotiate(client, TEST_USER_ID, sha256) is False
+        
+        source = client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "First",
+                "ocr_text": "device text"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+        assert self.negotiate(client, TEST_USER_ID, sha256.upper()) is True
+        assert self.negotiate(client, str(uuid4()), sha256) is False
+        
+        response = client.post(
+            "/api/capture/by-reference",
+            json={"user_id": TEST_USER_ID, "sha256": sha256, "page_title": "Again"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        item = response.json()
+        image = client.get(f"/api/item/{item['id']}/image", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert response.status_code == 200
+        assert item["id"] != source["id"]
+        assert item["page_title"] == "Again"
+        assert item["ocr_status"] == "DONE"
+        assert item["ocr_text"] == "device text"
+        assert image.content == data
+    
+    def test_unknown_reference(self, client):
+        """Should ask for an upload when the image is not stored"""
+        response = client.post(
+            "/api/capture/by-reference",
+            json={"user_id": TEST_USER_ID, "sha256": "0" * 64, "page_title": "Missing"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 404
+
+
+class TestDeltaCapture:
+    """Test recaptures uploaded as changed blocks"""
+    
+    def encode_png(self, image: Image.Image) -> str:
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode()
+    
+    def capture_base(self, client, image: Image.Image) -> dict:
+        return client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": self.encode_png(image),
+                "source_url": "https://example.com/dashboard",
+                "page_title": "Dashboard"
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+    
+    def delta_request(self, base_id: str, new: Image.Image, blocks: list, user_id: str = TEST_USER_ID) -> dict:
+        return {
+            "user_id": user_id,
+            "base_item_id": base_id,
+            "source_url": "https://example.com/dashboard",
+            "page_title": "Dashboard (later)",
+            "width": new.width,
+            "height": new.height,
+            "pixel_sha256": hashlib.sha256(new.convert('RGBA').tobytes()).hexdigest(),
+            "blocks": blocks
+        }
+    
+    def test_rebuilds_changed_and_grown_image(self, client):
+        """Should apply changed blocks, including ones past the base, and ingest the result"""
+        base = Image.new('RGB', (128, 128), color='white')
+        new = Image.new('RGB', (128, 192), color='white')
+        new.paste(Image.new('RGB', (64, 64), color='red'), (64, 0))
+        new.paste(Image.new('RGB', (128, 64), color='blue'), (0, 128))
+        base_item = self.capture_base(client, base)
+        blocks = [
+            {"x": 64, "y": 0, "image_data": self.encode_png(new.crop((64, 0, 128, 64)))},
+            {"x": 0, "y": 128, "image_data": self.encode_png(new.crop((0, 128, 128, 192)))},
+        ]
+        
+        response = client.post(
+            "/api/capture/delta",
+            json=self.delta_request(base_item["id"], new, blocks),
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        item = response.json()
+        image = client.get(f"/api/item/{item['id']}/image", headers={"X-API-Key": TEST_API_KEY})
+        stored = Image.open(BytesIO(image.content))
+        
+        assert response.status_code == 200
+        assert item["id"] != base_item["id"]
+        assert stored.size == (128, 192)
+        assert stored.convert('RGB').tobytes() == new.tobytes()
+    
+    def test_hash_mismatch(self, client):
+        """Should refuse a delta that does not reproduce the image"""
+        base = Image.new('RGB', (64, 64), color='white')
+        new = Image.new('RGB', (64, 64), color='black')
+        base_item = self.capture_base(client, base)
+        
+        response = client.post(
+            "/api/capture/delta",
+            json=self.delta_request(base_item["id"], new, []),
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 422
+    
+    def test_base_of_other_user(self, client):
+        """Should not apply deltas to another user's item"""
+        base = Image.new('RGB', (64, 64), color='white')
+        base_item = self.capture_base(client, base)
+        
+        response = client.post(
+            "/api/capture/delta",
+            json=self.delta_request(base_item["id"], base, [], user_id=str(uuid4())),
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 404
+
+
+class TestNearDuplicates:
+    """Test near-duplicate detection"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_index(self, monkeypatch):
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "near_duplicate_index", main.NearDuplicateIndex(radius=6))
+    
+    def capture(self, client, image: Image.Image, check: bool = False) -> dict:
+        buffer = BytesIO()
+        image.save(buffer, format="PNG")
+        return client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": base64.b64encode(buffer.getvalue()).decode(),
+                "page_title": "Page",
+                "check_duplicates": check
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+    
+    def page(self, offset: int = 0) -> Image.Image:
+        image = Image.linear_gradient('L').rotate(90).convert('RGB').resize((300, 200))
+        return image.crop((offset, 0, offset + 280, 200))
+    
+    def test_capture_flag_and_groups(self, client):
+        """Should report a slightly scrolled recapture and group it with the original"""
+        original = self.capture(client, self.page())
+        other = self.capture(client, self.page().transpose(Image.Transpose.FLIP_LEFT_RIGHT))
+        scrolled = self.capture(client, self.page(offset=2), check=True)
+        
+        groups = client.get(
+            f"/api/items/{TEST_USER_ID}/near-duplicates",
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+        
+        assert original["near_duplicates"] is None
+        assert scrolled["near_duplicates"] == [original["id"]]
+        assert groups["radius"] == 6
+        assert groups["groups"] == [sorted([original["id"], scrolled["id"]])]
+        assert other["id"] not in groups["groups"][0]
+    
+    def test_deleted_items_leave_groups(self, client):
+        """Should drop deleted items from the index"""
+        original = self.capture(client, self.page())
+        self.capture(client, self.page(offset=1))
+        client.get(f"/api/items/{TEST_USER_ID}/near-duplicates", headers={"X-API-Key": TEST_API_KEY})
+        
+        client.delete(f"/api/item/{original['id']}", headers={"X-API-Key": TEST_API_KEY})
+        groups = client.get(
+            f"/api/items/{TEST_USER_ID}/near-duplicates",
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+        
+        assert groups["groups"] == []
+
+
+class TestTextDuplicates:
+    """Test same-text lookups"""
+    
+    ARTICLE = "Galmuri Diary keeps web pages and screenshots searchable with OCR on every device."
+    
+    @pytest.fixture(autouse=True)
+    def fresh_index(self, monkeypatch):
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "text_duplicate_index", main.TextDuplicateIndex(threshold=0.8))
+    
+    def capture(self, client, ocr_text: str) -> dict:
+        return client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "Article",
+                "ocr_text": ocr_text
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+    
+    def test_same_text_and_report(self, client):
+        """Should match the same text at another layout and report the group"""
+        desktop = self.capture(client, self.ARTICLE)
+        mobile = self.capture(client, self.ARTICLE.replace(" ", "\n", 5))
+        self.capture(client, "A completely different page listing train times from Seoul to Busan.")
+        
+        same = client.get(f"/api/item/{desktop['id']}/same-text", headers={"X-API-Key": TEST_API_KEY})
+        report = client.get(
+            f"/api/items/{TEST_USER_ID}/text-duplicates",
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+        
+        assert same.status_code == 200
+        assert same.json() == [{"id": mobile["id"], "similarity": 1.0}]
+        assert report["groups"] == [sorted([desktop["id"], mobile["id"]])]
+        assert report["duplicate_items"] == 1
+
+
+class TestAutocomplete:
+    """Test search autocomplete"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_index(self, monkeypatch):
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "autocomplete_index", main.AutocompleteIndex())
+    
+    def test_autocomplete(self, client):
+        """Should complete the last word from the user's captures, including new ones"""
+        client.get(f"/api/items/{TEST_USER_ID}/autocomplete?q=배", headers={"X-API-Key": TEST_API_KEY})
+        client.post(
+            "/api/capture",
+            json={"user_id": TEST_USER_ID, "image_data": create_test_image(), "page_title": "배달의민족 주문"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        response = client.get(
+            f"/api/items/{TEST_USER_ID}/autocomplete",
+            params={"q": "치킨 배다"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        assert response.json() == {"suggestions": [{"text": "치킨 배달의민족", "count": 1}]}
+    
+    def test_invalid_limit(self, client):
+        """Should reject limits outside 1-50"""
+        response = client.get(
+            f"/api/items/{TEST_USER_ID}/autocomplete?q=a&limit=51",
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 422
+
+
+class TestRelatedItems:
+    """Test related-item lookups"""
+    
+    @pytest.fixture(autouse=True)
+    def fresh_index(self, monkeypatch):
+        import backend.presentation.main as main
+        monkeypatch.setattr(main, "related_index", main.RelatedItemsIndex(min_similarity=0.2))
+    
+    def capture(self, client, page_title: str, ocr_text: str) -> dict:
+        return client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": page_title,
+                "ocr_text": ocr_text
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()
+    
+    def test_related_items(self, client):
+        """Should rank items with similar text first and pick up new captures"""
+        recipe = self.capture(client, "김치찌개 레시피", "돼지고기 김치찌개 끓이는 법 두부 대파")
+        similar = self.capture(client, "김치찌개 맛집", "김치찌개 돼지고기 두부 듬뿍")
+        self.capture(client, "Train timetable", "Seoul to Busan departures every hour")
+        
+        first = client.get(f"/api/item/{recipe['id']}/related", headers={"X-API-Key": TEST_API_KEY})
+        later = self.capture(client, "김치찌개", "김치찌개 두부 돼지고기 대파")
+        second = client.get(f"/api/item/{recipe['id']}/related?limit=1", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert first.status_code == 200
+        assert [match["id"] for match in first.json()] == [similar["id"]]
+        assert [match["id"] for match in second.json()] == [later["id"]]
+    
+    def test_invalid_limit(self, client):
+        """Should reject limits outside 1-100"""
+        item = self.capture(client, "Title", "text")
+        
+        response = client.get(f"/api/item/{item['id']}/related?limit=0", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert response.status_code == 422
+
 
 class TestGetItemsEndpoint:
     """Test get items endpoint"""
@@ -198,6 +983,176 @@ class TestSearchEndpoint:
         data = response.json()
         assert len(data) >= 1
         assert "배달" in data[0]["page_title"]
+    
+    def test_search_snippets(self, client):
+        """Should return snippets instead of the full OCR text unless asked for it"""
+        client.post(
+            "/api/capture",
+            json={
+                "user_id": TEST_USER_ID,
+                "image_data": create_test_image(),
+                "page_title": "영수증",
+                "ocr_text": "상호 " + "가" * 300 + " 합계 12,000원 " + "나" * 300
+            },
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        default = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "합계"},
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()[0]
+        full = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "합계", "include_text": True},
+            headers={"X-API-Key": TEST_API_KEY}
+        ).json()[0]
+        
+        [snippet] = default["snippets"]
+        start, end = snippet["highlights"][0]
+        assert default["ocr_text"] is None
+        assert snippet["field"] == "ocr"
+        assert snippet["text"][start:end] == "합계"
+        assert len(snippet["text"]) < 200
+        assert full["ocr_text"].startswith("상호")
+    
+    def test_search_facets(self, client):
+        """Should count hits per requested facet and reject unknown facets"""
+        for title, url in (("쿠팡 주문", "https://www.coupang.com/a"), ("쿠팡 배송", "https://coupang.com/b"), ("쿠팡", None)):
+            client.post(
+                "/api/capture",
+                json={"user_id": TEST_USER_ID, "image_data": create_test_image(), "page_title": title, "source_url": url},
+                headers={"X-API-Key": TEST_API_KEY}
+            )
+        
+        response = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "쿠팡", "facets": ["site", "platform"]},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        paged = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "쿠팡", "facets": ["site"], "limit": 1},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        listed = client.get(f"/api/items/{TEST_USER_ID}?facets=month", headers={"X-API-Key": TEST_API_KEY})
+        unknown = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "쿠팡", "facets": ["color"]},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) == 3
+        assert data["facets"] == {"site": {"coupang.com": 2, "": 1}, "platform": {"WEB_EXTENSION": 3}}
+        # Counted over every hit, not only the returned page
+        assert len(paged.json()["items"]) == 1
+        assert paged.json()["facets"] == {"site": {"coupang.com": 2, "": 1}}
+        assert sum(listed.json()["facets"]["month"].values()) == 3
+        assert unknown.status_code == 422
+    
+    def test_search_limit(self, client):
+        """Should return pages of limit hits, newest first, flag more pages and reject limits out of range"""
+        ids = [
+            client.post(
+                "/api/capture",
+                json={"user_id": TEST_USER_ID, "image_data": create_test_image(), "page_title": f"메모 {index}"},
+                headers={"X-API-Key": TEST_API_KEY}
+            ).json()["id"]
+            for index in range(3)
+        ]
+        
+        response = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "메모", "limit": 2},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        following = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "메모", "limit": 2, "offset": 2},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        invalid = client.post(
+            "/api/search",
+            json={"user_id": TEST_USER_ID, "query": "메모", "limit": 0},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        assert [item["id"] for item in response.json()] == ids[:0:-1]
+        assert response.headers["X-Search-Truncated"] == "false"
+        assert response.headers["X-Search-Has-More"] == "true"
+        assert [item["id"] for item in following.json()] == ids[:1]
+        assert following.headers["X-Search-Has-More"] == "false"
+        assert invalid.status_code == 422
+
+
+class TestSites:
+    """Test per-site and per-page listings"""
+    
+    def test_sites_and_pages(self, client):
+        """Should count captures per host and list those of a site or page"""
+        ids = [
+            client.post(
+                "/api/capture",
+                json={"user_id": TEST_USER_ID, "image_data": create_test_image(), "page_title": "주문", "source_url": url},
+                headers={"X-API-Key": TEST_API_KEY}
+            ).json()["id"]
+            for url in ("https://www.coupang.com/order/", "http://coupang.com/order#top", "https://coupang.com/cart", None)
+        ]
+        
+        sites = client.get(f"/api/items/{TEST_USER_ID}/sites", headers={"X-API-Key": TEST_API_KEY})
+        site = client.get(f"/api/items/{TEST_USER_ID}/sites/WWW.Coupang.com", headers={"X-API-Key": TEST_API_KEY})
+        page = client.get(
+            f"/api/items/{TEST_USER_ID}/pages",
+            params={"url": "coupang.com/order"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        invalid = client.get(f"/api/items/{TEST_USER_ID}/sites/coupang.com?limit=0", headers={"X-API-Key": TEST_API_KEY})
+        
+        assert sites.json() == [{"host": "coupang.com", "count": 3}]
+        assert {item["id"] for item in site.json()} == set(ids[:3])
+        assert {item["id"] for item in page.json()} == set(ids[:2])
+        assert invalid.status_code == 422
+
+
+class TestStructuredSearchEndpoint:
+    """Test search with the query language"""
+    
+    def test_filters_and_negation(self, client):
+        """Should apply field filters and negation"""
+        for title, memo in (("배달의민족 주문", "점심"), ("배달 광고", ""), ("쿠팡 주문", "점심")):
+            client.post(
+                "/api/capture",
+                json={
+                    "user_id": TEST_USER_ID,
+                    "image_data": create_test_image(),
+                    "page_title": title,
+                    "memo_content": memo
+                },
+                headers={"X-API-Key": TEST_API_KEY}
+            )
+        
+        response = client.post(
+            "/api/search/query",
+            json={"user_id": TEST_USER_ID, "query": "주문 memo:점심 -쿠팡 platform:web"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 200
+        assert [item["page_title"] for item in response.json()] == ["배달의민족 주문"]
+    
+    def test_invalid_query(self, client):
+        """Should reject negation-only queries with 422"""
+        response = client.post(
+            "/api/search/query",
+            json={"user_id": TEST_USER_ID, "query": "-광고"},
+            headers={"X-API-Key": TEST_API_KEY}
+        )
+        
+        assert response.status_code == 422
+        assert "negated" in response.json()["detail"]
 
 
 class TestGetItemEndpoint:
@@ -314,3 +1269,89 @@ class TestUnsyncedItemsEndpoint:
         assert data[0]["is_synced"] is False
 
 
+
+
+class TestOCRLifecycle:
+    """Test OCR recovery on startup and drain on shutdown"""
+    
+    def test_pending_items_recovered_on_startup(self, test_repository, test_ocr_service):
+        """Should finish OCR for items a previous instance left PENDING"""
+        item = GalmuriItem(
+            user_id=UUID(TEST_USER_ID),
+            image_data=create_test_image(),
+            page_title="Left Behind"
+        )
+        asyncio.run(test_repository.save(item))
+        
+        app.dependency_overrides[get_repository] = lambda: test_repository
+        app.dependency_overrides[get_ocr_service] = lambda: test_ocr_service
+        try:
+            with TestClient(app) as c:
+                for _ in range(50):
+                    data = c.get(
+                        f"/api/item/{item.id}",
+                        headers={"X-API-Key": TEST_API_KEY}
+                    ).json()
+                    if data["ocr_status"] == "DONE":
+                        break
+                    time.sleep(0.02)
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert data["ocr_status"] == "DONE"
+        assert data["ocr_text"] == "테스트 OCR 텍스트"
+    
+    def test_shutdown_report(self, test_repository, test_ocr_service):
+        """Should report drained and deferred OCR jobs and leave nothing PENDING"""
+        app.dependency_overrides[get_repository] = lambda: test_repository
+        app.dependency_overrides[get_ocr_service] = lambda: test_ocr_service
+        try:
+            with TestClient(app) as c:
+                item_id = c.post(
+                    "/api/capture",
+                    json={
+                        "user_id": TEST_USER_ID,
+                        "image_data": create_test_image(),
+                        "page_title": "Drained Item",
+                        "platform": "WEB_EXTENSION"
+                    },
+                    headers={"X-API-Key": TEST_API_KEY}
+                ).json()["id"]
+        finally:
+            app.dependency_overrides.clear()
+        
+        report = app.state.ocr_shutdown_report
+        assert report["deferred"] == 0
+        assert report["deferred_item_ids"] == []
+        
+        item = asyncio.run(test_repository.find_by_id(UUID(item_id)))
+        assert item.ocr_status.value == "DONE"
+    
+    def test_deferred_verification_keeps_client_ocr(self, test_repository, monkeypatch):
+        """Should not reset an accepted client result when its spot check is cut off"""
+        import backend.presentation.main as main
+        scheduler = main.FairOCRScheduler(workers=1)
+        monkeypatch.setattr(main, "ocr_scheduler", scheduler)
+        item = GalmuriItem(user_id=UUID(TEST_USER_ID), image_data=create_test_image())
+        item.mark_ocr_completed("client text", "mlkit", "16.0")
+        asyncio.run(test_repository.save(item))
+        
+        async def never_finishes():
+            await asyncio.sleep(60)
+        
+        async def shutdown():
+            main.submit_ocr_job(item, main.OCRPriority.BACKFILL, never_finishes, verification=True)
+            await asyncio.sleep(0.01)
+            return await main.drain_ocr(timeout=0)
+        
+        app.dependency_overrides[get_repository] = lambda: test_repository
+        try:
+            report = asyncio.run(shutdown())
+        finally:
+            app.dependency_overrides.clear()
+        
+        assert report["deferred"] == 0
+        assert report["verifications_dropped"] == 1
+        saved = asyncio.run(test_repository.find_by_id(item.id))
+        assert saved.ocr_status.value == "DONE"
+        assert saved.ocr_text == "client text"
@@ -0,0 +1,97 @@
+"""
+Tests for search autocomplete
+"""
+import pytest
+import unicodedata
+from uuid import uuid4
+
+from backend.application.autocomplete import AutocompleteIndex, item_terms
+from backend.domain.entities import GalmuriItem
+
+
+class StubRepository:
+    """Serves a fixed list of items"""
+
+    def __init__(self, items):
+        self.items = items
+
+    async def find_search_texts(self, user_id):
+        return [item for item in self.items if item.user_id == user_id]
+
+
+def texts(suggestions):
+    return [text for text, _ in suggestions]
+
+
+class TestItemTerms:
+    """Test term extraction"""
+
+    def test_terms(self):
+        """Should take words of title, memo and OCR text, skipping numbers and single letters"""
+        item = GalmuriItem(page_title="배달의민족 주문", memo_content="Lunch a 2024", ocr_text="총 12,000원")
+
+        terms = {unicodedata.normalize("NFC", term) for term in item_terms(item)}
+
+        assert terms == {"배달의민족", "주문", "lunch", "총", "000원"}
+
+
+class TestAutocompleteIndex:
+    """Test completions"""
+
+    @pytest.mark.asyncio
+    async def test_mid_syllable_prefix(self):
+        """Should complete a prefix whose last syllable is still being typed"""
+        user_id = uuid4()
+        repository = StubRepository([GalmuriItem(user_id=user_id, page_title="배달의민족 주문 내역")])
+        index = AutocompleteIndex()
+
+        # "배다" is what a Korean keyboard shows on the way to "배달"
+        assert texts(await index.complete(user_id, "배다", repository)) == ["배달의민족"]
+        assert texts(await index.complete(user_id, "배달의", repository)) == ["배달의민족"]
+        assert await index.complete(user_id, "배송", repository) == []
+
+    @pytest.mark.asyncio
+    async def test_most_common_first(self):
+        """Should rank terms by the number of items containing them"""
+        user_id = uuid4()
+        repository = StubRepository([
+            GalmuriItem(user_id=user_id, page_title="Receipt", ocr_text="receipt total"),
+            GalmuriItem(user_id=user_id, page_title="Recipe", memo_content="receipt"),
+            GalmuriItem(user_id=user_id, page_title="Recent photos"),
+            GalmuriItem(user_id=uuid4(), page_title="recipe recipe recipe"),
+        ])
+        index = AutocompleteIndex()
+
+        suggestions = await index.complete(user_id, "Rec", repository)
+
+        assert suggestions == [("receipt", 2), ("recent", 1), ("recipe", 1)]
+        assert texts(await index.complete(user_id, "rec", repository, limit=1)) == ["receipt"]
+
+    @pytest.mark.asyncio
+    async def test_completes_last_word(self):
+        """Should keep the words before the one being completed"""
+        user_id = uuid4()
+        repository = StubRepository([GalmuriItem(user_id=user_id, page_title="제주도 여행 계획")])
+        index = AutocompleteIndex()
+
+        assert texts(await index.complete(user_id, "부산  여", repository)) == ["부산 여행"]
+        assert await index.complete(user_id, "여행 ", repository) == []
+
+    @pytest.mark.asyncio
+    async def test_incremental_updates(self):
+        """Should follow saves and deletes after the user is loaded"""
+        user_id = uuid4()
+        item = GalmuriItem(user_id=user_id, page_title="영수증")
+        repository = StubRepository([item])
+        index = AutocompleteIndex()
+        assert texts(await index.complete(user_id, "영", repository)) == ["영수증"]
+
+        added = GalmuriItem(user_id=user_id, page_title="영화 예매")
+        index.add(added)
+        assert texts(await index.complete(user_id, "영", repository)) == ["영수증", "영화"]
+
+        item.page_title = "카페 영수증"
+        index.add(item)
+        index.remove(added.id)
+        assert await index.complete(user_id, "영", repository) == [("영수증", 1)]
+        assert texts(await index.complete(user_id, "카", repository)) == ["카페"]
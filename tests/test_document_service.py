@@ -0,0 +1,99 @@
+"""
+Tests for multi-page document OCR
+"""
+import base64
+import pytest
+from io import BytesIO
+from PIL import Image
+
+from backend.application.document_service import (
+    PDF, TIFF, DocumentError, DocumentOCRService, count_pages, render_page, sniff_document_kind
+)
+from backend.application.ocr_service import IOCRService
+
+
+class PageWidthOCRService(IOCRService):
+    """Fake OCR engine that 'reads' the page width"""
+    
+    async def extract_text(self, image_data: str) -> str:
+        return ""
+    
+    async def extract_text_from_image(self, image) -> str:
+        return f"page {image.width}"
+
+
+def make_pages(count: int) -> list:
+    """Create pages of distinct widths"""
+    return [Image.new('RGB', (100 + index, 50), color='white') for index in range(count)]
+
+
+def make_document(count: int, fmt: str) -> bytes:
+    """Save pages as a multi-page document"""
+    pages = make_pages(count)
+    buffer = BytesIO()
+    pages[0].save(buffer, format=fmt, save_all=True, append_images=pages[1:])
+    return buffer.getvalue()
+
+
+class TestDocumentDetection:
+    """Test document sniffing"""
+    
+    def test_sniff_pdf_and_tiff(self):
+        """Should detect PDF and TIFF from the leading bytes"""
+        pdf = base64.b64encode(make_document(2, "PDF")).decode()
+        tiff = base64.b64encode(make_document(2, "TIFF")).decode()
+        
+        assert sniff_document_kind(pdf) == PDF
+        assert sniff_document_kind(f"data:image/tiff;base64,{tiff}") == TIFF
+    
+    def test_sniff_plain_image(self):
+        """Should not treat a PNG as a document"""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, format="PNG")
+        
+        assert sniff_document_kind(base64.b64encode(buffer.getvalue()).decode()) is None
+
+
+class TestPageRendering:
+    """Test lazy page access"""
+    
+    def test_tiff_pages(self):
+        """Should count and render individual TIFF frames"""
+        document = make_document(3, "TIFF")
+        
+        assert count_pages(document, TIFF) == 3
+        assert render_page(document, TIFF, 2).width == 102
+    
+    def test_pdf_pages(self):
+        """Should count and rasterize individual PDF pages"""
+        pytest.importorskip("pypdfium2")
+        document = make_document(2, "PDF")
+        
+        assert count_pages(document, PDF) == 2
+        assert render_page(document, PDF, 1, dpi=72).width > 0
+
+
+class TestDocumentOCRService:
+    """Test page-parallel OCR"""
+    
+    @pytest.mark.asyncio
+    async def test_pages_in_order(self):
+        """Should return text per page in page order"""
+        service = DocumentOCRService(PageWidthOCRService(), max_parallel_pages=2)
+        finished = []
+        
+        async def on_page(index, text):
+            finished.append(index)
+        
+        pages = await service.extract_pages(make_document(4, "TIFF"), TIFF, on_page=on_page)
+        
+        assert pages == ["page 100", "page 101", "page 102", "page 103"]
+        assert sorted(finished) == [0, 1, 2, 3]
+    
+    @pytest.mark.asyncio
+    async def test_page_limit(self):
+        """Should reject documents over the page limit"""
+        service = DocumentOCRService(PageWidthOCRService(), max_pages=2)
+        
+        with pytest.raises(DocumentError):
+            await service.extract_pages(make_document(3, "TIFF"), TIFF)
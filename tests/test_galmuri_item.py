@@ -67,6 +67,26 @@ class TestGalmuriItemOCROperations:
         
         assert item.ocr_status == OCRStatus.FAILED
         assert item.updated_at >= initial_updated_at
+    
+    def test_mark_ocr_pages_completed(self):
+        """Should keep per-page text and find pages by query"""
+        item = GalmuriItem()
+        
+        item.mark_ocr_pages_completed(["표지", "청구서 합계 12,000원", "Total 12,000"])
+        
+        assert item.ocr_status == OCRStatus.DONE
+        assert item.get_ocr_pages()[1] == "청구서 합계 12,000원"
+        assert item.find_pages("12,000") == [2, 3]
+        assert item.find_pages("total") == [3]
+    
+    def test_find_pages_normalizes_text(self):
+        """Should match pages the way search does: width, case folding and whitespace"""
+        item = GalmuriItem()
+        
+        item.mark_ocr_pages_completed(["ＡＢＣ  Mart", "Straße\n합계"])
+        
+        assert item.find_pages("abc mart") == [1]
+        assert item.find_pages("STRASSE 합계") == [2]
 
 
 class TestGalmuriItemSyncOperations:
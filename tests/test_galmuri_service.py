@@ -3,11 +3,15 @@ Tests for Galmuri Service (Application Layer)
 Following TDD principles - Test First
 """
 import pytest
+from collections import Counter
+from dataclasses import replace
 from uuid import UUID, uuid4
-from backend.domain.entities import GalmuriItem, OCRStatus, Platform
+from backend.domain.entities import BLOB_REFERENCE_PREFIX, GalmuriItem, OCRStatus, Platform
 from backend.domain.repositories import IGalmuriRepository
+from backend.domain.search import FacetCounts, SearchPage, SearchQuery, facet_counts, url_hash, url_host
 from backend.application.ocr_service import MockOCRService
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Tuple
 
 
 class MockGalmuriRepository(IGalmuriRepository):
@@ -35,12 +39,99 @@ class MockGalmuriRepository(IGalmuriRepository):
                     results.append(item)
         return results
     
+    async def find_by_query(self, user_id: UUID, query: SearchQuery) -> List[GalmuriItem]:
+        return [item for item in self.items.values() if item.user_id == user_id and query.matches(item)]
+    
+    async def search_page(self, user_id: UUID, query: SearchQuery, limit: int, deadline=None, offset=0) -> SearchPage:
+        items = sorted(await self.find_by_query(user_id, query), key=lambda item: item.created_at, reverse=True)
+        return SearchPage(items=items[offset:offset + limit], has_more=len(items) > offset + limit)
+    
+    async def count_facets(self, user_id: UUID, query: SearchQuery, facets: List[str], deadline=None) -> FacetCounts:
+        return FacetCounts(counts=facet_counts(await self.find_by_query(user_id, query), facets))
+    
+    async def find_by_host(self, user_id: UUID, host: str, limit: int = 50) -> List[GalmuriItem]:
+        items = [
+            item for item in self.items.values()
+            if item.user_id == user_id and host and url_host(item.source_url) == url_host(host)
+        ]
+        return sorted(items, key=lambda item: item.created_at, reverse=True)[:limit]
+    
+    async def find_by_url(self, user_id: UUID, url: str, limit: int = 50) -> List[GalmuriItem]:
+        items = [
+            item for item in self.items.values()
+            if item.user_id == user_id and url_hash(url) and url_hash(item.source_url) == url_hash(url)
+        ]
+        return sorted(items, key=lambda item: item.created_at, reverse=True)[:limit]
+    
+    async def count_by_host(self, user_id: UUID) -> List[Tuple[str, int]]:
+        counts = Counter(url_host(item.source_url) for item in self.items.values() if item.user_id == user_id)
+        counts.pop("", None)
+        return sorted(counts.items(), key=lambda entry: (-entry[1], entry[0]))
+    
+    async def backfill_search_documents(self, batch_size: int = 500) -> int:
+        return 0
+    
     async def find_unsynced(self, user_id: UUID) -> List[GalmuriItem]:
         return [
             item for item in self.items.values()
             if item.user_id == user_id and not item.is_synced
         ]
     
+    async def find_by_ocr_status(self, status: OCRStatus, limit: int = 1000) -> List[GalmuriItem]:
+        return [item for item in self.items.values() if item.ocr_status == status][:limit]
+    
+    async def find_by_content_hash(self, user_id: UUID, content_hash: str) -> Optional[GalmuriItem]:
+        matches = [
+            item for item in self.items.values()
+            if item.user_id == user_id and item.content_hash == content_hash
+        ]
+        return min(matches, key=lambda item: item.created_at) if matches else None
+    
+    async def find_perceptual_hashes(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return [
+            (item.id, item.perceptual_hash) for item in self.items.values()
+            if item.user_id == user_id and item.perceptual_hash
+        ]
+    
+    async def find_text_signatures(self, user_id: UUID) -> List[Tuple[UUID, str]]:
+        return [
+            (item.id, item.text_minhash) for item in self.items.values()
+            if item.user_id == user_id and item.text_minhash
+        ]
+    
+    async def find_search_texts(self, user_id: UUID) -> List[GalmuriItem]:
+        return [
+            replace(item, image_data="", content_hash="", perceptual_hash="", text_minhash="")
+            for item in self.items.values() if item.user_id == user_id
+        ]
+    
+    async def find_watermark(self, user_id: UUID) -> Tuple[int, Optional[datetime]]:
+        items = [item for item in self.items.values() if item.user_id == user_id]
+        return len(items), max((item.updated_at for item in items), default=None)
+    
+    async def find_by_ids(self, item_ids: List[UUID]) -> List[GalmuriItem]:
+        return [self.items[item_id] for item_id in item_ids if item_id in self.items]
+    
+    async def find_inline_images(
+        self,
+        created_before: datetime,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[GalmuriItem]:
+        items = sorted(
+            (
+                item for item in self.items.values()
+                if item.created_at < created_before and not item.image_data.startswith(BLOB_REFERENCE_PREFIX)
+            ),
+            key=lambda item: (item.created_at, str(item.id))
+        )
+        if after is not None:
+            items = [item for item in items if (item.created_at, str(item.id)) > (after[0], str(after[1]))]
+        return items[:limit]
+    
+    async def is_image_referenced(self, image_data: str) -> bool:
+        return any(item.image_data == image_data for item in self.items.values())
+    
     async def delete(self, item_id: UUID) -> bool:
         if item_id in self.items:
             del self.items[item_id]
@@ -0,0 +1,207 @@
+"""
+Tests for the decode-once ingest pipeline
+"""
+import base64
+import hashlib
+import pytest
+from io import BytesIO
+from PIL import Image, ImageChops, ImageDraw
+from PIL.PngImagePlugin import PngInfo
+
+from backend.application.ingest import (
+    IngestPipeline, ImageDecodeError, ImageTooLargeError, decode_image, default_stages, dhash,
+    make_transcode_stage, spool_base64
+)
+
+
+def encode(image: Image.Image, fmt: str = "PNG") -> str:
+    """Encode an image as base64"""
+    buffer = BytesIO()
+    image.save(buffer, format=fmt)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def text_image() -> Image.Image:
+    """White image with lines of dark text"""
+    image = Image.new('RGB', (400, 200), color='white')
+    draw = ImageDraw.Draw(image)
+    for row in range(8):
+        draw.text((10, 10 + row * 22), "Galmuri Diary 0123456789 OCR TEXT", fill='black')
+    return image
+
+
+class TestDecode:
+    """Test decoding"""
+    
+    def test_decode_data_url(self):
+        """Should decode data URLs and keep the original bytes"""
+        data = encode(Image.new('RGB', (20, 10)))
+        
+        decoded = decode_image(f"data:image/png;base64,{data}")
+        
+        assert decoded.image.size == (20, 10)
+        assert decoded.mime_type == "image/png"
+        assert decoded.data == base64.b64decode(data)
+    
+    def test_decode_invalid(self):
+        """Should raise a decode error for non-images"""
+        with pytest.raises(ImageDecodeError):
+            decode_image("bm90IGFuIGltYWdl")
+    
+    def test_spool_base64_chunks(self, monkeypatch):
+        """Should decode wrapped base64 across chunk boundaries and hash it"""
+        import backend.application.ingest as ingest
+        monkeypatch.setattr(ingest, "BASE64_CHUNK_CHARS", 16)
+        raw = bytes(range(256)) * 3
+        wrapped = base64.encodebytes(raw).decode()  # Line breaks every 76 characters
+        
+        spool, digest, size = spool_base64("data:application/octet-stream;base64," + wrapped, max_memory=64)
+        
+        assert spool.read() == raw
+        assert size == len(raw)
+        assert digest == hashlib.sha256(raw).hexdigest()
+    
+    def test_spool_base64_truncated(self):
+        """Should reject base64 that does not end on a full quantum"""
+        with pytest.raises(ImageDecodeError):
+            spool_base64("QUJD" + "QQ")
+
+
+class TestPixelBudget:
+    """Test decode limits"""
+    
+    def test_downsamples_png_over_budget(self):
+        """Should reduce a large PNG to the budget and report the original size"""
+        data = encode(Image.new('RGB', (1200, 800), color='white'))
+        
+        decoded = decode_image(data, pixel_budget=100_000)
+        
+        assert decoded.downsampled is True
+        assert decoded.dimensions == (1200, 800)
+        assert decoded.image.size[0] * decoded.image.size[1] <= 100_000
+        assert decoded.format == "PNG"
+        assert decoded.data == base64.b64decode(data)
+    
+    def test_jpeg_draft_decode(self):
+        """Should decode a large JPEG at a reduced scale"""
+        data = encode(Image.new('RGB', (1600, 1600), color='gray'), "JPEG")
+        
+        decoded = decode_image(data, pixel_budget=200_000)
+        
+        assert decoded.downsampled is True
+        assert decoded.image.size[0] * decoded.image.size[1] <= 200_000
+    
+    def test_rejects_from_header(self):
+        """Should reject images over max_pixels without decoding them"""
+        data = encode(Image.new('RGB', (1000, 1000)))
+        
+        with pytest.raises(ImageTooLargeError):
+            decode_image(data, max_pixels=500_000)
+    
+    def test_pipeline_keeps_full_resolution_upload(self):
+        """Should run stages on the reduced copy but store the original bytes"""
+        data = encode(text_image().resize((1600, 800)))
+        pipeline = IngestPipeline(stages=default_stages(transcode="lossless"), pixel_budget=200_000)
+        
+        result = pipeline.run_sync(data)
+        
+        assert result.downsampled is True
+        assert (result.width, result.height) == (1600, 800)
+        assert result.ocr_image.size[0] * result.ocr_image.size[1] <= 200_000
+        assert result.transcoded is False
+        assert result.stored_data == base64.b64decode(data)
+
+
+class TestPerceptualHash:
+    """Test dHash"""
+    
+    def test_similar_images_hash_close(self):
+        """Should give near-identical images nearby hashes"""
+        original = text_image()
+        shifted = Image.new('RGB', (400, 200), color='white')
+        shifted.paste(original.crop((0, 0, 398, 200)), (2, 0))
+        
+        distance = bin(int(dhash(original), 16) ^ int(dhash(shifted), 16)).count("1")
+        
+        assert len(dhash(original)) == 16
+        assert distance <= 10
+
+
+class TestIngestPipeline:
+    """Test the full pipeline"""
+    
+    def test_runs_every_stage_once(self):
+        """Should produce hashes, thumbnails, text score and OCR image from one decode"""
+        data = encode(text_image())
+        pipeline = IngestPipeline(stages=default_stages(thumbnail_sizes=(64, 128)))
+        
+        result = pipeline.run_sync(data)
+        
+        assert result.content_hash == hashlib.sha256(base64.b64decode(data)).hexdigest()
+        assert set(result.thumbnails) == {64, 128}
+        assert Image.open(BytesIO(result.thumbnails[64])).format == "WEBP"
+        assert result.ocr_image.mode == "L"
+        assert (result.width, result.height) == (400, 200)
+        assert set(result.timings) == {
+            "decode", "content_hash", "perceptual_hash", "thumbnails", "text_presence", "ocr_preprocess"
+        }
+        assert pipeline.stats()["runs"] == 1
+    
+    def test_text_presence(self):
+        """Should tell text from a blank capture"""
+        pipeline = IngestPipeline()
+        
+        assert pipeline.run_sync(encode(text_image())).has_text is True
+        assert pipeline.run_sync(encode(Image.new('RGB', (400, 200), 'white'))).has_text is False
+    
+    @pytest.mark.asyncio
+    async def test_async_run(self):
+        """Should run off the event loop"""
+        result = await IngestPipeline().run(encode(Image.new('RGBA', (30, 30), (0, 0, 0, 0))))
+        
+        assert result.ocr_image.getpixel((0, 0)) == 255
+
+
+class TestTranscode:
+    """Test WebP transcoding for storage"""
+    
+    def test_lossless_screenshot(self):
+        """Should shrink a PNG screenshot without changing a pixel or keeping metadata"""
+        metadata = PngInfo()
+        metadata.add_text("Software", "screenshot tool")
+        buffer = BytesIO()
+        text_image().save(buffer, format="PNG", pnginfo=metadata)
+        pipeline = IngestPipeline(stages=[("transcode", make_transcode_stage(lossless=True))])
+        
+        result = pipeline.run_sync(base64.b64encode(buffer.getvalue()).decode())
+        stored = Image.open(BytesIO(result.stored_data))
+        
+        assert result.transcoded is True
+        assert result.mime_type == "image/webp"
+        assert len(result.stored_data) < result.original_size
+        assert ImageChops.difference(stored.convert('RGB'), text_image()).getbbox() is None
+        assert "Software" not in stored.info
+        assert pipeline.stats()["bytes_stored"] == len(result.stored_data)
+    
+    def test_keeps_original_when_not_smaller(self):
+        """Should keep uploads that WebP cannot improve"""
+        data = encode(text_image(), "WEBP")
+        pipeline = IngestPipeline(stages=default_stages(transcode="lossless"))
+        
+        result = pipeline.run_sync(data)
+        
+        assert result.transcoded is False
+        assert result.stored_data == base64.b64decode(data)
+        assert "transcode" in result.timings
+    
+    def test_lossy_quality(self):
+        """Should transcode with the configured lossy quality"""
+        photo = Image.radial_gradient('L').convert('RGB').resize((400, 200))
+        photo.paste(text_image().crop((0, 0, 200, 100)), (100, 50))
+        data = encode(photo)
+        
+        low = IngestPipeline(stages=default_stages(transcode="lossy", transcode_quality=30)).run_sync(data)
+        high = IngestPipeline(stages=default_stages(transcode="lossy", transcode_quality=95)).run_sync(data)
+        
+        assert low.transcoded is True
+        assert len(low.stored_data) < len(high.stored_data)
@@ -5,8 +5,14 @@ Following TDD principles
 import pytest
 import os
 import asyncio
+import sqlite3
+import time
+import unicodedata
 from uuid import uuid4
+from datetime import datetime
 from backend.domain.entities import GalmuriItem, Platform
+from backend.application.query_parser import parse_query
+from backend.infrastructure import local_repository
 from backend.infrastructure.local_repository import LocalGalmuriRepository
 
 
@@ -100,6 +106,18 @@ class TestLocalRepositoryFind:
         
         assert len(items) == 2
         assert all(item.user_id == user_id for item in items)
+    
+    @pytest.mark.asyncio
+    async def test_find_search_texts(self, repository, sample_item):
+        """Should load text fields without the image"""
+        await repository.save(sample_item)
+        
+        items = await repository.find_search_texts(sample_item.user_id)
+        
+        assert [item.id for item in items] == [sample_item.id]
+        assert items[0].page_title == sample_item.page_title
+        assert items[0].created_at == sample_item.created_at
+        assert items[0].image_data == ""
 
 
 class TestLocalRepositorySearch:
@@ -165,6 +183,227 @@ class TestLocalRepositorySearch:
         results = await repository.search(user_id, "존재하지않는검색어")
         
         assert len(results) == 0
+    
+    @pytest.mark.asyncio
+    async def test_search_normalized_text(self, repository):
+        """Should match regardless of case, width, spacing and Hangul decomposition"""
+        user_id = uuid4()
+        
+        item = GalmuriItem(
+            user_id=user_id,
+            page_title=unicodedata.normalize("NFD", "갈무리 다이어리"),
+            memo_content="ＡＢＣ  Mart\n영수증"
+        )
+        await repository.save(item)
+        
+        for query in ("무리 다이", "abc mart", "Abc Mart 영수증", unicodedata.normalize("NFD", "다이어리")):
+            assert [found.id for found in await repository.search(user_id, query)] == [item.id], query
+        # Fields are matched separately
+        assert await repository.search(user_id, "다이어리 abc") == []
+    
+    @pytest.mark.asyncio
+    async def test_backfill_search_documents(self, repository, test_db_path):
+        """Should make rows saved without a search document searchable"""
+        user_id = uuid4()
+        item = GalmuriItem(user_id=user_id, page_title="Old Receipt")
+        await repository.save(item)
+        conn = sqlite3.connect(test_db_path)
+        conn.execute("UPDATE galmuri_items SET search_document = NULL")
+        conn.commit()
+        conn.close()
+        assert await repository.search(user_id, "receipt") == []
+        
+        assert await repository.backfill_search_documents(batch_size=1) == 1
+        assert await repository.backfill_search_documents() == 0
+        assert [found.id for found in await repository.search(user_id, "receipt")] == [item.id]
+    
+    @pytest.mark.asyncio
+    async def test_backfill_hosts(self, repository, test_db_path):
+        """Should make rows saved without a host or URL hash listable by site and page"""
+        user_id = uuid4()
+        item = GalmuriItem(user_id=user_id, page_title="Old", source_url="https://www.example.com/a/")
+        await repository.save(item)
+        conn = sqlite3.connect(test_db_path)
+        conn.execute("UPDATE galmuri_items SET host = NULL, url_hash = NULL")
+        conn.commit()
+        conn.close()
+        assert await repository.count_by_host(user_id) == []
+        
+        assert await repository.backfill_search_documents() == 1
+        assert await repository.count_by_host(user_id) == [("example.com", 1)]
+        assert [found.id for found in await repository.find_by_url(user_id, "example.com/a")] == [item.id]
+
+
+class TestLocalRepositoryQuery:
+    """Test structured queries"""
+    
+    @pytest.mark.asyncio
+    async def test_find_by_query(self, repository):
+        """Should combine field, platform, date and negated filters"""
+        user_id = uuid4()
+        receipt = GalmuriItem(
+            user_id=user_id, page_title="쿠팡 영수증", source_url="https://www.coupang.com/order/1",
+            platform=Platform.MOBILE_APP, created_at=datetime(2024, 3, 5)
+        )
+        ad = GalmuriItem(
+            user_id=user_id, page_title="쿠팡 광고", source_url="https://ads.coupang.com/x",
+            platform=Platform.MOBILE_APP, created_at=datetime(2024, 3, 6)
+        )
+        other = GalmuriItem(
+            user_id=user_id, page_title="쿠팡 영수증", source_url="https://notcoupang.com/",
+            created_at=datetime(2024, 4, 1)
+        )
+        for item in (receipt, ad, other):
+            await repository.save(item)
+        
+        found = await repository.find_by_query(user_id, parse_query("쿠팡 -광고 site:coupang.com date:2024-03"))
+        mobile = await repository.find_by_query(user_id, parse_query("platform:mobile title:쿠팡"))
+        escaped = await repository.find_by_query(user_id, parse_query("title:100%"))
+        
+        assert [item.id for item in found] == [receipt.id]
+        assert [item.id for item in mobile] == [ad.id, receipt.id]
+        assert escaped == []
+
+
+class TestLocalRepositorySearchPage:
+    """Test bounded searches"""
+    
+    @pytest.mark.asyncio
+    async def test_newest_matches_up_to_limit(self, repository):
+        """Should return the newest matches first and stop at the limit"""
+        user_id = uuid4()
+        for day in range(1, 6):
+            await repository.save(GalmuriItem(user_id=user_id, page_title=f"영수증 {day}", created_at=datetime(2024, 3, day)))
+        await repository.save(GalmuriItem(user_id=user_id, page_title="광고", created_at=datetime(2024, 3, 9)))
+        
+        page = await repository.search_page(user_id, parse_query("영수증"), limit=2)
+        
+        assert [item.page_title for item in page.items] == ["영수증 5", "영수증 4"]
+        assert page.truncated is False
+        assert page.has_more is True
+    
+    @pytest.mark.asyncio
+    async def test_offset_pages(self, repository):
+        """Should skip offset matches and report whether more follow the page"""
+        user_id = uuid4()
+        for day in range(1, 6):
+            await repository.save(GalmuriItem(user_id=user_id, page_title=f"영수증 {day}", created_at=datetime(2024, 3, day)))
+        
+        middle = await repository.search_page(user_id, parse_query("영수증"), limit=2, offset=2)
+        last = await repository.search_page(user_id, parse_query("영수증"), limit=2, offset=4)
+        
+        assert [item.page_title for item in middle.items] == ["영수증 3", "영수증 2"]
+        assert middle.has_more is True
+        assert [item.page_title for item in last.items] == ["영수증 1"]
+        assert last.has_more is False
+    
+    @pytest.mark.asyncio
+    async def test_deadline_truncates(self, repository, monkeypatch):
+        """Should return the matches found so far once the deadline has passed"""
+        monkeypatch.setattr(local_repository, "DEADLINE_CHECK_STEPS", 1)
+        user_id = uuid4()
+        for day in range(1, 4):
+            await repository.save(GalmuriItem(user_id=user_id, page_title="영수증", created_at=datetime(2024, 3, day)))
+        
+        page = await repository.search_page(user_id, parse_query("영수증"), limit=10, deadline=time.monotonic() - 1)
+        
+        assert page.truncated is True
+        assert page.items == []
+
+
+class TestLocalRepositorySites:
+    """Test grouping by site and page"""
+    
+    @pytest.mark.asyncio
+    async def test_find_by_host_and_url(self, repository):
+        """Should list a site's or page's items newest first, ignoring URL spelling"""
+        user_id = uuid4()
+        urls = [
+            "https://www.coupang.com/order/1",
+            "http://coupang.com/order/1/#receipt",
+            "https://COUPANG.com:443/order/1?tab=2",
+            "https://ads.coupang.com/order/1",
+        ]
+        items = [
+            GalmuriItem(user_id=user_id, page_title="주문", source_url=url, created_at=datetime(2024, 3, day))
+            for day, url in enumerate(urls, start=1)
+        ]
+        for item in items:
+            await repository.save(item)
+        await repository.save(GalmuriItem(user_id=uuid4(), source_url=urls[0]))
+        
+        site = await repository.find_by_host(user_id, "Coupang.com")
+        page = await repository.find_by_url(user_id, "coupang.com/order/1")
+        
+        assert [item.id for item in site] == [items[2].id, items[1].id, items[0].id]
+        assert [item.id for item in page] == [items[1].id, items[0].id]
+        assert [item.id for item in await repository.find_by_host(user_id, "coupang.com", limit=1)] == [items[2].id]
+        assert await repository.find_by_url(user_id, "") == []
+    
+    @pytest.mark.asyncio
+    async def test_count_by_host(self, repository):
+        """Should count items per host, most first, skipping items without a URL"""
+        user_id = uuid4()
+        for url in ("https://a.com/1", "https://b.com/1", "https://www.b.com/2", None):
+            await repository.save(GalmuriItem(user_id=user_id, source_url=url))
+        
+        assert await repository.count_by_host(user_id) == [("b.com", 2), ("a.com", 1)]
+    
+    @pytest.mark.asyncio
+    async def test_site_filter_uses_host(self, repository):
+        """Should match site: and -site: on the host, including subdomains"""
+        user_id = uuid4()
+        shop = GalmuriItem(user_id=user_id, page_title="영수증", source_url="https://m.shop.com/x")
+        other = GalmuriItem(user_id=user_id, page_title="영수증", source_url="https://notshop.com/shop.com")
+        for item in (shop, other):
+            await repository.save(item)
+        
+        found = await repository.find_by_query(user_id, parse_query("site:shop.com"))
+        excluded = await repository.find_by_query(user_id, parse_query("영수증 -site:shop.com"))
+        
+        assert [item.id for item in found] == [shop.id]
+        assert [item.id for item in excluded] == [other.id]
+
+
+class TestLocalRepositoryFacets:
+    """Test facet counts over full search results"""
+    
+    @pytest.mark.asyncio
+    async def test_count_facets(self, repository):
+        """Should count every match, grouping in SQL or confirming filters SQL can't decide"""
+        user_id = uuid4()
+        items = [
+            GalmuriItem(user_id=user_id, page_title="쿠팡 영수증", source_url="https://coupang.com/1", created_at=datetime(2024, 3, 5)),
+            GalmuriItem(user_id=user_id, page_title="영수증", memo_content="쿠팡", created_at=datetime(2024, 4, 1)),
+            GalmuriItem(user_id=user_id, page_title="쿠팡 광고", platform=Platform.MOBILE_APP, created_at=datetime(2024, 4, 2)),
+            GalmuriItem(user_id=uuid4(), page_title="쿠팡"),
+        ]
+        for item in items:
+            await repository.save(item)
+        
+        grouped = await repository.count_facets(user_id, parse_query("쿠팡"), ["site", "month", "platform"])
+        confirmed = await repository.count_facets(user_id, parse_query("title:쿠팡 -title:광고"), ["month"])
+        
+        assert grouped.counts == {
+            "site": {"": 2, "coupang.com": 1},
+            "month": {"2024-04": 2, "2024-03": 1},
+            "platform": {"WEB_EXTENSION": 2, "MOBILE_APP": 1},
+        }
+        assert confirmed.counts == {"month": {"2024-03": 1}}
+        assert not grouped.truncated and not confirmed.truncated
+    
+    @pytest.mark.asyncio
+    async def test_count_facets_deadline(self, repository, monkeypatch):
+        """Should stop counting at the deadline, confirmed filters included"""
+        monkeypatch.setattr(local_repository, "DEADLINE_CHECK_STEPS", 1)
+        user_id = uuid4()
+        await repository.save(GalmuriItem(user_id=user_id, page_title="쿠팡 영수증"))
+        
+        grouped = await repository.count_facets(user_id, parse_query("쿠팡"), ["site"], deadline=time.monotonic() - 1)
+        confirmed = await repository.count_facets(user_id, parse_query("title:쿠팡"), ["site"], deadline=time.monotonic() - 1)
+        
+        assert grouped.truncated is True and grouped.counts == {"site": {}}
+        assert confirmed.truncated is True and confirmed.counts == {"site": {}}
 
 
 class TestLocalRepositorySync:
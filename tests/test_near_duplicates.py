@@ -0,0 +1,68 @@
+"""
+Tests for the near-duplicate index
+"""
+import random
+import pytest
+from uuid import uuid4
+
+from backend.application.near_duplicates import MultiIndexHashTable, NearDuplicateIndex, hamming
+
+
+class TestMultiIndexHashTable:
+    """Test Hamming radius queries"""
+    
+    def test_matches_linear_scan(self):
+        """Should find exactly the hashes a full scan finds"""
+        rng = random.Random(7)
+        table = MultiIndexHashTable()
+        base = rng.getrandbits(64)
+        hashes = {}
+        for _ in range(500):
+            # Mostly far away, some within a few bits of base
+            value = base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(12)))
+            item_id = uuid4()
+            hashes[item_id] = value
+            table.add(item_id, value)
+        
+        for radius in (0, 3, 6, 9):
+            expected = {item_id for item_id, value in hashes.items() if hamming(value, base) <= radius}
+            assert {item_id for _, item_id in table.query(base, radius)} == expected
+    
+    def test_remove_and_move(self):
+        """Should forget removed items and re-index items whose hash changed"""
+        table = MultiIndexHashTable()
+        first, second = uuid4(), uuid4()
+        table.add(first, 0xFF)
+        table.add(second, 0xFF)
+        
+        table.remove(first)
+        table.add(second, 0xFF00)
+        
+        assert table.query(0xFF, 0) == []
+        assert table.query(0xFF00, 0) == [(0, second)]
+        assert len(table) == 1
+
+
+class TestNearDuplicateIndex:
+    """Test per-user grouping"""
+    
+    @pytest.mark.asyncio
+    async def test_groups_are_transitive_and_per_user(self):
+        """Should chain close hashes into one group and keep users apart"""
+        user_id, other_user = uuid4(), uuid4()
+        a, b, c, far, foreign = uuid4(), uuid4(), uuid4(), uuid4(), uuid4()
+        
+        class Repository:
+            async def find_perceptual_hashes(self, requested):
+                rows = {
+                    user_id: [(a, "0000000000000000"), (b, "000000000000001f"), (c, "00000000000003ff"),
+                              (far, "ffffffffffffffff")],
+                    other_user: [(foreign, "0000000000000000")],
+                }
+                return rows[requested]
+        
+        index = NearDuplicateIndex(radius=5)
+        groups = await index.groups(user_id, Repository())
+        
+        assert groups == [sorted([a, b, c], key=str)]
+        assert [item_id for _, item_id in await index.find(user_id, "0000000000000001", Repository())] == [a, b]
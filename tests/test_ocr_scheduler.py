@@ -0,0 +1,185 @@
+"""
+Tests for the fair OCR scheduler
+"""
+import asyncio
+import pytest
+from uuid import uuid4
+from backend.application.ocr_scheduler import FairOCRScheduler, OCRJob, OCRPriority, SchedulerClosedError
+
+
+def make_job(order: list, user_id, label: str, priority=OCRPriority.INTERACTIVE, cost=1.0) -> OCRJob:
+    """Create a job that records its label when it runs"""
+    async def run():
+        order.append(label)
+    return OCRJob(user_id=user_id, item_id=uuid4(), run=run, priority=priority, cost=cost)
+
+
+async def run_until_idle(scheduler: FairOCRScheduler) -> None:
+    """Let the workers drain the queue"""
+    for _ in range(100):
+        await asyncio.sleep(0)
+        if scheduler.queued() == 0:
+            break
+    await asyncio.sleep(0)
+
+
+class TestFairOCRScheduler:
+    """Test scheduling order"""
+    
+    @pytest.mark.asyncio
+    async def test_round_robin_between_users(self):
+        """Should interleave a bulk importer with an interactive user"""
+        scheduler = FairOCRScheduler(workers=1)
+        order = []
+        bulk_user, other_user = uuid4(), uuid4()
+        
+        for index in range(5):
+            scheduler.submit(make_job(order, bulk_user, f"bulk-{index}"))
+        scheduler.submit(make_job(order, other_user, "other-0"))
+        
+        await run_until_idle(scheduler)
+        await scheduler.stop()
+        
+        assert len(order) == 6
+        assert order.index("other-0") <= 2
+    
+    @pytest.mark.asyncio
+    async def test_priority_classes(self):
+        """Should run interactive work before sync and backfill"""
+        scheduler = FairOCRScheduler(workers=1)
+        order = []
+        user_id = uuid4()
+        
+        scheduler.submit(make_job(order, user_id, "backfill", OCRPriority.BACKFILL))
+        scheduler.submit(make_job(order, user_id, "sync", OCRPriority.SYNC))
+        scheduler.submit(make_job(order, user_id, "interactive", OCRPriority.INTERACTIVE))
+        
+        await run_until_idle(scheduler)
+        await scheduler.stop()
+        
+        assert order == ["interactive", "sync", "backfill"]
+    
+    @pytest.mark.asyncio
+    async def test_cost_weighted_share(self):
+        """Should give a user with expensive jobs fewer turns"""
+        scheduler = FairOCRScheduler(workers=1)
+        order = []
+        heavy_user, light_user = uuid4(), uuid4()
+        
+        for index in range(2):
+            scheduler.submit(make_job(order, heavy_user, f"heavy-{index}", cost=3.0))
+        for index in range(3):
+            scheduler.submit(make_job(order, light_user, f"light-{index}"))
+        
+        await run_until_idle(scheduler)
+        await scheduler.stop()
+        
+        assert order.index("light-2") < order.index("heavy-1")
+    
+    @pytest.mark.asyncio
+    async def test_idle_workers(self):
+        """Should count workers that are neither running nor owed a queued job"""
+        scheduler = FairOCRScheduler(workers=2)
+        release = asyncio.Event()
+        
+        async def run():
+            await release.wait()
+        
+        assert scheduler.idle_workers() == 2
+        for _ in range(3):
+            scheduler.submit(OCRJob(user_id=uuid4(), item_id=uuid4(), run=run))
+        await asyncio.sleep(0.01)
+        assert scheduler.in_flight() == 2
+        assert scheduler.idle_workers() == 0
+        
+        release.set()
+        await run_until_idle(scheduler)
+        await asyncio.sleep(0.01)
+        assert scheduler.idle_workers() == 2
+        await scheduler.stop()
+    
+    @pytest.mark.asyncio
+    async def test_is_queued(self):
+        """Should know items with a job waiting or running until it finishes"""
+        scheduler = FairOCRScheduler(workers=1)
+        release = asyncio.Event()
+        running, waiting = uuid4(), uuid4()
+        
+        async def run():
+            await release.wait()
+        
+        for item_id in (running, waiting):
+            scheduler.submit(OCRJob(user_id=uuid4(), item_id=item_id, run=run))
+        await asyncio.sleep(0.01)
+        assert scheduler.is_queued(running) and scheduler.is_queued(waiting)
+        assert not scheduler.is_queued(uuid4())
+        
+        release.set()
+        await run_until_idle(scheduler)
+        await asyncio.sleep(0.01)
+        assert not scheduler.is_queued(running) and not scheduler.is_queued(waiting)
+        await scheduler.stop()
+    
+    @pytest.mark.asyncio
+    async def test_stats_report_queue_wait(self):
+        """Should expose queue-wait percentiles per class"""
+        scheduler = FairOCRScheduler(workers=2)
+        order = []
+        
+        scheduler.submit(make_job(order, uuid4(), "a", OCRPriority.SYNC))
+        await run_until_idle(scheduler)
+        await scheduler.stop()
+        
+        stats = scheduler.stats()
+        assert stats["SYNC"]["completed"] == 1
+        assert stats["SYNC"]["queue_wait_ms"]["samples"] == 1
+        assert stats["BACKFILL"]["queue_wait_ms"]["p50"] is None
+
+
+class TestSchedulerDrain:
+    """Test graceful shutdown"""
+    
+    @pytest.mark.asyncio
+    async def test_drain_finishes_quick_jobs(self):
+        """Should run queued jobs to completion within the deadline"""
+        scheduler = FairOCRScheduler(workers=1)
+        order = []
+        await scheduler.start()
+        
+        for index in range(3):
+            scheduler.submit(make_job(order, uuid4(), f"job-{index}"))
+        report = await scheduler.drain(timeout=1.0)
+        
+        assert report["drained"] == 3
+        assert report["deferred"] == []
+        assert len(order) == 3
+    
+    @pytest.mark.asyncio
+    async def test_drain_defers_slow_jobs(self):
+        """Should cancel jobs past the deadline and report them as deferred"""
+        scheduler = FairOCRScheduler(workers=1)
+        await scheduler.start()
+        
+        async def slow():
+            await asyncio.sleep(10)
+        slow_job = OCRJob(user_id=uuid4(), item_id=uuid4(), run=slow)
+        queued_job = OCRJob(user_id=uuid4(), item_id=uuid4(), run=slow)
+        scheduler.submit(slow_job)
+        scheduler.submit(queued_job)
+        await asyncio.sleep(0)
+        
+        report = await scheduler.drain(timeout=0.1)
+        
+        assert report["drained"] == 0
+        assert {job.item_id for job in report["deferred"]} == {slow_job.item_id, queued_job.item_id}
+        assert scheduler.queued() == 0
+    
+    @pytest.mark.asyncio
+    async def test_submit_after_drain_rejected(self):
+        """Should refuse new work while shutting down"""
+        scheduler = FairOCRScheduler(workers=1)
+        await scheduler.start()
+        await scheduler.drain(timeout=0)
+        
+        with pytest.raises(SchedulerClosedError):
+            scheduler.submit(make_job([], uuid4(), "late"))
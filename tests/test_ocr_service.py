@@ -6,6 +6,8 @@ import pytest
 import base64
 from io import BytesIO
 from backend.application.ocr_service import MockOCRService, TesseractOCRService
+from backend.application.ocr_verifier import ClientOCRVerifier
+from backend.domain.entities import GalmuriItem
 
 
 class TestMockOCRService:
@@ -119,3 +121,46 @@ class TestTesseractOCRService:
         except RuntimeError:
             pytest.skip("Tesseract not installed")
 
+
+
+class TestClientOCRVerifier:
+    """Test sampling verification of client OCR results"""
+    
+    def test_sampling_disabled_by_default(self):
+        """Should never sample with a zero rate"""
+        verifier = ClientOCRVerifier()
+        
+        assert not any(verifier.should_verify() for _ in range(100))
+    
+    def test_similarity_ignores_layout(self):
+        """Should treat whitespace and case differences as identical"""
+        verifier = ClientOCRVerifier()
+        
+        assert verifier.similarity("Hello\n  World", "hello world") == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_mismatch_replaced_by_server_result(self):
+        """Should replace client text that disagrees with the server"""
+        verifier = ClientOCRVerifier(sample_rate=1.0, min_similarity=0.6)
+        item = GalmuriItem()
+        item.mark_ocr_completed("완전히 다른 글자", "mlkit", "16.0")
+        
+        replaced = await verifier.verify(item, "image", MockOCRService(mock_text="server text"))
+        
+        assert replaced is True
+        assert item.ocr_text == "server text"
+        assert item.ocr_engine == "mock"
+        assert verifier.stats()["replaced"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_match_keeps_client_result(self):
+        """Should keep client text that agrees with the server"""
+        verifier = ClientOCRVerifier(sample_rate=1.0)
+        item = GalmuriItem()
+        item.mark_ocr_completed("server  text", "mlkit", "16.0")
+        
+        replaced = await verifier.verify(item, "image", MockOCRService(mock_text="server text"))
+        
+        assert replaced is False
+        assert item.ocr_engine == "mlkit"
+        assert verifier.stats()["mean_similarity"] == 1.0
@@ -0,0 +1,199 @@
+"""
+Tests for the cold pack tier and the image compactor
+"""
+import base64
+import os
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from io import BytesIO
+from uuid import uuid4
+from PIL import Image
+
+from backend.domain.entities import GalmuriItem
+from backend.infrastructure.blob_store import LocalBlobStore
+from backend.infrastructure.local_repository import LocalGalmuriRepository
+from backend.infrastructure.pack_store import RAW, PackStore, TieredBlobStore
+from backend.application.compactor import ImageCompactor
+from backend.application.image_store import ImageStore
+
+
+def png_bytes(color: str = 'white') -> bytes:
+    """Encode a small PNG"""
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), color=color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestPackStore:
+    """Test pack files and the offset index"""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self, tmp_path):
+        """Should compress, append and read back blobs"""
+        store = PackStore(str(tmp_path / "packs"))
+        text = b"galmuri " * 1000
+        noise = os.urandom(4096)
+
+        await store.put("images/a", text)
+        await store.put("images/b", noise)
+
+        assert await store.get("images/a") == text
+        assert await store.get("images/b") == noise
+        assert await store.get("images/missing") is None
+        assert store.stats()["packed_bytes"] < len(text) + len(noise)
+        assert sorted(store.iter_keys("images/")) == ["images/a", "images/b"]
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_incompressible_kept_raw(self, tmp_path):
+        """Should store data that doesn't compress as-is"""
+        store = PackStore(str(tmp_path / "packs"))
+
+        await store.put("noise", os.urandom(1024))
+        codec = store._index.execute("SELECT codec FROM pack_entries").fetchone()[0]
+
+        assert codec == RAW
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_rollover_and_reopen(self, tmp_path):
+        """Should start new packs when full and keep the index across restarts"""
+        store = PackStore(str(tmp_path / "packs"), max_pack_bytes=1024)
+        blobs = {f"k{index}": os.urandom(800) for index in range(4)}
+        for key, data in blobs.items():
+            await store.put(key, data)
+            # Reads between appends must see data written after the map was made
+            assert await store.get(key) == data
+        store.close()
+
+        reopened = PackStore(str(tmp_path / "packs"), max_pack_bytes=1024)
+
+        assert reopened.stats()["packs"] == 2
+        for key, data in blobs.items():
+            assert await reopened.get(key) == data
+        assert await reopened.delete("k0") is True
+        assert await reopened.get("k0") is None
+        reopened.close()
+
+    @pytest.mark.asyncio
+    async def test_writes_off_event_loop(self, tmp_path, monkeypatch):
+        """Should compress and write in a worker thread, not on the event loop"""
+        store = PackStore(str(tmp_path / "packs"))
+        threads = []
+        compress = store._compress
+        monkeypatch.setattr(store, "_compress", lambda data: threads.append(threading.current_thread()) or compress(data))
+
+        await store.put("images/a", b"galmuri " * 100)
+
+        assert threads and threads[0] is not threading.main_thread()
+        assert await store.get("images/a") == b"galmuri " * 100
+        store.close()
+
+
+class TestTieredBlobStore:
+    """Test reads across tiers"""
+
+    @pytest.mark.asyncio
+    async def test_reads_fall_back_to_cold_tier(self, tmp_path):
+        """Should serve a blob under the same key after it moves to the cold tier"""
+        hot = LocalBlobStore(str(tmp_path / "hot"))
+        cold = PackStore(str(tmp_path / "cold"))
+        store = TieredBlobStore(hot, cold)
+        await store.put("images/ab/abc.png", b"image")
+
+        await cold.put("images/ab/abc.png", await hot.get("images/ab/abc.png"))
+        await hot.delete("images/ab/abc.png")
+
+        assert await store.exists("images/ab/abc.png")
+        assert store.local_path("images/ab/abc.png") is None
+        assert await store.get("images/ab/abc.png") == b"image"
+        cold.close()
+
+
+class TestImageCompactor:
+    """Test compaction of old images"""
+
+    @pytest.mark.asyncio
+    async def test_compacts_old_inline_and_hot_images(self, tmp_path):
+        """Should move old images to packs and leave recent ones alone"""
+        repository = LocalGalmuriRepository(":memory:")
+        hot = LocalBlobStore(str(tmp_path / "hot"))
+        cold = PackStore(str(tmp_path / "cold"))
+        image_store = ImageStore(TieredBlobStore(hot, cold))
+
+        old = GalmuriItem(
+            user_id=uuid4(),
+            image_data=base64.b64encode(png_bytes('red')).decode(),
+            created_at=datetime.now() - timedelta(days=40)
+        )
+        recent = GalmuriItem(user_id=uuid4(), image_data=base64.b64encode(png_bytes('blue')).decode())
+        await repository.save(old)
+        await repository.save(recent)
+
+        await hot.put("images/00/old.png", png_bytes('green'))
+        month_ago = time.time() - 40 * 86400
+        os.utime(hot.local_path("images/00/old.png"), (month_ago, month_ago))
+        await hot.put("images/00/new.png", png_bytes('black'))
+
+        report = await ImageCompactor(repository, hot, cold, min_age_days=30).run()
+
+        compacted = await repository.find_by_id(old.id)
+        untouched = await repository.find_by_id(recent.id)
+        assert report["items"] == 1
+        assert report["blobs"] == 1
+        assert compacted.image_data.startswith("blob:images/")
+        assert await image_store.load(compacted) == png_bytes('red')
+        assert untouched.image_data == recent.image_data
+        assert hot.local_path("images/00/old.png") is None
+        assert await cold.get("images/00/old.png") == png_bytes('green')
+        assert hot.local_path("images/00/new.png") is not None
+        cold.close()
+
+    @pytest.mark.asyncio
+    async def test_documents_do_not_use_up_the_limit(self, tmp_path):
+        """Should page past old documents instead of rereading them every batch"""
+        repository = LocalGalmuriRepository(":memory:")
+        cold = PackStore(str(tmp_path / "cold"))
+        month_ago = datetime.now() - timedelta(days=40)
+        for day in range(3):
+            await repository.save(GalmuriItem(
+                user_id=uuid4(),
+                image_data=base64.b64encode(b"%PDF-1.4 document").decode(),
+                created_at=month_ago - timedelta(days=day + 1)
+            ))
+        image = GalmuriItem(
+            user_id=uuid4(),
+            image_data=base64.b64encode(png_bytes('red')).decode(),
+            created_at=month_ago
+        )
+        await repository.save(image)
+
+        compactor = ImageCompactor(repository, LocalBlobStore(str(tmp_path / "hot")), cold, batch_size=2)
+        report = await compactor.run(limit=1)
+
+        assert report["items"] == 1
+        assert report["skipped"] == 3
+        assert (await repository.find_by_id(image.id)).image_data.startswith("blob:images/")
+        cold.close()
+
+    @pytest.mark.asyncio
+    async def test_shared_image_packed_once(self, tmp_path):
+        """Should not append an image the cold tier already holds"""
+        repository = LocalGalmuriRepository(":memory:")
+        cold = PackStore(str(tmp_path / "cold"))
+        image_data = base64.b64encode(png_bytes('red')).decode()
+        for _ in range(2):
+            await repository.save(GalmuriItem(
+                user_id=uuid4(),
+                image_data=image_data,
+                created_at=datetime.now() - timedelta(days=40)
+            ))
+
+        report = await ImageCompactor(repository, LocalBlobStore(str(tmp_path / "hot")), cold).run()
+
+        assert report["items"] == 2
+        assert cold.stats()["entries"] == 1
+        assert cold.stats()["pack_file_bytes"] == cold.stats()["packed_bytes"]
+        cold.close()
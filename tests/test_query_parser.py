@@ -0,0 +1,79 @@
+"""
+Tests for the search query language
+"""
+import pytest
+from datetime import datetime
+
+from backend.application.query_parser import MAX_CLAUSES, QueryError, parse_query
+from backend.domain.entities import GalmuriItem
+
+
+def clauses(query):
+    """Text filters as (field, value, negated)"""
+    return [(text_filter.field, text_filter.value, text_filter.negated) for text_filter in query.text_filters]
+
+
+class TestParseQuery:
+    """Test parsing"""
+    
+    def test_terms_phrases_and_fields(self):
+        """Should parse words, phrases, field filters and negation"""
+        query = parse_query('배달 "주문 내역" -광고 title:영수증 memo:"점심 약속" url:https://a.com/x -site:ads.com')
+        
+        assert clauses(query) == [
+            ("any", "배달", False),
+            ("any", "주문 내역", False),
+            ("any", "광고", True),
+            ("title", "영수증", False),
+            ("memo", "점심 약속", False),
+            ("url", "https://a.com/x", False),
+            ("site", "ads.com", True),
+        ]
+        assert query.positive_terms() == ["배달", "주문 내역", "영수증", "점심 약속"]
+    
+    def test_filters(self):
+        """Should parse platform, status and date filters"""
+        query = parse_query("platform:mobile -status:failed after:2024-01 date:2024-03-01..2024-03-15")
+        
+        assert [platform.value for platform in query.platforms] == ["MOBILE_APP"]
+        assert [status.value for status in query.statuses] == ["PENDING", "DONE"]
+        assert query.created_from == datetime(2024, 3, 1)
+        assert query.created_until == datetime(2024, 3, 16)
+        assert parse_query("date:2024-12").created_until == datetime(2025, 1, 1)
+    
+    def test_unknown_field_is_a_word(self):
+        """Should treat an unknown prefix as part of the word"""
+        assert clauses(parse_query("note:1234")) == [("any", "note:1234", False)]
+    
+    @pytest.mark.parametrize("text", [
+        "-광고",
+        "",
+        "platform:desktop",
+        "status:running",
+        "date:2024-13",
+        "-after:2024-01-01",
+        "-platform:web -platform:mobile",
+        "after:2024-05 before:2024-04",
+        " ".join(["단어"] * (MAX_CLAUSES + 1)),
+    ])
+    def test_rejects(self, text):
+        """Should reject invalid, empty and negation-only queries"""
+        with pytest.raises(QueryError):
+            parse_query(text)
+
+
+class TestSearchQueryMatches:
+    """Test in-memory matching"""
+    
+    def test_matches(self):
+        """Should normalize text and match hosts by domain"""
+        item = GalmuriItem(
+            page_title="ＡＢＣ 주문\n내역",
+            source_url="https://m.shop.example.com/cart",
+            created_at=datetime(2024, 3, 5)
+        )
+        
+        assert parse_query('abc "주문 내역" site:example.com date:2024').matches(item)
+        assert not parse_query("site:ample.com").matches(item)
+        assert not parse_query("abc -site:shop.example.com").matches(item)
+        assert not parse_query("abc before:2024-03-05").matches(item)
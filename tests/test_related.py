@@ -0,0 +1,140 @@
+"""
+Tests for related-item search
+"""
+import pytest
+from uuid import uuid4
+
+import backend.application.related as related
+from backend.application.related import RelatedItemsIndex, features
+from backend.domain.entities import GalmuriItem
+
+TEXTS = [
+    ("제주도 여행 계획", "제주도 3박 4일 여행 일정 렌터카 숙소 예약"),
+    ("제주 여행 숙소", "제주도 숙소 예약 확인 렌터카 픽업 안내"),
+    ("부산 맛집", "해운대 돼지국밥 맛집 리스트 밀면"),
+    ("Python asyncio", "asyncio event loop tasks and futures explained"),
+    ("asyncio tutorial", "Python asyncio tasks, futures and the event loop"),
+]
+
+
+class StubRepository:
+    """Serves a fixed list of items"""
+    
+    def __init__(self, items):
+        self.items = items
+    
+    async def find_search_texts(self, user_id):
+        return [item for item in self.items if item.user_id == user_id]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def kernel(request, monkeypatch):
+    """Run each test with NumPy scoring and with the pure-Python fallback"""
+    if request.param == "numpy":
+        if related.np is None:
+            pytest.skip("NumPy not installed")
+    else:
+        monkeypatch.setattr(related, "np", None)
+    return request.param
+
+
+class TestFeatures:
+    """Test feature extraction"""
+    
+    def test_korean_bigrams(self):
+        """Should share bigram features between a compound and its parts"""
+        assert features("배달의민족")["배달"] == 1
+        assert "배달의민족" in features("배달의민족")
+        assert features("Hello hello") == {"hello": 2}
+
+
+class TestRelatedItemsIndex:
+    """Test top-k lookups"""
+    
+    @pytest.mark.asyncio
+    async def test_ranks_similar_items(self, kernel):
+        """Should rank the item on the same topic first and skip unrelated ones"""
+        user_id = uuid4()
+        items = [GalmuriItem(user_id=user_id, page_title=title, ocr_text=text) for title, text in TEXTS]
+        index = RelatedItemsIndex(min_similarity=0.2)
+        repository = StubRepository(items)
+        
+        jeju = await index.related(items[0], repository, limit=3)
+        asyncio_matches = await index.related(items[3], repository, limit=3)
+        
+        assert jeju[0][1] == items[1].id
+        assert items[3].id not in [item_id for _, item_id in jeju]
+        assert [item_id for _, item_id in asyncio_matches] == [items[4].id]
+    
+    @pytest.mark.asyncio
+    async def test_add_and_remove(self, kernel):
+        """Should follow items added and deleted after loading"""
+        user_id = uuid4()
+        items = [GalmuriItem(user_id=user_id, page_title=title, ocr_text=text) for title, text in TEXTS]
+        index = RelatedItemsIndex(min_similarity=0.2)
+        repository = StubRepository(items[:3])
+        await index.related(items[0], repository)
+        
+        index.add(items[3])
+        index.add(items[4])
+        index.remove(items[1].id)
+        
+        assert [item_id for _, item_id in await index.related(items[4], repository)] == [items[3].id]
+        assert items[1].id not in [item_id for _, item_id in await index.related(items[0], repository)]
+    
+    @pytest.mark.asyncio
+    async def test_changes_count_items_not_saves(self, kernel):
+        """Should count an item once toward a rebuild and ignore saves that keep its text"""
+        user_id = uuid4()
+        items = [GalmuriItem(user_id=user_id, page_title=title, ocr_text=text) for title, text in TEXTS]
+        index = RelatedItemsIndex(min_similarity=0.2)
+        await index.related(items[0], StubRepository(items[:3]))
+        capture = GalmuriItem(user_id=user_id, page_title="새 캡처")
+        
+        index.add(capture)
+        capture.mark_ocr_completed("제주도 렌터카 예약", "tesseract")
+        index.add(capture)
+        capture.mark_synced()
+        index.add(capture)
+        index.add(items[0])
+        
+        assert index._users[user_id].changes == 1
+    
+    @pytest.mark.asyncio
+    async def test_memory_bound(self, kernel):
+        """Should evict least recently used users to stay within max_bytes"""
+        first, second = uuid4(), uuid4()
+        items = [
+            GalmuriItem(user_id=user_id, page_title=title, ocr_text=text)
+            for user_id in (first, second) for title, text in TEXTS
+        ]
+        repository = StubRepository(items)
+        index = RelatedItemsIndex(min_similarity=0.2)
+        await index.related(items[0], repository)
+        one_user = index.bytes()
+        
+        bounded = RelatedItemsIndex(min_similarity=0.2, max_bytes=one_user + 1)
+        await bounded.related(items[0], repository)
+        await bounded.related(items[5], repository)
+        
+        assert one_user > 0
+        assert list(bounded._users) == [second]
+        assert bounded.stats()["users"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_ivf_partitions(self, monkeypatch):
+        """Should find the nearest items through IVF partitions"""
+        if related.np is None:
+            pytest.skip("NumPy not installed")
+        monkeypatch.setattr(related, "IVF_MIN_ITEMS", 100)
+        user_id = uuid4()
+        items = [
+            GalmuriItem(user_id=user_id, page_title=f"topic{index % 50}", ocr_text=f"word{index % 50} shared{index % 7}")
+            for index in range(400)
+        ]
+        index = RelatedItemsIndex(min_similarity=0.2)
+        
+        matches = await index.related(items[0], StubRepository(items), limit=5)
+        
+        assert index._users[user_id].centroids is not None
+        assert all(item_id in {item.id for item in items[50::50]} for _, item_id in matches)
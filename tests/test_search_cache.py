@@ -0,0 +1,130 @@
+"""
+Tests for the search result cache
+"""
+import pytest
+from uuid import uuid4
+
+from backend.application.query_parser import parse_query
+from backend.domain.entities import GalmuriItem
+from backend.infrastructure.local_repository import LocalGalmuriRepository
+from backend.infrastructure.search_cache import CachedGalmuriRepository, SearchResultCache
+
+
+class CountingRepository(LocalGalmuriRepository):
+    """SQLite repository counting the searches that reach it"""
+
+    searches = 0
+
+    async def search(self, user_id, query):
+        self.searches += 1
+        return await super().search(user_id, query)
+
+    async def find_by_query(self, user_id, query):
+        self.searches += 1
+        return await super().find_by_query(user_id, query)
+
+
+@pytest.fixture
+def inner(tmp_path):
+    return CountingRepository(str(tmp_path / "galmuri.db"))
+
+
+@pytest.fixture
+def cache():
+    return SearchResultCache()
+
+
+@pytest.fixture
+def repository(inner, cache):
+    return CachedGalmuriRepository(inner, cache)
+
+
+class TestCachedSearch:
+    """Test cached searches and invalidation"""
+
+    @pytest.mark.asyncio
+    async def test_repeated_search_is_cached(self, repository, inner, cache):
+        """Should answer a repeated search from the cache, in the same order"""
+        user_id = uuid4()
+        older = await repository.save(GalmuriItem(user_id=user_id, page_title="영수증 1"))
+        newer = await repository.save(GalmuriItem(user_id=user_id, page_title="영수증 2"))
+        newer.created_at = older.created_at.replace(year=older.created_at.year + 1)
+        await repository.save(newer)
+
+        first = await repository.search(user_id, "영수증")
+        second = await repository.search(user_id, " 영수증 ")
+        structured = [await repository.find_by_query(user_id, parse_query("영수증 -광고")) for _ in range(2)]
+
+        assert [item.id for item in first] == [item.id for item in second] == [newer.id, older.id]
+        assert [item.id for item in structured[1]] == [newer.id, older.id]
+        assert inner.searches == 2
+        assert cache.stats()["hits"] == 2
+        assert cache.stats()["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_cached_page_keeps_has_more(self, repository, cache):
+        """Should serve each page of a search from the cache with its has_more flag"""
+        user_id = uuid4()
+        for index in range(3):
+            await repository.save(GalmuriItem(user_id=user_id, page_title=f"영수증 {index}"))
+
+        pages = [
+            await repository.search_page(user_id, parse_query("영수증"), limit=2, offset=offset)
+            for offset in (0, 2, 0, 2)
+        ]
+
+        assert [len(page.items) for page in pages] == [2, 1, 2, 1]
+        assert [page.has_more for page in pages] == [True, False, True, False]
+        assert [item.id for item in pages[2].items] == [item.id for item in pages[0].items]
+        assert cache.stats()["hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_invalidate_user(self, repository, inner):
+        """Should rerun a user's searches after a save or delete, and only that user's"""
+        user_id, other_id = uuid4(), uuid4()
+        item = await repository.save(GalmuriItem(user_id=user_id, page_title="카페 영수증"))
+        await repository.save(GalmuriItem(user_id=other_id, page_title="카페"))
+        await repository.search(user_id, "카페")
+        await repository.search(other_id, "카페")
+
+        # OCR completion is a save like any other
+        added = GalmuriItem(user_id=user_id, page_title="스크린샷")
+        added.mark_ocr_completed("카페 메뉴")
+        await repository.save(added)
+        assert {found.id for found in await repository.search(user_id, "카페")} == {item.id, added.id}
+
+        await repository.delete(item.id)
+        assert [found.id for found in await repository.search(user_id, "카페")] == [added.id]
+        await repository.search(other_id, "카페")
+        assert inner.searches == 4
+
+
+class TestSearchResultCache:
+    """Test bounds and staleness"""
+
+    def test_memory_bound(self):
+        """Should evict the least recently used entries to stay within max_bytes"""
+        cache = SearchResultCache(max_bytes=4000)
+        user_id = uuid4()
+        for index in range(3):
+            cache.put(user_id, f"q{index}", cache.generation(user_id), [uuid4() for _ in range(50)])
+        cache.get(user_id, "q0")
+        cache.put(user_id, "q3", cache.generation(user_id), [uuid4() for _ in range(50)])
+
+        assert cache.bytes <= 4000
+        assert cache.get(user_id, "q0") is not None
+        assert cache.get(user_id, "q1") is None
+        assert cache.stats()["evictions"] >= 1
+        # Too large for the budget at all
+        cache.put(user_id, "big", cache.generation(user_id), [uuid4() for _ in range(100)])
+        assert cache.get(user_id, "big") is None
+
+    def test_racing_write_leaves_entry_stale(self):
+        """Should not cache a result computed while the user's items changed"""
+        cache = SearchResultCache()
+        user_id = uuid4()
+        generation = cache.generation(user_id)
+        cache.invalidate(user_id)
+        cache.put(user_id, "q", generation, [uuid4()])
+
+        assert cache.get(user_id, "q") is None
@@ -0,0 +1,190 @@
+"""
+Tests for the n-gram substring search index
+"""
+import time
+import unicodedata
+import pytest
+from datetime import datetime
+from uuid import uuid4
+
+from backend.application.query_parser import parse_query
+from backend.domain.entities import GalmuriItem
+from backend.infrastructure.local_repository import LocalGalmuriRepository
+from backend.infrastructure.search_index import IndexedGalmuriRepository, NgramIndex
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """Indexed repository over a temporary SQLite database"""
+    inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+    return IndexedGalmuriRepository(inner, NgramIndex(str(tmp_path / "index")))
+
+
+class TestSubstringSearch:
+    """Test index-backed search"""
+
+    @pytest.mark.asyncio
+    async def test_partial_korean_words(self, repository):
+        """Should match parts of Korean words in title, memo and OCR text"""
+        user_id = uuid4()
+        title = await repository.save(GalmuriItem(user_id=user_id, page_title="배달의민족 주문 내역"))
+        memo = await repository.save(GalmuriItem(user_id=user_id, page_title="메모", memo_content="점심은 민족 배달로"))
+        ocr = await repository.save(GalmuriItem(user_id=user_id, page_title="캡처", ocr_text="Order #42 쿠팡로켓배송"))
+        await repository.save(GalmuriItem(user_id=uuid4(), page_title="배달의민족"))
+
+        assert [item.id for item in await repository.search(user_id, "의민")] == [title.id]
+        assert {item.id for item in await repository.search(user_id, "배달")} == {title.id, memo.id}
+        assert [item.id for item in await repository.search(user_id, "로켓")] == [ocr.id]
+        assert [item.id for item in await repository.search(user_id, "order")] == [ocr.id]
+        assert await repository.search(user_id, "족배") == []
+
+    @pytest.mark.asyncio
+    async def test_normalizes_decomposed_hangul(self, repository):
+        """Should match NFD text with an NFC query and the other way round"""
+        user_id = uuid4()
+        item = await repository.save(
+            GalmuriItem(user_id=user_id, page_title=unicodedata.normalize("NFD", "갈무리 다이어리"))
+        )
+
+        assert [found.id for found in await repository.search(user_id, "무리")] == [item.id]
+        assert [found.id for found in await repository.search(user_id, unicodedata.normalize("NFD", "다이"))] == [item.id]
+
+    @pytest.mark.asyncio
+    async def test_incremental_updates(self, repository):
+        """Should follow saves and deletes after the index is loaded"""
+        user_id = uuid4()
+        item = await repository.save(GalmuriItem(user_id=user_id, page_title="영수증"))
+        assert await repository.search(user_id, "영수") != []
+
+        item.memo_content = "카페 라떼"
+        await repository.save(item)
+        assert [found.id for found in await repository.search(user_id, "라떼")] == [item.id]
+
+        await repository.delete(item.id)
+        assert await repository.search(user_id, "영수") == []
+
+    @pytest.mark.asyncio
+    async def test_structured_query(self, repository):
+        """Should narrow structured queries by the index and apply the other filters"""
+        user_id = uuid4()
+        kept = await repository.save(GalmuriItem(user_id=user_id, page_title="배달의민족 영수증", memo_content="점심"))
+        await repository.save(GalmuriItem(user_id=user_id, page_title="배달의민족 광고", memo_content="점심"))
+
+        found = await repository.find_by_query(user_id, parse_query("의민 memo:점심 -광고"))
+
+        assert [item.id for item in found] == [kept.id]
+
+    @pytest.mark.asyncio
+    async def test_search_page(self, repository):
+        """Should take index candidates newest first up to the limit"""
+        user_id = uuid4()
+        items = [
+            await repository.save(GalmuriItem(user_id=user_id, page_title=f"영수증 {day}", created_at=datetime(2024, 3, day)))
+            for day in range(1, 30)
+        ]
+        await repository.save(GalmuriItem(user_id=user_id, page_title="영수증 광고", created_at=datetime(2024, 4, 1)))
+
+        page = await repository.search_page(user_id, parse_query("영수 -광고"), limit=3)
+        expired = await repository.search_page(user_id, parse_query("영수"), limit=3, deadline=time.monotonic() - 1)
+
+        assert [item.id for item in page.items] == [item.id for item in items[:-4:-1]]
+        assert not page.truncated
+        assert expired.truncated and expired.items == []
+
+
+class TestNgramIndexPersistence:
+    """Test logs and eviction"""
+
+    @pytest.mark.asyncio
+    async def test_reload_from_log(self, tmp_path):
+        """Should answer from the log without reading the repository again"""
+        inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+        repository = IndexedGalmuriRepository(inner, NgramIndex(str(tmp_path / "index")))
+        user_id = uuid4()
+        kept = await repository.save(GalmuriItem(user_id=user_id, page_title="제주도 여행 계획"))
+        await repository.search(user_id, "여행")
+        # Changes after the log exists are appended to it
+        added = await repository.save(GalmuriItem(user_id=user_id, page_title="부산 여행 사진"))
+
+        class NoScanRepository:
+            async def find_watermark(self, user_id):
+                return await inner.find_watermark(user_id)
+
+            async def find_search_texts(self, user_id):
+                raise AssertionError("index should load from its log")
+
+        reloaded = NgramIndex(str(tmp_path / "index"))
+        assert set(await reloaded.search(user_id, "여행", NoScanRepository())) == {kept.id, added.id}
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_log_without_creation_times(self, tmp_path):
+        """Should rebuild from the repository when the log predates creation times"""
+        inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+        user_id = uuid4()
+        item = await inner.save(GalmuriItem(user_id=user_id, page_title="오래된 로그"))
+        (tmp_path / "index").mkdir()
+        (tmp_path / "index" / f"{user_id}.log").write_text('{"id": "%s", "text": "old"}\n' % uuid4())
+
+        index = NgramIndex(str(tmp_path / "index"))
+
+        assert await index.search(user_id, "로그", inner) == [item.id]
+        assert await index.search(user_id, "old", inner) == []
+
+    @pytest.mark.asyncio
+    async def test_rebuilds_log_behind_the_database(self, tmp_path):
+        """Should rebuild a log that missed writes (a crash after saving, another process)"""
+        inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+        repository = IndexedGalmuriRepository(inner, NgramIndex(str(tmp_path / "index")))
+        user_id = uuid4()
+        kept = await repository.save(GalmuriItem(user_id=user_id, page_title="제주도 여행 계획"))
+        deleted = await repository.save(GalmuriItem(user_id=user_id, page_title="부산 여행 사진"))
+        await repository.search(user_id, "여행")
+        # Written to the database without reaching the log
+        missed = await inner.save(GalmuriItem(user_id=user_id, page_title="강릉 여행 일정"))
+
+        reloaded = NgramIndex(str(tmp_path / "index"))
+        assert set(await reloaded.search(user_id, "여행", inner)) == {kept.id, deleted.id, missed.id}
+
+        await inner.delete(deleted.id)
+        reloaded = NgramIndex(str(tmp_path / "index"))
+        assert set(await reloaded.search(user_id, "여행", inner)) == {kept.id, missed.id}
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction(self, tmp_path):
+        """Should keep only max_users indexes in memory"""
+        inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+        index = NgramIndex(str(tmp_path / "index"), max_users=1)
+        repository = IndexedGalmuriRepository(inner, index)
+        first, second = uuid4(), uuid4()
+        await repository.save(GalmuriItem(user_id=first, page_title="첫 번째 사용자"))
+        await repository.save(GalmuriItem(user_id=second, page_title="두 번째 사용자"))
+
+        await repository.search(first, "사용")
+        await repository.search(second, "사용")
+        assert list(index._users) == [second]
+
+        # The evicted user reloads from its log, including later changes
+        late = await repository.save(GalmuriItem(user_id=first, page_title="첫 사용 후기"))
+        assert len(await repository.search(first, "사용")) == 2
+        assert late.id in {item.id for item in await repository.search(first, "후기")}
+
+    @pytest.mark.asyncio
+    async def test_memory_bound(self, tmp_path):
+        """Should evict least recently used users to stay within max_bytes, tracking removals"""
+        inner = LocalGalmuriRepository(str(tmp_path / "galmuri.db"))
+        index = NgramIndex(str(tmp_path / "index"), max_bytes=30_000)
+        repository = IndexedGalmuriRepository(inner, index)
+        first, second = uuid4(), uuid4()
+        for user_id in (first, second):
+            for number in range(10):
+                await repository.save(GalmuriItem(user_id=user_id, page_title=f"영수증 {number} 카페 라떼 주문 내역"))
+
+        await repository.search(first, "영수")
+        one_user = index.bytes()
+        await repository.search(second, "영수")
+
+        assert 15_000 < one_user <= 30_000
+        assert list(index._users) == [second]
+        for item in await repository.find_by_user_id(second):
+            await repository.delete(item.id)
+        assert index.bytes() == 0
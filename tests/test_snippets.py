@@ -0,0 +1,54 @@
+"""
+Tests for search result snippets
+"""
+import unicodedata
+
+from backend.domain.entities import GalmuriItem
+from backend.domain.search import SNIPPET_CHARS, build_snippets
+
+
+class TestBuildSnippets:
+    """Test excerpts and highlight offsets"""
+    
+    def test_bounded_excerpt_with_offsets(self):
+        """Should cut long OCR text around the matches and point at them"""
+        text = "가" * 500 + " 배달의민족\n주문 내역 " + "나" * 40 + " 주문   내역 " + "다" * 500
+        item = GalmuriItem(page_title="배달 영수증", ocr_text=text)
+        
+        title, ocr = build_snippets(item, ["주문 내역", "배달"])
+        
+        assert (title.field, title.text, title.highlights) == ("title", "배달 영수증", [(0, 2)])
+        assert ocr.field == "ocr"
+        assert len(ocr.text) <= SNIPPET_CHARS + 2
+        assert ocr.text.startswith("…") and ocr.text.endswith("…")
+        assert [ocr.text[start:end] for start, end in ocr.highlights] == ["배달", "주문 내역", "주문 내역"]
+    
+    def test_composes_decomposed_text(self):
+        """Should match NFD text and give offsets into the composed text"""
+        item = GalmuriItem(page_title="x", memo_content=unicodedata.normalize("NFD", "점심 약속 메모"))
+        
+        [memo] = build_snippets(item, ["약속"])
+        
+        assert memo.text == "점심 약속 메모"
+        assert memo.highlights == [(3, 5)]
+    
+    def test_matches_as_search_normalizes(self):
+        """Should find terms in full-width, case-folded and line-broken text and point at the raw characters"""
+        item = GalmuriItem(
+            page_title="ＧＡＬＭＵＲＩ 메모",
+            memo_content="Straße 주소",
+            ocr_text="결제\n\n금액 12,000원"
+        )
+        
+        title, memo, ocr = build_snippets(item, ["galmuri", "strasse", "결제 금액"])
+        
+        assert [title.text[start:end] for start, end in title.highlights] == ["ＧＡＬＭＵＲＩ"]
+        assert [memo.text[start:end] for start, end in memo.highlights] == ["Straße"]
+        assert (ocr.text, ocr.highlights) == ("결제 금액 12,000원", [(0, 5)])
+    
+    def test_no_match(self):
+        """Should return no snippets without matches or terms"""
+        item = GalmuriItem(page_title="제목", ocr_text="본문")
+        
+        assert build_snippets(item, ["없음"]) == []
+        assert build_snippets(item, [" "]) == []
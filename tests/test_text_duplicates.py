@@ -0,0 +1,57 @@
+"""
+Tests for MinHash same-text detection
+"""
+import pytest
+from uuid import uuid4
+
+from backend.application.text_duplicates import TextDuplicateIndex, similarity, text_signature
+
+ARTICLE = (
+    "갈무리 다이어리는 웹 페이지와 스크린샷을 저장하고 OCR로 검색할 수 있게 해 줍니다. "
+    "Captures are stored locally first and synced when the network is available."
+)
+
+
+class TestTextSignature:
+    """Test signatures"""
+    
+    def test_layout_independent(self):
+        """Should give the same text at a different layout the same signature"""
+        reflowed = ARTICLE.replace(" ", "\n", 6).replace("OCR로", "OCR 로")
+        
+        assert similarity(text_signature(ARTICLE), text_signature(reflowed)) == 1.0
+    
+    def test_different_texts(self):
+        """Should tell different texts apart and skip very short ones"""
+        other = "Weekly grocery list: tomatoes, basil, olive oil, pasta and parmesan cheese."
+        
+        assert similarity(text_signature(ARTICLE), text_signature(other)) < 0.2
+        assert text_signature("OK") == ""
+
+
+class TestTextDuplicateIndex:
+    """Test LSH lookups"""
+    
+    @pytest.mark.asyncio
+    async def test_find_report_and_remove(self):
+        """Should find items with the same text and group them"""
+        user_id = uuid4()
+        same, edited, different = uuid4(), uuid4(), uuid4()
+        rows = [
+            (same, text_signature(ARTICLE)),
+            (edited, text_signature(ARTICLE + " 2024")),
+            (different, text_signature("Completely unrelated notes about a weekend hiking trip in the mountains.")),
+        ]
+        
+        class Repository:
+            async def find_text_signatures(self, requested):
+                return rows if requested == user_id else []
+        
+        index = TextDuplicateIndex(threshold=0.8)
+        matches = await index.find(user_id, text_signature(ARTICLE), Repository(), exclude=same)
+        report = await index.report(user_id, Repository())
+        index.remove(edited)
+        
+        assert [item_id for _, item_id in matches] == [edited]
+        assert report == [sorted([same, edited], key=str)]
+        assert await index.find(user_id, text_signature(ARTICLE), Repository(), exclude=same) == []